@@ -0,0 +1,118 @@
+"""Benchmark BM25 query latency and compare dense / BM25 / hybrid recall@k.
+
+Latency is measured on ``--chunks`` synthetic chunks (default 200k) with a
+Zipf-distributed vocabulary. Recall is measured on the fixture query set in
+``tests/fixtures/retrieval_queries.json``. Dense retrieval uses Ollama when
+``--ollama-url`` is given; otherwise it falls back to an offline character
+trigram hashing embedder, which is only a rough stand-in for a real model.
+
+    python benchmarks/bench_hybrid_retrieval.py --chunks 200000
+    python benchmarks/bench_hybrid_retrieval.py --ollama-url http://localhost:11434 --model bge-m3
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from noteagent.core.lexical_index import BM25Index, reciprocal_rank_fusion
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "retrieval_queries.json"
+
+
+def synthetic_chunks(n_chunks: int, vocab_size: int = 50_000, words_per_chunk: int = 180, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(vocab_size)])
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    chunks = []
+    for start in range(0, n_chunks, 10_000):
+        rows = rng.choice(vocab_size, size=(min(10_000, n_chunks - start), words_per_chunk), p=weights / weights.sum())
+        chunks.extend(" ".join(words) for words in vocab[rows].tolist())
+    return chunks
+
+
+def bench_latency(n_chunks: int, n_queries: int, k: int) -> Dict[str, float]:
+    chunks = synthetic_chunks(n_chunks)
+    index = BM25Index()
+    start = time.perf_counter()
+    for i in range(0, n_chunks, 10_000):
+        index.add([f"chunk-{j}" for j in range(i, min(i + 10_000, n_chunks))], chunks[i : i + 10_000])
+    build_sec = time.perf_counter() - start
+
+    rng = random.Random(1)
+    timings = []
+    for _ in range(n_queries):
+        # Mix one common, one mid-frequency and one rare term, like a real question.
+        query = f"term{rng.randint(0, 20)} term{rng.randint(100, 2000)} term{rng.randint(5000, 49_999)}"
+        start = time.perf_counter()
+        index.search(query, k=k)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "chunks": n_chunks,
+        "terms": len(index._postings),
+        "build_sec": round(build_sec, 2),
+        "query_p50_ms": round(statistics.median(timings), 2),
+        "query_p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+    }
+
+
+def hashing_embed(texts: List[str], dim: int = 512) -> np.ndarray:
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f"  {text.lower()}  "
+        for i in range(len(padded) - 2):
+            vectors[row, int.from_bytes(hashlib.blake2b(padded[i : i + 3].encode(), digest_size=4).digest(), "little") % dim] += 1.0
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def bench_recall(k: int, ollama_url: str = "", model: str = "bge-m3") -> Dict[str, float]:
+    fixture = json.loads(FIXTURE.read_text())
+    ids = [note["relative_path"] for note in fixture["notes"]]
+    texts = [note["clean_body"] for note in fixture["notes"]]
+    queries = [case["query"] for case in fixture["queries"]]
+
+    if ollama_url:
+        from noteagent.core.embeddings import PooledOllamaEmbeddings
+
+        embedder = PooledOllamaEmbeddings(model=model, base_url=ollama_url)
+        doc_vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+        query_vectors = np.asarray(embedder.embed_documents(queries), dtype=np.float32)
+        doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    else:
+        doc_vectors, query_vectors = hashing_embed(texts), hashing_embed(queries)
+
+    index = BM25Index()
+    index.add(ids, texts)
+
+    recalls: Dict[str, List[float]] = {"dense": [], "bm25": [], "hybrid": []}
+    fetch_k = len(ids)
+    for case, query_vector in zip(fixture["queries"], query_vectors):
+        dense = [ids[i] for i in np.argsort(-(doc_vectors @ query_vector))[:fetch_k]]
+        lexical = [chunk_id for chunk_id, _ in index.search(case["query"], k=fetch_k)]
+        rankings = {"dense": dense, "bm25": lexical, "hybrid": reciprocal_rank_fusion([dense, lexical])}
+        relevant = set(case["relevant"])
+        for name, ranking in rankings.items():
+            recalls[name].append(len(relevant & set(ranking[:k])) / len(relevant))
+    return {f"{name}_recall@{k}": round(sum(values) / len(values), 3) for name, values in recalls.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 latency and hybrid retrieval recall")
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ollama-url", default="")
+    parser.add_argument("--model", default="bge-m3")
+    args = parser.parse_args()
+
+    print(json.dumps(bench_latency(args.chunks, args.queries, k=30), indent=2))
+    print(f"dense embedder: {'ollama/' + args.model if args.ollama_url else 'char-trigram hashing (offline stand-in)'}")
+    print(json.dumps(bench_recall(args.k, args.ollama_url, args.model), indent=2))
@@ -0,0 +1,125 @@
+"""Cost of the offline insights job (``generate_insights``) on a large vault.
+
+A vault of ``--notes`` notes is indexed into the mmap backend with
+embeddings drawn around ``--topics`` random topic centers (``--dims`` wide),
+so the vault has real cluster structure. Most notes link to a few notes of
+their own topic; ``--orphan-ratio`` of them link to nothing. The job then
+runs end to end with a ``FakeLLM`` that takes ``--llm-ms`` per call, and
+the per-phase timings are reported:
+
+    load            bulk read of every chunk embedding, averaged per note
+    cluster         spherical k-means over the note vectors
+    neighbor_join   approximate k-nearest notes for every note (probing the closest clusters)
+    links           orphans and unlinked similar pairs from the link graph
+    llm             one call per cluster
+
+Recall of the neighbor join is measured against exact search on
+``--recall-sample`` notes. The previous way to get the same report was one
+interactive RAG call per note; ``per-note LLM`` is what that would cost at
+the same ``--llm-ms``.
+
+    python benchmarks/bench_insights.py --notes 50000 --dims 1024
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.insights import generate_insights, kmeans, neighbor_join, note_vectors
+from fake_backends import FakeLLM
+from synthetic_vault import WORDS
+
+
+class TopicEmbeddings(Embeddings):
+    """Embeds a text near the center of the ``topicN`` word it contains, with noise seeded by the text."""
+
+    def __init__(self, n_topics: int, dims: int, noise: float, seed: int = 0):
+        self.centers = np.random.default_rng(seed).standard_normal((n_topics, dims)).astype(np.float32)
+        self.noise = noise
+
+    def _embed(self, text: str) -> np.ndarray:
+        topic = next((int(word[5:]) for word in text.split() if word.startswith("topic") and word[5:].isdigit()), 0)
+        rng = np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16))
+        vector = self.centers[topic % len(self.centers)] + self.noise * rng.standard_normal(self.centers.shape[1]).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
+
+
+def make_notes(n_notes: int, n_topics: int, orphan_ratio: float, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    topics = [rng.randrange(n_topics) for _ in range(n_notes)]
+    by_topic: Dict[int, List[int]] = {}
+    for i, topic in enumerate(topics):
+        by_topic.setdefault(topic, []).append(i)
+    notes = []
+    for i, topic in enumerate(topics):
+        links = [] if rng.random() < orphan_ratio else [f"Note {j:06d}" for j in rng.sample(by_topic[topic], k=min(2, len(by_topic[topic])))]
+        notes.append(
+            {
+                "relative_path": f"Notes/Note {i:06d}.md",
+                "name": f"Note {i:06d}",
+                "clean_body": f"topic{topic} " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 40))),
+                "wikilinks": links,
+            }
+        )
+    return notes
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = TopicEmbeddings(args.topics, args.dims, args.noise)
+        db = ObsidianChromaDB(collection_name="bench", db_location_path=Path(tmp) / "db", embeddings=embeddings, embedding_cache_size=0, vector_backend="mmap")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_new_note_index(iter(make_notes(args.notes, args.topics, args.orphan_ratio)))
+        print(f"{args.notes} notes, {db.count()} chunks, {args.dims} dims (indexed in {time.perf_counter() - start:.1f}s)")
+
+        llm = FakeLLM(latency_ms=args.llm_ms, n_tokens=16)
+        report = generate_insights(db, llm=llm, n_clusters=args.clusters, n_probe=args.n_probe, llm_concurrency=args.llm_concurrency)
+        timings = report["timings"]
+        for phase in ("load", "cluster", "neighbor_join", "links", "llm"):
+            print(f"  {phase:<14} {timings.get(phase + '_sec', 0.0):8.2f}s")
+        print(f"  {'total':<14} {timings['total_sec']:8.2f}s  ({timings.get('llm_calls', 0)} LLM calls)")
+        print(f"  per-note LLM   {report['notes'] * args.llm_ms / 1000:8.0f}s  ({report['notes']} calls at {args.llm_ms:.0f}ms)")
+        print(f"  {len(report['clusters'])} clusters, {len(report['orphans'])} orphans, {len(report['missing_links'])} missing links reported")
+
+        # Recall of the join against exact search on a sample, recomputed here with the job's own settings.
+        _, vectors, _ = note_vectors(db)
+        labels, centers = kmeans(vectors, len(report["clusters"]) or 2)
+        neighbors, _ = neighbor_join(vectors, labels, centers, n_neighbors=5, n_probe=args.n_probe)
+        sample = np.random.default_rng(1).choice(len(vectors), size=min(args.recall_sample, len(vectors)), replace=False)
+        exact = vectors[sample] @ vectors.T
+        exact[np.arange(len(sample)), sample] = -np.inf
+        expected = np.argpartition(-exact, 5, axis=1)[:, :5]
+        recall = np.mean([len(set(neighbors[i]) & set(want)) / 5 for i, want in zip(sample, expected)])
+        print(f"  neighbor join recall@5 vs exact ({len(sample)} notes): {recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=1024)
+    parser.add_argument("--topics", type=int, default=150)
+    parser.add_argument("--noise", type=float, default=0.5, help="per-dimension noise around the topic center")
+    parser.add_argument("--orphan-ratio", type=float, default=0.05)
+    parser.add_argument("--clusters", type=int, default=None, help="default: the job's own choice")
+    parser.add_argument("--n-probe", type=int, default=3)
+    parser.add_argument("--llm-ms", type=float, default=2000.0)
+    parser.add_argument("--llm-concurrency", type=int, default=1)
+    parser.add_argument("--recall-sample", type=int, default=1000)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""Compare the per-note DataFrame lookup loader with the indexed loader.
+
+Both loaders run against the same gathered vault so only the unpack phase is
+timed. The legacy loader is quadratic, so it is skipped above ``--legacy-max``.
+With ``--workers`` the whole ``load_vault(workers=N)`` (notes parsed in N
+processes, no gather) is timed too, against gather plus indexed unpack.
+
+    python benchmarks/bench_load_vault.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import obsidiantools.api as otools
+
+from noteagent.core.folder_navigation import load_vault, unpack_note, unpack_vault_notes
+from synthetic_vault import generate_vault
+
+
+def legacy_unpack(vault: otools.Vault, vault_path: Path):
+    note_metadata_df = vault.get_note_metadata()
+    note_metadata_df["abs_filepath"] = note_metadata_df["abs_filepath"].astype(str)
+    note_metadata_df["rel_filepath"] = note_metadata_df["rel_filepath"].astype(str)
+    return [unpack_note(vault, str(vault_path / p), vault_path, note_metadata_df) for p in vault.md_file_index.values()]
+
+
+def run(sizes, legacy_max: int, workers: int):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            vault_path = generate_vault(Path(tmp) / "vault", size)
+            start = time.perf_counter()
+            vault = otools.Vault(vault_path).connect().gather()
+            gather_sec = time.perf_counter() - start
+
+            start = time.perf_counter()
+            indexed = unpack_vault_notes(vault, vault_path)
+            indexed_sec = time.perf_counter() - start
+
+            parallel_sec = None
+            if workers > 1:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    parallel = load_vault(vault_path, workers=workers)
+                parallel_sec = time.perf_counter() - start
+                assert parallel == indexed, "parallel loader output differs from serial loader"
+
+            legacy_sec = None
+            if size <= legacy_max:
+                start = time.perf_counter()
+                legacy = legacy_unpack(vault, vault_path)
+                legacy_sec = time.perf_counter() - start
+                assert legacy == indexed, "indexed loader output differs from legacy loader"
+
+            legacy_str = f"{legacy_sec:8.2f}s" if legacy_sec is not None else "  skipped"
+            line = f"{size:>7} notes | gather {gather_sec:8.2f}s | legacy unpack {legacy_str} | indexed unpack {indexed_sec:8.2f}s"
+            if parallel_sec is not None:
+                line += f" | {workers} workers {parallel_sec:8.2f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1, help="also time load_vault parsing in this many processes")
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_max, args.workers)
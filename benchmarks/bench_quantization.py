@@ -0,0 +1,110 @@
+"""Memory, latency and recall of quantized first-pass search on the mmap backend.
+
+The benchmark vault (``synthetic_vault``) is indexed once with
+``vector_backend="mmap"`` and fake embeddings. The same index is then
+searched with each ``--modes`` entry. ``none`` is the exact float32 scan,
+and the other modes rescore a ``k * --rerank-factor`` shortlist in full
+precision. Memory is the size of the data a query scans, which has to stay
+resident for fast queries.
+
+``--random-chunks N`` swaps the vault for N clustered Gaussian vectors.
+Bag-of-words fake embeddings are sparse and non-negative, which is the
+worst case for sign bits. Clustered dense vectors look more like real
+model output.
+
+    python benchmarks/bench_quantization.py --notes 2000 --dims 1024
+    python benchmarks/bench_quantization.py --random-chunks 200000 --dims 1024
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.folder_navigation import iter_vault
+from noteagent.core.vector_store import MmapVectorStore
+from fake_backends import FakeEmbeddings
+from synthetic_vault import WORDS, generate_vault
+
+
+def build_vault_index(args, workdir: Path):
+    vault_path = generate_vault(workdir / "vault", args.notes, seed=args.seed)
+    embeddings = FakeEmbeddings(dims=args.dims)
+    db = ObsidianChromaDB(collection_name="bench", db_location_path=workdir / "db", embeddings=embeddings, vector_backend="mmap")
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_new_note_index(iter_vault(vault_path))
+    rng = random.Random(args.seed)
+    questions = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(args.queries)]
+    return workdir / "db" / "bench.vectors", embeddings, [embeddings.embed_query(q) for q in questions]
+
+
+def build_random_index(args, workdir: Path):
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((max(16, args.random_chunks // 500), args.dims)).astype(np.float32)
+    store = MmapVectorStore(workdir / "vectors", FakeEmbeddings(dims=args.dims))
+    for start in range(0, args.random_chunks, 50_000):
+        n = min(50_000, args.random_chunks - start)
+        vectors = centers[rng.integers(0, len(centers), n)] + 0.8 * rng.standard_normal((n, args.dims)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{start + i}" for i in range(n)]
+        store.add_vectors(vectors, [""] * n, [{"source": f"{i}.md"} for i in ids], ids)
+    picks = rng.integers(0, args.random_chunks, args.queries)
+    queries = np.asarray(store._ensure_loaded().vectors[picks]) + 0.05 * rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+    return workdir / "vectors", store.embeddings, queries.tolist()
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        if args.random_chunks:
+            path, embeddings, queries = build_random_index(args, Path(tmp))
+        else:
+            path, embeddings, queries = build_vault_index(args, Path(tmp))
+        print(f"Index built in {time.perf_counter() - start:.1f}s")
+
+        baseline: List[set] = []
+        for mode in args.modes:
+            store = MmapVectorStore(path, embeddings, quantization=mode, rerank_factor=args.rerank_factor)
+            start = time.perf_counter()
+            store.similarity_search_by_vector(queries[0], k=args.k)  # maps the files and derives missing codes
+            open_sec = time.perf_counter() - start
+            for query in queries[:5]:
+                store.similarity_search_by_vector(query, k=args.k)
+
+            timings, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                docs = store.similarity_search_by_vector(query, k=args.k)
+                timings.append((time.perf_counter() - start) * 1000)
+                results.append({doc.id for doc in docs})
+            if not baseline:
+                baseline = results  # the first mode is the reference, "none" by default
+            recall = sum(len(got & want) for got, want in zip(results, baseline)) / max(1, sum(len(want) for want in baseline))
+            stats = store.stats()
+            timings.sort()
+            print(
+                f"{mode:>6} | rows {stats['vector_rows']:>7} x {stats['vector_dim']} | scanned {stats['vector_scan_bytes'] / 1e6:8.1f} MB | "
+                f"first query {open_sec * 1000:7.1f}ms | p50 {statistics.median(timings):6.2f}ms p95 {timings[int(len(timings) * 0.95)]:6.2f}ms | "
+                f"recall@{args.k} {recall:.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--random-chunks", type=int, default=0, help="benchmark clustered random vectors instead of the vault")
+    parser.add_argument("--dims", type=int, default=1024, help="bge-m3 size by default")
+    parser.add_argument("--modes", nargs="+", default=["none", "int8", "binary"])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,89 @@
+"""Query latency while a full re-index runs next to the live generation.
+
+A synthetic vault is indexed, then ``create_new_note_index`` rebuilds it
+on a background thread while the main thread keeps querying. The fake
+embedder sleeps per call and per text, like a remote model server. Query
+latency is reported before and during the rebuild, along with the hit
+count, which stays at k because the old generation serves until the
+switch.
+
+    python benchmarks/bench_reindex.py --notes 1000 --backend chroma --embed-text-ms 2
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.folder_navigation import load_vault
+from fake_backends import FakeEmbeddings
+from synthetic_vault import WORDS, generate_vault
+
+
+def percentiles(timings: List[float]) -> str:
+    timings = sorted(timings)
+    return f"p50 {statistics.median(timings):6.2f}ms p95 {timings[int(len(timings) * 0.95)]:6.2f}ms (n={len(timings)})"
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        vault_path = generate_vault(Path(tmp) / "vault", args.notes, seed=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            notes = load_vault(vault_path)
+        embeddings = FakeEmbeddings(dims=args.dims, call_ms=args.embed_ms, per_text_ms=args.embed_text_ms)
+        db = ObsidianChromaDB(collection_name="bench", db_location_path=Path(tmp) / "db", embeddings=embeddings, vector_backend=args.backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_new_note_index(iter(notes))
+
+        rng = random.Random(0)
+        # Pre-embedded so query timings measure the index, not the (busy) fake embedder.
+        queries = [FakeEmbeddings(dims=args.dims).embed_query(" ".join(rng.choice(WORDS) for _ in range(6))) for _ in range(200)]
+
+        def query_once(i: int) -> tuple:
+            start = time.perf_counter()
+            hits = db._vectorstore.similarity_search_by_vector_with_relevance_scores(queries[i % len(queries)], k=args.k)
+            return (time.perf_counter() - start) * 1000, len(hits)
+
+        before = [query_once(i)[0] for i in range(200)]
+        print(f"before rebuild : {percentiles(before)}")
+
+        rebuild_sec = {}
+
+        def rebuild():
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.create_new_note_index(iter(notes))
+            rebuild_sec["total"] = time.perf_counter() - start
+
+        worker = threading.Thread(target=rebuild)
+        worker.start()
+        during, short = [], 0
+        i = 0
+        while worker.is_alive():
+            ms, hits = query_once(i)
+            during.append(ms)
+            short += hits < args.k
+            i += 1
+            time.sleep(args.query_interval_ms / 1000)
+        worker.join()
+        print(f"during rebuild : {percentiles(during)} | queries with fewer than k hits: {short}")
+        print(f"rebuild        : {rebuild_sec['total']:.1f}s for {db.count()} chunks -> generation {db.generation}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--backend", choices=["chroma", "mmap"], default="chroma")
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="fake embedder latency per call")
+    parser.add_argument("--embed-text-ms", type=float, default=2.0, help="fake embedder latency per text")
+    parser.add_argument("--query-interval-ms", type=float, default=20.0, help="pause between queries during the rebuild")
+    parser.add_argument("--k", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""Latency of scoped (metadata pre-filtered) retrieval as the vault grows.
+
+For each ``--sizes`` entry a vault of in-memory notes is indexed with fake
+embeddings. Notes are spread over the ``synthetic_vault`` folders and tags,
+were modified over the last two years, and the first ``--atlas-notes`` of
+them carry ``#project/atlas``, so that scope stays the same size while the
+vault grows. Each query is run:
+
+    unscoped       plain top-k over the whole vault
+    post-filter    the old workaround: top 10*k over the whole vault, then keep in-scope hits
+    scoped         ``dense_search(..., scope=...)``: metadata index -> source filter -> top-k
+
+for a fixed-size scope (``#project/atlas``), a proportional one (a folder)
+and a date range. ``short`` counts post-filter queries that returned fewer
+than k in-scope hits.
+
+    python benchmarks/bench_scoped_search.py --sizes 5000 20000 50000 --backend mmap
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from fake_backends import FakeEmbeddings
+from synthetic_vault import FOLDERS, TAGS, WORDS
+
+DAY = 86400.0
+
+
+def make_notes(n_notes: int, atlas_notes: int, now: float, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    notes = []
+    for i in range(n_notes):
+        tags = rng.sample(TAGS, k=rng.randint(0, 3)) + (["project/atlas"] if i < atlas_notes else [])
+        modified = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now - rng.uniform(0, 730) * DAY))
+        notes.append(
+            {
+                "relative_path": f"{FOLDERS[i % len(FOLDERS)]}/Note {i:06d}.md",
+                "name": f"Note {i:06d}",
+                "clean_body": " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))),
+                "tags": tags,
+                "frontmatter": {"rating": rng.randint(1, 7)},
+                "last_modified": modified,
+            }
+        )
+    return notes
+
+
+def timed(fn, queries: List[List[float]]) -> tuple:
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), results
+
+
+def main(args):
+    now = time.time()
+    scopes = {
+        "tag #project/atlas": {"tags": ["project/atlas"]},
+        "folder Daily": {"folder": "Daily"},
+        "since:30d": {"modified_after": now - 30 * DAY},
+    }
+    for n_notes in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            embeddings = FakeEmbeddings(dims=args.dims)
+            db = ObsidianChromaDB(
+                collection_name="bench", db_location_path=Path(tmp) / "db", embeddings=embeddings, embedding_cache_size=0, vector_backend=args.backend
+            )
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.create_new_note_index(iter(make_notes(n_notes, args.atlas_notes, now)))
+            print(f"\n{n_notes} notes, {db.count()} chunks ({args.backend}, indexed in {time.perf_counter() - start:.1f}s)")
+
+            rng = random.Random(1)
+            queries = [embeddings.embed_query(" ".join(rng.choice(WORDS) for _ in range(8))) for _ in range(args.queries)]
+            for query in queries[:5]:
+                db.dense_search(query, k=args.k)
+            unscoped_ms, _ = timed(lambda q: db.dense_search(q, k=args.k), queries)
+            print(f"  {'unscoped':<20} | p50 {unscoped_ms:7.2f}ms")
+            for label, scope in scopes.items():
+                sources = db.scope_sources(scope)
+                post_ms, post = timed(
+                    lambda q: [doc for doc in db.dense_search(q, k=args.k * 10) if doc.metadata["source"] in sources][: args.k], queries
+                )
+                scoped_ms, scoped = timed(lambda q: db.dense_search(q, k=args.k, scope=scope), queries)
+                short = sum(len(hits) < min(args.k, len(sources)) for hits in post)
+                print(
+                    f"  {label:<20} | {len(sources):>6} notes in scope | post-filter p50 {post_ms:7.2f}ms (short {short:>3}/{len(queries)}) | "
+                    f"scoped p50 {scoped_ms:7.2f}ms ({statistics.mean(len(hits) for hits in scoped):.1f} hits)"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 50000])
+    parser.add_argument("--backend", choices=["chroma", "mmap"], default="mmap")
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--atlas-notes", type=int, default=200, help="notes tagged #project/atlas at every vault size")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""Startup cost of the agent entry point: imports, opening the index, first answer.
+
+First the heaviest imports behind ``import noteagent.core.main`` are listed
+(``python -X importtime``). Then a synthetic vault is indexed once per
+``--backends`` entry with fake embeddings. ``AgentLoop.initialize`` is timed
+in a fresh process with and without fast start, measuring:
+
+    import      importing noteagent.core.main
+    ready       initialize() returning (the prompt would show here)
+    first       the first question's retrieval finishing, counted from process start
+    synced      the vault scan finishing (in the background with fast start), counted from process start
+
+    python benchmarks/bench_startup.py --notes 2000 --backends chroma mmap
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Project and fake_backends imports stay inside the functions so the child process times a cold import.
+
+
+def import_breakdown(top: int) -> List[str]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import noteagent.core.main"], capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2:  # top-level packages and their direct imports
+            rows.append((int(cumulative), name.strip(), depth))
+    rows.sort(reverse=True)
+    return [f"{'  ' * depth}{name:<40} {cumulative / 1e6:6.3f}s" for cumulative, name, depth in rows[:top]]
+
+
+def build_index(vault_path: Path, workdir: Path, backend: str, dims: int) -> None:
+    from noteagent.core.chroma_db import ObsidianChromaDB
+    from noteagent.core.folder_navigation import iter_vault
+    from fake_backends import FakeEmbeddings
+
+    # Same location and collection AgentLoop opens when started with cwd=workdir.
+    db = ObsidianChromaDB(
+        collection_name="obsidian_notes", db_location_path=workdir / "chroma_basic", embeddings=FakeEmbeddings(dims=dims), vector_backend=backend
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_new_note_index(iter_vault(vault_path))
+
+
+def child(vault_path: str, backend: str, fast_start: bool, dims: int) -> Dict[str, Any]:
+    """Run in a fresh process with cwd set to the index's parent directory."""
+    start = time.perf_counter()
+    import noteagent.core.main as main
+    from noteagent.core import vault_registry
+    from noteagent.core.metrics import METRICS
+
+    imported = time.perf_counter()
+    from fake_backends import FakeEmbeddings
+
+    vault_registry.PooledOllamaEmbeddings = lambda **kwargs: FakeEmbeddings(dims=dims)
+    main.VAULT_DIR = Path(vault_path)
+    main.VECTOR_BACKEND = backend
+    main.WATCH_VAULT = False
+    agent = main.AgentLoop()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.initialize(fast_start=fast_start)
+        ready = time.perf_counter()
+        agent.context_stage.invoke("what did I write about kafka consumer lag?")
+        first = time.perf_counter()
+        if agent.startup_sync is not None:
+            agent.startup_sync.join()
+        synced = time.perf_counter()
+        agent.stop()
+    spans = {name: stats["total_sec"] for name, stats in METRICS.snapshot()["spans"].items() if name.startswith("startup.")}
+    return {
+        "import_sec": round(imported - start, 3),
+        "ready_sec": round(ready - start, 3),
+        "first_sec": round(first - start, 3),
+        "synced_sec": round(synced - start, 3),
+        "spans": spans,
+    }
+
+
+def main(args):
+    print("Heaviest imports behind `import noteagent.core.main`:")
+    for line in import_breakdown(args.top_imports):
+        print(f"  {line}")
+
+    from synthetic_vault import generate_vault
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault_path = generate_vault(Path(tmp) / "vault", args.notes, seed=0)
+        for backend in args.backends:
+            workdir = Path(tmp) / backend
+            workdir.mkdir()
+            build_index(vault_path, workdir, backend, args.dims)
+            for fast_start in (False, True):
+                runs = []
+                for _ in range(args.repeat):
+                    out = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--child", str(vault_path), backend, str(int(fast_start)), "--dims", str(args.dims)],
+                        cwd=workdir,
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                    )
+                    runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+                best = min(runs, key=lambda run: run["first_sec"])
+                label = "fast start" if fast_start else "full sync "
+                print(
+                    f"{backend:>6} {label} | import {best['import_sec']:5.2f}s | ready {best['ready_sec']:6.2f}s | "
+                    f"first retrieval {best['first_sec']:6.2f}s | synced {best['synced_sec']:6.2f}s | "
+                    + " ".join(f"{name} {sec:.2f}s" for name, sec in sorted(best["spans"].items()))
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "mmap"])
+    parser.add_argument("--dims", type=int, default=128, help="fake embedding dimensions")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per configuration; the fastest is reported")
+    parser.add_argument("--top-imports", type=int, default=12)
+    parser.add_argument("--child", nargs=3, metavar=("VAULT", "BACKEND", "FAST_START"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child[0], args.child[1], args.child[2] == "1", args.dims)))
+    else:
+        main(args)
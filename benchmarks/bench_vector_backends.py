@@ -0,0 +1,139 @@
+"""Compare the Chroma and memory-mapped NumPy vector backends on identical data.
+
+``--chunks`` random unit vectors (``--dims`` wide) with short texts and a
+``source`` per chunk are written to both backends. Reported per backend:
+ingest time, disk size, cold start (a fresh process opening the store and
+answering one query), query latency, recall@k against exact search,
+delete time for 10% of the chunks, and for the mmap backend compaction.
+
+    python benchmarks/bench_vector_backends.py --chunks 50000 --dims 384
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.chroma_store import ChromaNoteStore
+from noteagent.core.vector_store import MmapVectorStore
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Returns the vector stored for each text, so both backends index exactly the same data."""
+
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+
+def make_data(n_chunks: int, dims: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_chunks, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i} of note {i // 4}" for i in range(n_chunks)]
+    metadatas = [{"source": f"Note {i // 4}.md", "start_index": (i % 4) * 1000} for i in range(n_chunks)]
+    ids = [f"Note {i // 4}.md#{(i % 4) * 1000}" for i in range(n_chunks)]
+    return vectors, texts, metadatas, ids
+
+
+def open_store(backend: str, path: Path, embeddings: Embeddings):
+    if backend == "mmap":
+        return MmapVectorStore(path, embeddings)
+    return ChromaNoteStore(collection_name="bench", embedding_function=embeddings, persist_directory=str(path))
+
+
+def cold_start(backend: str, path: str, dims: int) -> Dict[str, float]:
+    """Run in a fresh process: open the store, count, answer one query."""
+    start = time.perf_counter()
+    store = open_store(backend, Path(path), PrecomputedEmbeddings({}))
+    store.count()
+    opened = time.perf_counter()
+    store.similarity_search_by_vector([1.0] + [0.0] * (dims - 1), k=10)
+    return {"open_sec": round(opened - start, 4), "first_query_sec": round(time.perf_counter() - opened, 4)}
+
+
+def bench_backend(backend: str, data, queries: np.ndarray, exact: List[List[str]], args, workdir: Path) -> Dict[str, Any]:
+    vectors, texts, metadatas, ids = data
+    path = workdir / backend
+    store = open_store(backend, path, PrecomputedEmbeddings(dict(zip(texts, vectors.tolist()))))
+    result: Dict[str, Any] = {"backend": backend}
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch):
+        store.add_texts(texts[i : i + args.batch], metadatas=metadatas[i : i + args.batch], ids=ids[i : i + args.batch])
+    result["ingest_sec"] = round(time.perf_counter() - start, 2)
+    result["disk_mb"] = round(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1e6, 1)
+
+    timings, hits = [], 0
+    for query, truth in zip(queries, exact):
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(query.tolist(), k=args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += len({doc.id for doc in docs} & set(truth))
+    timings.sort()
+    result["query_p50_ms"] = round(statistics.median(timings), 2)
+    result["query_p95_ms"] = round(timings[int(len(timings) * 0.95)], 2)
+    result[f"recall@{args.k}"] = round(hits / (len(queries) * args.k), 3)
+
+    to_delete = ids[:: 10]
+    start = time.perf_counter()
+    for i in range(0, len(to_delete), args.batch):
+        store.delete(to_delete[i : i + args.batch])
+    result["delete_10pct_sec"] = round(time.perf_counter() - start, 2)
+    if backend == "mmap":
+        start = time.perf_counter()
+        store.compact()
+        result["compact_sec"] = round(time.perf_counter() - start, 2)
+    del store
+
+    out = subprocess.run(
+        [sys.executable, __file__, "--cold-start", backend, str(path), "--dims", str(args.dims)], capture_output=True, text=True, check=True
+    )
+    result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def main(args):
+    data = make_data(args.chunks, args.dims)
+    vectors = data[0]
+    rng = np.random.default_rng(1)
+    # Queries near stored chunks, like a question close to a passage.
+    picks = rng.choice(len(vectors), size=args.queries, replace=False)
+    queries = vectors[picks] + 0.5 * rng.standard_normal((args.queries, args.dims)).astype(np.float32) / np.sqrt(args.dims)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    top = np.argsort(-(queries @ vectors.T), axis=1)[:, : args.k]
+    exact = [[data[3][i] for i in row] for row in top]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            result = bench_backend(backend, data, queries, exact, args, Path(tmp))
+            print(" | ".join(f"{key} {value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50_000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "mmap"])
+    parser.add_argument("--cold-start", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.cold_start:
+        print(json.dumps(cold_start(args.cold_start[0], args.cold_start[1], args.dims)))
+    else:
+        main(args)
@@ -0,0 +1,94 @@
+"""Benchmark vault discovery on a generated deep directory tree.
+
+Compares the previous rglob/iterdir-based walk (with its depth arguments
+passed in the intended order) against the scandir walk, serially and across a
+thread pool.
+
+    python benchmarks/bench_walk.py --fanout 4 --depth 6 --vaults 20
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from noteagent.core.folder_navigation import walk
+
+
+def legacy_walk(current: Path, max_depth: int, depth: int = 0):
+    vaults = []
+    if depth > max_depth:
+        return []
+    try:
+        if (current / ".obsidian").is_dir():
+            md_count = sum(1 for p in current.rglob("*.md") if p.is_file())
+            vaults.append({"path": current.resolve(), "name": current.name or "[root]", "md_count": md_count, "depth": depth})
+        for item in current.iterdir():
+            if item.is_dir():
+                vaults.extend(legacy_walk(item, max_depth, depth + 1))
+    except (PermissionError, OSError):
+        pass
+    return vaults
+
+
+def generate_tree(root: Path, fanout: int, depth: int, n_vaults: int, files_per_dir: int, seed: int = 0) -> int:
+    """Create a ``fanout``-ary directory tree ``depth`` levels deep.
+
+    Files are a mix of markdown and other extensions; ``n_vaults`` random
+    directories get a '.obsidian' folder and some get a 'node_modules' or
+    '.git' directory that discovery should skip.
+    """
+    rng = random.Random(seed)
+    dirs = [root]
+    frontier = [root]
+    for _ in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(fanout):
+                child = parent / f"d{i}"
+                child.mkdir(parents=True)
+                next_frontier.append(child)
+        dirs.extend(next_frontier)
+        frontier = next_frontier
+    for directory in dirs:
+        for i in range(files_per_dir):
+            (directory / f"f{i}{'.md' if i % 2 == 0 else '.txt'}").touch()
+    for directory in rng.sample(dirs, min(n_vaults, len(dirs))):
+        (directory / ".obsidian").mkdir(exist_ok=True)
+    for directory in rng.sample(dirs, min(n_vaults, len(dirs))):
+        junk = directory / rng.choice(["node_modules", ".git"]) / "pkg"
+        junk.mkdir(parents=True, exist_ok=True)
+        for i in range(files_per_dir * 10):
+            (junk / f"README{i}.md").touch()
+    return len(dirs)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--vaults", type=int, default=20)
+    parser.add_argument("--files", type=int, default=6, help="files per directory")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        n_dirs = generate_tree(root, args.fanout, args.depth, args.vaults, args.files)
+        max_depth = args.depth
+        legacy, legacy_sec = timed(legacy_walk, root, max_depth)
+        serial, serial_sec = timed(walk, root, max_depth)
+        threaded, threaded_sec = timed(walk, root, max_depth, workers=args.workers)
+
+        print(f"{n_dirs} directories, {len(serial)} vaults found")
+        print(f"  legacy rglob walk:     {legacy_sec:8.3f}s ({len(legacy)} vaults)")
+        print(f"  scandir walk:          {serial_sec:8.3f}s")
+        print(f"  scandir, {args.workers:>2} threads:   {threaded_sec:8.3f}s")
+        assert serial == threaded
@@ -0,0 +1,86 @@
+"""Deterministic stand-ins for Ollama used by the benchmarks.
+
+Both backends produce the same output for the same input on every run and
+machine, and only spend the latency they are configured with, so timings
+measure this repo's code instead of the model server.
+"""
+
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import LLM
+from langchain_core.outputs import GenerationChunk
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag of words, so texts sharing words end up close.
+
+    Every call costs ``call_ms`` plus ``per_text_ms`` per text. Calls are
+    served one at a time, like a single Ollama model instance.
+    """
+
+    def __init__(self, dims: int = 128, call_ms: float = 0.0, per_text_ms: float = 0.0):
+        self.dims = dims
+        self.call_ms = call_ms
+        self.per_text_ms = per_text_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dims
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dims] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            if self.call_ms or self.per_text_ms:
+                time.sleep((self.call_ms + self.per_text_ms * len(texts)) / 1000)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeLLM(LLM):
+    """Answers with a fixed template after ``latency_ms``, streaming ``n_tokens`` tokens ``token_ms`` apart."""
+
+    model: str = "fake"
+    latency_ms: float = 0.0
+    token_ms: float = 0.0
+    n_tokens: int = 32
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _tokens(self, prompt: str) -> List[str]:
+        digest = hashlib.md5(prompt.encode()).hexdigest()
+        return [f"{digest[i % 32]}{i} " for i in range(self.n_tokens)]
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt))
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return "".join([chunk.text async for chunk in self._astream(prompt)])
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(prompt):
+            if self.token_ms:
+                time.sleep(self.token_ms / 1000)
+            yield GenerationChunk(text=token)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(prompt):
+            if self.token_ms:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield GenerationChunk(text=token)
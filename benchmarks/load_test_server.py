@@ -0,0 +1,119 @@
+"""Load-test the HTTP query server with a stubbed LLM and embedder.
+
+A synthetic vault is indexed into a temporary Chroma collection, a
+``QueryServer`` is started in-process on a free port and ``--clients``
+concurrent clients send ``--requests`` POST /query requests in total. The
+embedder sleeps ``--embed-ms`` per call (plus a little per text) and the LLM
+``--llm-ms`` per answer, so the numbers show queueing and batching
+behaviour rather than model speed. Each run is repeated with micro-batching
+disabled (batch size 1) for comparison.
+
+    python benchmarks/load_test_server.py --notes 500 --requests 400 --clients 32
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.folder_navigation import iter_vault
+from noteagent.core.langchain_rag import build_rag_stages
+from noteagent.core.query_server import QueryServer
+from fake_backends import FakeEmbeddings, FakeLLM
+from synthetic_vault import WORDS, generate_vault
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def drive(url: str, questions: List[str], clients: int) -> Dict[str, Any]:
+    pending = iter(questions)
+    latencies: List[float] = []
+    errors = 0
+
+    async def client(session: httpx.AsyncClient):
+        nonlocal errors
+        for question in pending:
+            start = time.perf_counter()
+            response = await session.post(f"{url}/query", json={"question": question})
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=clients)) as session:
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+    }
+
+
+async def run_server(db: ObsidianChromaDB, answer_stage, questions: List[str], args, embed_batch: int) -> Dict[str, Any]:
+    server = QueryServer(
+        db,
+        answer_stage,
+        budgeter=ContextBudgeter(),
+        port=0,
+        k=args.k,
+        hybrid=True,
+        max_generations=args.max_generations,
+        embed_batch_size=embed_batch,
+    )
+    await server.start()
+    try:
+        # Warm-up pass so the first configuration doesn't pay for loading the HNSW index and BM25 arrays.
+        await drive(f"http://{server.host}:{server.port}", questions[: args.clients * 2], args.clients)
+        result = await drive(f"http://{server.host}:{server.port}", questions, args.clients)
+        result.update(server.batcher.stats())
+    finally:
+        await server.close()
+    return result
+
+
+def main(args):
+    rng = random.Random(0)
+    questions = [" ".join(rng.choice(WORDS) for _ in range(6)) + "?" for _ in range(args.requests)]
+    with tempfile.TemporaryDirectory() as tmp:
+        vault_path = generate_vault(Path(tmp) / "vault", args.notes)
+        embeddings = FakeEmbeddings(call_ms=args.embed_ms, per_text_ms=0.2)
+        db = ObsidianChromaDB(collection_name="load_test", db_location_path=Path(tmp) / "chroma", embeddings=embeddings)
+        start = time.perf_counter()
+        chunks = db.create_new_note_index(iter_vault(vault_path))
+        print(f"Indexed {args.notes} notes / {chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+        _, answer_stage = build_rag_stages(db, llm=FakeLLM(latency_ms=args.llm_ms))
+        for label, embed_batch in (("unbatched", 1), ("batched", args.embed_batch)):
+            result = asyncio.run(run_server(db, answer_stage, questions, args, embed_batch))
+            print(
+                f"{label:>9} | {result['requests']} req, {args.clients} clients | {result['throughput_rps']:7.1f} req/s | "
+                f"p50 {result['p50_ms']:7.1f}ms  p95 {result['p95_ms']:7.1f}ms  p99 {result['p99_ms']:7.1f}ms | "
+                f"avg embed batch {result['embed_avg_batch']} | errors {result['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--embed-ms", type=float, default=15.0, help="stub embedder latency per call")
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="stub LLM latency per answer")
+    parser.add_argument("--max-generations", type=int, default=8)
+    parser.add_argument("--embed-batch", type=int, default=32)
+    main(parser.parse_args())
@@ -0,0 +1,200 @@
+"""Reproducible end-to-end benchmark suite with fake model backends.
+
+For every ``--sizes`` entry a synthetic vault is generated (fixed seed) and
+timed through the whole pipeline with deterministic fake embeddings and LLM:
+
+    load      load_vault (gather + unpack)
+    chunk     NoteChunker over the loaded notes
+    ingest    create_new_note_index into a fresh Chroma collection
+    sync      sync_notes with nothing changed, then after editing --edit-ratio of the notes
+    query     --queries questions through the RAG chain (retrieval, context packing, answer)
+
+Results, including the pipeline span breakdown from ``METRICS``, are written
+to ``--output`` as JSON. ``--compare`` takes an earlier results file and
+flags every timing that got more than ``--tolerance`` slower, exiting with
+status 1 so it can gate CI.
+
+    python benchmarks/run_suite.py --sizes 500 2000 --output bench_results.json
+    python benchmarks/run_suite.py --sizes 500 2000 --compare bench_results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.chunking import NoteChunker
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.folder_navigation import iter_vault, load_vault
+from noteagent.core.langchain_rag import build_rag_stages
+from noteagent.core.metrics import METRICS
+from fake_backends import FakeEmbeddings, FakeLLM
+from synthetic_vault import FOLDERS, WORDS, generate_vault
+
+# Metrics where a larger value is a regression; everything else in the results is informational.
+TIMED_KEYS = ("load_sec", "chunk_sec", "ingest_sec", "sync_noop_sec", "sync_edit_sec", "query_p50_ms", "query_p95_ms", "retrieve_p50_ms")
+
+
+def _quiet():
+    # The pipeline prints progress per batch/note; keep it out of the timings and the report.
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    with _quiet():
+        result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def edit_notes(vault_path: Path, ratio: float, seed: int = 1) -> int:
+    """Append a sentence to a deterministic sample of notes; returns how many were edited."""
+    notes = sorted(p for folder in FOLDERS for p in (vault_path / folder).glob("*.md"))
+    rng = random.Random(seed)
+    edited = rng.sample(notes, max(1, int(len(notes) * ratio)))
+    for path in edited:
+        with path.open("a", encoding="utf-8") as f:
+            f.write("\n" + " ".join(rng.choice(WORDS) for _ in range(12)) + ".\n")
+    return len(edited)
+
+
+def bench_size(n_notes: int, args, workdir: Path) -> Dict[str, Any]:
+    vault_path = generate_vault(
+        workdir / f"vault_{n_notes}",
+        n_notes,
+        links_per_note=args.links,
+        frontmatter_ratio=args.frontmatter_ratio,
+        paragraphs_per_note=args.paragraphs,
+        seed=args.seed,
+    )
+    METRICS.reset()
+    result: Dict[str, Any] = {"notes": n_notes}
+
+    notes, result["load_sec"] = _timed(load_vault, vault_path, workers=args.workers)
+
+    chunker = NoteChunker()
+    chunks, result["chunk_sec"] = _timed(lambda: sum(len(chunker.chunk_note(note)[0]) for note in notes))
+    result["chunks"] = chunks
+
+    embeddings = FakeEmbeddings(dims=args.dims, call_ms=args.embed_ms, per_text_ms=args.embed_text_ms)
+    db = ObsidianChromaDB(collection_name=f"bench_{n_notes}", db_location_path=workdir / f"chroma_{n_notes}", embeddings=embeddings)
+    _, result["ingest_sec"] = _timed(db.create_new_note_index, iter(notes))
+    result["ingest_chunks_per_sec"] = round(chunks / result["ingest_sec"], 1)
+
+    _, result["sync_noop_sec"] = _timed(db.sync_notes, iter_vault(vault_path, workers=args.workers))
+    result["edited_notes"] = edit_notes(vault_path, args.edit_ratio)
+    report, result["sync_edit_sec"] = _timed(db.sync_notes, iter_vault(vault_path, workers=args.workers))
+    result["sync_edit_changed"] = report.get("changed")
+
+    context_stage, answer_stage = build_rag_stages(
+        db, k=args.k, hybrid=True, graph_hops=args.graph_hops, budgeter=ContextBudgeter(), llm=FakeLLM(latency_ms=args.llm_ms)
+    )
+    rng = random.Random(args.seed)
+    questions = [" ".join(rng.choice(WORDS) for _ in range(8)) + "?" for _ in range(args.queries)]
+    retrieve_ms, total_ms = [], []
+    for question in questions:
+        start = time.perf_counter()
+        context = context_stage.invoke(question)
+        retrieved = time.perf_counter()
+        "".join(answer_stage.stream(context))
+        retrieve_ms.append((retrieved - start) * 1000)
+        total_ms.append((time.perf_counter() - start) * 1000)
+    total_ms.sort()
+    result["query_p50_ms"] = round(statistics.median(total_ms), 2)
+    result["query_p95_ms"] = round(total_ms[min(len(total_ms) - 1, int(len(total_ms) * 0.95))], 2)
+    result["retrieve_p50_ms"] = round(statistics.median(retrieve_ms), 2)
+
+    for key in TIMED_KEYS:
+        if key.endswith("_sec"):
+            result[key] = round(result[key], 3)
+    result["spans"] = METRICS.snapshot()["spans"]
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return one line per timing that regressed by more than ``tolerance`` (0.2 = 20% slower)."""
+    previous = {run["notes"]: run for run in baseline["results"]}
+    regressions = []
+    for run in current["results"]:
+        before = previous.get(run["notes"])
+        if before is None:
+            continue
+        for key in TIMED_KEYS:
+            old, new = before.get(key), run.get(key)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{run['notes']} notes: {key} {old} -> {new} ({new / old:.2f}x)")
+    return regressions
+
+
+def main(args) -> int:
+    METRICS.enable()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_notes in args.sizes:
+            run = bench_size(n_notes, args, Path(tmp))
+            results.append(run)
+            print(
+                f"{n_notes:>7} notes / {run['chunks']:>7} chunks | load {run['load_sec']:7.2f}s | chunk {run['chunk_sec']:6.2f}s | "
+                f"ingest {run['ingest_sec']:7.2f}s | sync {run['sync_noop_sec']:6.2f}s / {run['sync_edit_sec']:6.2f}s edited | "
+                f"query p50 {run['query_p50_ms']:7.1f}ms p95 {run['query_p95_ms']:7.1f}ms"
+            )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}): {len(regressions)} regression(s)")
+        for line in regressions:
+            print(f"  {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--links", type=int, default=3, help="wikilinks per paragraph (link density)")
+    parser.add_argument("--frontmatter-ratio", type=float, default=0.7)
+    parser.add_argument("--paragraphs", type=int, default=4, help="paragraphs per note (note length)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--dims", type=int, default=128, help="fake embedding dimensions")
+    parser.add_argument("--embed-ms", type=float, default=0.0, help="fake embedder latency per call")
+    parser.add_argument("--embed-text-ms", type=float, default=0.0, help="fake embedder latency per text")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="fake LLM latency before the first token")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--graph-hops", type=int, default=1)
+    parser.add_argument("--edit-ratio", type=float, default=0.05, help="fraction of notes edited before the second sync")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a timing counts as a regression")
+    sys.exit(main(parser.parse_args()))
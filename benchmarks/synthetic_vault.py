@@ -0,0 +1,81 @@
+"""Generate synthetic Obsidian vaults for benchmarks.
+
+Vaults are deterministic for a given seed so timings can be compared across
+commits.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+WORDS = (
+    "note idea project meeting review draft garden link vault archive reference book "
+    "album trip recipe person place company product game movie show podcast evergreen "
+    "question answer insight summary context source index chunk embed vector graph "
+    "tag folder daily weekly journal habit plan goal task done open closed"
+).split()
+FOLDERS = ["Notes", "References", "Clippings", "Daily", "Projects/Active", "Projects/Archive"]
+TAGS = ["project", "reference", "idea", "person", "book", "meeting", "todo", "evergreen"]
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def generate_vault(
+    root: Path,
+    n_notes: int,
+    links_per_note: int = 3,
+    frontmatter_ratio: float = 0.7,
+    paragraphs_per_note: int = 4,
+    seed: int = 0,
+) -> Path:
+    """Write ``n_notes`` markdown notes with links, tags and frontmatter.
+
+    Args:
+        root: Directory to create the vault in (created if missing).
+        n_notes: Number of markdown notes to write.
+        links_per_note: Wikilinks per note, to uniformly random other notes.
+        frontmatter_ratio: Fraction of notes that get a YAML frontmatter block.
+        paragraphs_per_note: Body paragraphs per note (controls note length).
+        seed: RNG seed; the same arguments always produce the same vault.
+
+    Returns:
+        The vault root path.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    (root / ".obsidian").mkdir(parents=True, exist_ok=True)
+    for folder in FOLDERS:
+        (root / folder).mkdir(parents=True, exist_ok=True)
+
+    names = [f"Note {i:06d}" for i in range(n_notes)]
+    for i, name in enumerate(names):
+        folder = FOLDERS[i % len(FOLDERS)]
+        lines = []
+        tags = rng.sample(TAGS, k=rng.randint(0, 3))
+        if rng.random() < frontmatter_ratio:
+            lines += ["---", f"created: 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"]
+            lines += ["tags:"] + [f"  - {tag}" for tag in tags]
+            lines += [f"rating: {rng.randint(1, 7)}", "---"]
+        lines.append(f"# {name}")
+        for _ in range(paragraphs_per_note):
+            links = " ".join(f"[[{rng.choice(names)}]]" for _ in range(rng.randint(0, links_per_note)))
+            lines.append(" ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 5))) + " " + links)
+        if tags:
+            lines.append(" ".join(f"#{tag}" for tag in tags))
+        (root / folder / f"{name}.md").write_text("\n\n".join(lines) + "\n", encoding="utf-8")
+    return root
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Obsidian vault")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--links", type=int, default=3)
+    parser.add_argument("--frontmatter-ratio", type=float, default=0.7)
+    parser.add_argument("--paragraphs", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_vault(args.root, args.notes, args.links, args.frontmatter_ratio, args.paragraphs, args.seed)
+    print(f"Wrote {args.notes} notes to {args.root}")
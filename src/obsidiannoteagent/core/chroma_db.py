@@ -1,21 +1,40 @@
-from os import setegid
 from pathlib import Path
-import re
-from typing import List, Dict, Any, Optional, cast
+import copy
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.chunking import NoteChunker
+from noteagent.core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from noteagent.core.embeddings import PooledOllamaEmbeddings
+from noteagent.core.lexical_index import BM25Index, reciprocal_rank_fusion
+from noteagent.core.link_graph import LinkGraph
+from noteagent.core.metadata_index import NoteMetadataIndex
+from noteagent.core.metrics import METRICS
+from noteagent.core.sync_manifest import NoteManifest
+from noteagent.core.vector_store import VECTOR_BACKENDS, VECTOR_QUANTIZATIONS, MmapVectorStore, NoteVectorStore
 
 
 class ObsidianChromaDB:
-    _embeddings: OllamaEmbeddings
-    _vectorstore: Chroma
+    _embeddings: Embeddings
+    _vectorstore: NoteVectorStore
+    # Seconds a replaced generation is kept after a rebuild, so queries that already hold it can finish.
+    GENERATION_GC_DELAY_SEC = 5.0
+    # Chroma answers scoped queries covering at least this share of the notes from an over-fetched unfiltered search.
+    CHROMA_POST_FILTER_SHARE = 0.1
+    CHROMA_POST_FILTER_MAX_FETCH = 200
 
     def __init__(
         self,
-        notes_list: List[Dict[str, Any]],
+        notes_list: Optional[Iterable[Dict[str, Any]]] = None,
         collection_name: str = "obsidian_notes",
         db_location_path: str | Path = "./chroma_basic",
         embedding_model: str = "bge-m3",
@@ -23,7 +42,25 @@ class ObsidianChromaDB:
         chunk_size: int = 1200,
         chunk_overlap: int = 200,
         min_text_length: int = 50,
+        ingest_batch_size: int = 256,
+        embedding_batch_size: int = 32,
+        embedding_concurrency: int = 4,
+        embedding_cache_size: int = 500_000,
+        chunker: Optional[NoteChunker] = None,
+        embeddings: Optional[Embeddings] = None,  # shared embedding client (see VaultRegistry)
+        client: Optional[Any] = None,  # shared chromadb client; db_location_path then only holds the side indexes
+        vector_backend: str = "chroma",  # "chroma" or "mmap" (MmapVectorStore, see vector_store.py)
+        vector_quantization: str = "none",  # "int8" or "binary" first-pass codes with full-precision rerank (mmap only)
+        rerank_factor: int = 4,  # quantized search rescores k * rerank_factor candidates
     ):
+        if vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend {vector_backend!r}; expected one of {', '.join(VECTOR_BACKENDS)}")
+        if vector_quantization not in VECTOR_QUANTIZATIONS:
+            raise ValueError(f"Unknown vector quantization {vector_quantization!r}; expected one of {', '.join(VECTOR_QUANTIZATIONS)}")
+        if vector_quantization != "none" and vector_backend != "mmap":
+            raise ValueError("Quantized vectors need vector_backend='mmap'")
+        if "." in collection_name:
+            raise ValueError(f"Collection name {collection_name!r} may not contain '.', which separates index generations")
         self.notes_list = notes_list
         self.collection_name = collection_name
         self.db_location_path: Path = Path(db_location_path).expanduser().resolve()
@@ -32,64 +69,376 @@ class ObsidianChromaDB:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.min_text_length = min_text_length
+        self.ingest_batch_size = ingest_batch_size
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_concurrency = embedding_concurrency
+        self.embedding_cache_size = embedding_cache_size
+        self.chunker = chunker or NoteChunker(chunk_size, chunk_overlap, min_text_length)
+        self.vector_backend = vector_backend
+        self.vector_quantization = vector_quantization
+        self.rerank_factor = rerank_factor
+        # Serialises index writes between the query loop, :sync/:reindex and the vault watcher.
+        self._write_lock = threading.RLock()
+        # Bumped on every write so caches built on query results can tell they are stale.
+        self.index_version = 0
+
+        self._client = client
+        self._init_embeddings(embeddings)
+        self.db_location_path.mkdir(parents=True, exist_ok=True)
+        self._open_generation(self._read_active_generation())
+        self.collect_garbage()
+
+    # -- generations ------------------------------------------------------
+    #
+    # The vectors and side indexes (manifest, BM25, link graph) of a collection
+    # live under a *generation* name: the collection name itself for indexes
+    # built before generations existed, then "<collection>.g1", ".g2", ...
+    # (collection names may not contain "."). "<collection>.active" records
+    # the live generation and the ones it replaced. A full rebuild writes a new
+    # generation next to the live one, which keeps serving queries, and only
+    # then switches the pointer. Only generations recorded there as replaced
+    # are ever collected, never names that merely look like generations.
+
+    @property
+    def _active_pointer_path(self) -> Path:
+        return self.db_location_path / f"{self.collection_name}.active"
+
+    def _read_active_record(self) -> Dict[str, Any]:
+        """The ``.active`` pointer: live generation, last generation number and replaced generations (name -> time replaced)."""
+        record: Dict[str, Any] = {"active": self.collection_name, "serial": 0, "superseded": {}}
+        if not self._active_pointer_path.is_file():
+            return record
+        text = self._active_pointer_path.read_text(encoding="utf-8").strip()
+        try:
+            loaded = json.loads(text)
+        except ValueError:
+            loaded = None
+        if isinstance(loaded, dict):
+            record.update(loaded)
+        elif text:  # a bare generation name, written before replaced generations were recorded
+            record["active"] = text
+        return record
+
+    def _read_active_generation(self) -> str:
+        return self._read_active_record()["active"]
 
-        self._init_embeddings()
+    def _write_active_record(self, record: Dict[str, Any]) -> None:
+        tmp = self._active_pointer_path.with_suffix(".active.tmp")
+        tmp.write_text(json.dumps(record), encoding="utf-8")
+        os.replace(tmp, self._active_pointer_path)
+
+    def _generation_exists(self, generation: str, collections: Set[str]) -> bool:
+        suffixes = (".manifest.json", ".graph.json", ".meta.json", ".bm25.pkl", ".vectors")
+        return generation in collections or any((self.db_location_path / f"{generation}{suffix}").exists() for suffix in suffixes)
+
+    def _open_generation(self, generation: str, fresh: bool = False) -> None:
+        """Point this instance at ``generation``'s vectors and side indexes (``fresh`` empties them first)."""
+        self.generation = generation
+        if fresh:
+            self._remove_generation_files(generation)
+        self.manifest = NoteManifest(
+            self.db_location_path / f"{generation}.manifest.json",
+            embedding_model=self.embedding_model,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            chunker=self.chunker.name,
+        ).load()
+        # Wikilink/tag adjacency for graph-expanded retrieval; filled in as notes are ingested or synced.
+        self.link_graph = LinkGraph(self.db_location_path / f"{generation}.graph.json").load()
+        # Tags, folders, frontmatter and mtimes per note, for scoped (pre-filtered) retrieval.
+        self.metadata_index = NoteMetadataIndex(self.db_location_path / f"{generation}.meta.json").load()
         self._get_or_create_vectorstore()
+        if fresh:
+            self._vectorstore.reset()  # a Chroma collection left over from an interrupted rebuild
+        self._load_lexical_index()
+
+    def _remove_generation_files(self, generation: str) -> None:
+        for suffix in (".manifest.json", ".graph.json", ".meta.json", ".bm25.pkl"):
+            (self.db_location_path / f"{generation}{suffix}").unlink(missing_ok=True)
+        shutil.rmtree(self.db_location_path / f"{generation}.vectors", ignore_errors=True)
+
+    def _drop_generation(self, generation: str, store: Optional[NoteVectorStore]) -> None:
+        try:
+            if store is not None:
+                store.drop()
+            elif self.vector_backend == "chroma" and generation in self._vectorstore.collection_names():
+                self._vectorstore.drop_collection(generation)
+        except Exception as e:  # held open elsewhere; its files stay so the next open retries
+            print(f"Could not drop old index generation {generation}: {e}")
+            return
+        self._remove_generation_files(generation)
 
-    def _init_embeddings(self):
-        """Initialize Ollama embedding model"""
-        self._embeddings = OllamaEmbeddings(
+    def collect_garbage(self) -> List[str]:
+        """Delete the generations this collection's ``.active`` pointer records as replaced.
+
+        A generation is only dropped once it has been replaced for
+        ``GENERATION_GC_DELAY_SEC``, so other processes still querying it can
+        finish. Anything not recorded there (other collections, or a rebuild
+        another process is running) is left alone.
+        """
+        record = self._read_active_record()
+        now = time.time()
+        collections = set(self._vectorstore.collection_names()) if self.vector_backend == "chroma" else set()
+        stale = [
+            name
+            for name, replaced_at in sorted(record["superseded"].items())
+            if name != self.generation and now - replaced_at >= self.GENERATION_GC_DELAY_SEC and self._generation_exists(name, collections)
+        ]
+        for name in stale:
+            self._drop_generation(name, None)
+        return stale
+
+    def rebuild_index(self, notes: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Re-embed ``notes`` into a new generation and switch to it atomically.
+
+        Queries keep using the current generation for the whole rebuild, and
+        index writes (sync, watcher) wait on the write lock until the switch.
+        Failing part-way leaves the current generation active and removes the
+        half-built one; if the process dies instead, the next rebuild reuses
+        and empties its name.
+
+        Returns:
+            Dict with the number of notes, chunks and batches written.
+        """
+        with self._write_lock:
+            record = self._read_active_record()
+            serial = int(record["serial"]) + 1
+            while f"{self.collection_name}.g{serial}" == record["active"]:  # a bare pointer carries no serial
+                serial += 1
+            shadow = copy.copy(self)
+            shadow._open_generation(f"{self.collection_name}.g{serial}", fresh=True)
+            print(f"Building index generation {shadow.generation} (queries keep using {self.generation})...")
+            try:
+                totals = shadow.ingest_notes(notes)
+            except BaseException:
+                self._drop_generation(shadow.generation, shadow._vectorstore)
+                raise
+
+            old_generation, old_store = self.generation, self._vectorstore
+            collections = set(self._vectorstore.collection_names()) if self.vector_backend == "chroma" else set()
+            superseded = {name: replaced_at for name, replaced_at in record["superseded"].items() if self._generation_exists(name, collections)}
+            replaced_at = time.time()
+            for name in {old_generation, record["active"]} - {shadow.generation}:
+                superseded[name] = replaced_at
+            self._write_active_record({"active": shadow.generation, "serial": serial, "superseded": superseded})
+            # Every reader goes through these attributes, so after this point new queries see the new generation.
+            self._vectorstore, self.manifest, self.lexical_index, self.link_graph, self.metadata_index, self.generation = (
+                shadow._vectorstore,
+                shadow.manifest,
+                shadow.lexical_index,
+                shadow.link_graph,
+                shadow.metadata_index,
+                shadow.generation,
+            )
+            self.index_version += 1
+            if self.GENERATION_GC_DELAY_SEC > 0:
+                timer = threading.Timer(self.GENERATION_GC_DELAY_SEC, self._drop_generation, args=(old_generation, old_store))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._drop_generation(old_generation, old_store)
+            return totals
+
+    def _init_embeddings(self, embeddings: Optional[Embeddings] = None):
+        """Initialize Ollama embedding model, behind the on-disk cache unless it is disabled"""
+        if embeddings is not None:
+            self._embeddings = embeddings
+            return
+        self._embeddings = PooledOllamaEmbeddings(
             model=self.embedding_model,
             base_url=self.ollama_url,
+            batch_size=self.embedding_batch_size,
+            max_concurrency=self.embedding_concurrency,
         )
+        if self.embedding_cache_size > 0:
+            # Shared by every collection in this directory; entries are keyed by model.
+            cache = EmbeddingCache(self.db_location_path / "embedding_cache.sqlite", max_entries=self.embedding_cache_size)
+            self._embeddings = CachedEmbeddings(self._embeddings, cache, self.embedding_model)
 
     def _get_or_create_vectorstore(self):
         """Load existing DB or create an empty one"""
-        self._vectorstore = Chroma(
-            collection_name=self.collection_name,
+        if self.vector_backend == "mmap":
+            self._vectorstore = MmapVectorStore(
+                self.db_location_path / f"{self.generation}.vectors",
+                self._embeddings,
+                quantization=self.vector_quantization,
+                rerank_factor=self.rerank_factor,
+            )
+            return
+        from noteagent.core.chroma_store import ChromaNoteStore  # deferred: loads chromadb
+
+        if self._client is not None:
+            self._vectorstore = ChromaNoteStore(client=self._client, collection_name=self.generation, embedding_function=self._embeddings)
+            return
+        self._vectorstore = ChromaNoteStore(
+            collection_name=self.generation,
             embedding_function=self._embeddings,
             persist_directory=str(self.db_location_path),
         )
 
-    def generate_documents(self, note, text_splitter):
-        clean_text = note.get("clean_body", "").strip()
-        if len(clean_text) < self.min_text_length:
-            print(f"Skipping short/empty note: {note.get('relative_path')}")
-            return []
-        metadata = {
-            "source": note.get("relative_path", "unknown"),
-            "note_name": note.get("name", ""),
-            "n_backlinks": note.get("n_backlinks", 0),
-            "n_tags": note.get("n_tags", 0),
-        }
-        chunks = text_splitter.create_documents(
-            [clean_text],
-            metadatas=[metadata] * len(text_splitter.split_text(clean_text)),
-        )
-        return chunks
+    @property
+    def _lexical_index_path(self) -> Path:
+        return self.db_location_path / f"{self.generation}.bm25.pkl"
+
+    def _load_lexical_index(self):
+        """Load the BM25 index saved next to the collection, rebuilding it if it is missing or out of step"""
+        self.lexical_index = BM25Index.load(self._lexical_index_path) or BM25Index()
+        if len(self.lexical_index) != self.count():
+            self.rebuild_lexical_index()
+
+    def rebuild_lexical_index(self, page_size: int = 5000) -> int:
+        """Re-tokenize every stored chunk (no re-embedding). Returns the chunk count."""
+        self.lexical_index.reset()
+        n_chunks = 0
+        for ids, texts in self._vectorstore.iter_texts(page_size):
+            self.lexical_index.add(ids, texts)
+            n_chunks += len(ids)
+        self.lexical_index.save(self._lexical_index_path)
+        return n_chunks
+
+    def _delete_chunks(self, ids: List[str]) -> None:
+        if ids:
+            self._vectorstore.delete(ids=ids)
+            self.lexical_index.remove(ids)
+            self.index_version += 1
+
+    def _save_indexes(self) -> None:
+        with METRICS.span("ingest.save_indexes"):
+            self.manifest.save()
+            self.lexical_index.save(self._lexical_index_path)
+            self.link_graph.save()
+            self.metadata_index.save()
+
+    def _forget_notes(self, relative_paths: Iterable[str]) -> None:
+        for rel_path in relative_paths:
+            self.manifest.forget(rel_path)
+            self.link_graph.remove_note(rel_path)
+            self.metadata_index.remove_note(rel_path)
+
+    def _track_links(self, notes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass notes through unchanged while recording their links, tags and metadata in the side indexes."""
+        for note in notes:
+            self.link_graph.update_note(note)
+            self.metadata_index.update_note(note)
+            yield note
+
+    def generate_documents(self, note: Dict[str, Any]) -> List[Document]:
+        return self.chunker.chunk_note(note)[0]
+
+    def iter_note_chunks(self, notes: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], List[Document], List[str]]]:
+        """Yield ``(note, chunk documents, chunk ids)`` one note at a time."""
+        for note in notes:
+            note_docs, note_ids = self.chunker.chunk_note(note)
+            yield note, note_docs, note_ids
+
+    def iter_chunk_batches(
+        self, notes: Iterable[Dict[str, Any]], batch_size: int
+    ) -> Iterator[Tuple[List[Document], List[str], List[Tuple[Dict[str, Any], List[str]]]]]:
+        """Group streamed chunks into fixed-size embedding batches.
+
+        Yields ``(documents, ids, completed)`` where ``completed`` holds the
+        ``(note, chunk_ids)`` pairs whose last chunk is in this batch, so the
+        manifest only ever records notes that are fully written.
+        """
+        documents: List[Document] = []
+        ids: List[str] = []
+        # [note, chunk ids, chunks not yet flushed], in chunk order
+        pending: deque = deque()
+
+        def take_completed(n_flushed: int) -> List[Tuple[Dict[str, Any], List[str]]]:
+            completed = []
+            while pending and (n_flushed > 0 or pending[0][2] == 0):
+                used = min(pending[0][2], n_flushed)
+                pending[0][2] -= used
+                n_flushed -= used
+                if pending[0][2] > 0:
+                    break
+                note, note_ids, _ = pending.popleft()
+                completed.append((note, note_ids))
+            return completed
+
+        for note, note_docs, note_ids in self.iter_note_chunks(notes):
+            pending.append([note, note_ids, len(note_docs)])
+            documents.extend(note_docs)
+            ids.extend(note_ids)
+            while len(documents) >= batch_size:
+                yield documents[:batch_size], ids[:batch_size], take_completed(batch_size)
+                documents, ids = documents[batch_size:], ids[batch_size:]
+        completed = take_completed(len(documents))
+        if documents or completed:
+            yield documents, ids, completed
+
+    def _embed_batch(self, documents: List[Document]) -> List[List[float]]:
+        return self._embeddings.embed_documents([doc.page_content for doc in documents])
+
+    def _write_batch(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        completed: List[Tuple[Dict[str, Any], List[str]]],
+        embedded: Optional[Future],
+        totals: Dict[str, int],
+        start: float,
+    ) -> None:
+        if documents:
+            with METRICS.span("ingest.embed_wait"):
+                embeddings = embedded.result()
+            with METRICS.span("ingest.add_documents"):
+                self._vectorstore.add_embedded([doc.page_content for doc in documents], embeddings, [doc.metadata for doc in documents], ids)
+            with METRICS.span("ingest.lexical_index"):
+                self.lexical_index.add(ids, [doc.page_content for doc in documents])
+            METRICS.count("chunks_stored", len(documents))
+            self.index_version += 1
+            totals["batches"] += 1
+            totals["chunks"] += len(documents)
+            print(f"  - Batch {totals['batches']}: {len(documents)} chunks ({totals['chunks']} total, {time.perf_counter() - start:.1f}s)")
+        for note, note_ids in completed:
+            self.manifest.record(note, note_ids)
+            self.link_graph.update_note(note)
+            self.metadata_index.update_note(note)
+        totals["notes"] += len(completed)
+
+    def ingest_notes(self, notes: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Stream notes into the collection in fixed-size embedding batches.
+
+        Notes are chunked lazily and batches of ``batch_size`` chunks are
+        pipelined: while one batch is written to the vector store and BM25
+        index, the next one is already being embedded (and the one after it
+        chunked), so the embedding server is kept busy for the whole ingest.
+        At most two batches are in memory, so peak memory is bounded by the
+        batch size rather than the vault size.
+
+        Returns:
+            Dict with the number of notes, chunks and batches written.
+        """
+        batch_size = batch_size or self.ingest_batch_size
+        start = time.perf_counter()
+        totals = {"notes": 0, "chunks": 0, "batches": 0}
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-ahead") as executor:
+            pending = None
+            for documents, ids, completed in self.iter_chunk_batches(notes, batch_size):
+                embedded = executor.submit(self._embed_batch, documents) if documents else None
+                if pending is not None:
+                    self._write_batch(*pending, totals, start)
+                pending = (documents, ids, completed, embedded)
+            if pending is not None:
+                self._write_batch(*pending, totals, start)
+        self._save_indexes()
+        return totals
 
     def _index_notes(self, notes_list):
-        documents = []
+        return self._print_ingest_report(self.ingest_notes(notes_list))
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""],
-            add_start_index=True,
-        )
-        for note in notes_list:
-            documents.extend(self.generate_documents(note, text_splitter))
-        if not documents:
+    def _print_ingest_report(self, totals: Dict[str, int]) -> int:
+        if not totals["chunks"]:
             print("No valid text to index.")
             return 0
-        self._vectorstore.add_documents(documents)
         print(f"Ingestion complete")
-        print(f"  - Total notes processed: {len(notes_list)}")
-        print(f"  - Total chunks added:    {len(documents)}")
+        print(f"  - Total notes processed: {totals['notes']}")
+        print(f"  - Total chunks added:    {totals['chunks']}")
         print(f"  - Collection:             {self.collection_name}")
         print(f"  - Persisted to:           {self.db_location_path}")
-        return len(documents)
+        return totals["chunks"]
 
     def check_if_existing_vectorstorage(self):
         note_count = self.count()
@@ -98,14 +447,106 @@ class ObsidianChromaDB:
         else:
             return False
 
-    def create_new_note_index(self):
-        if self._vectorstore is None:
-            self._get_or_create_vectorstore()
-        else:
-            self._vectorstore.delete_collection()
-            self._get_or_create_vectorstore()
+    def create_new_note_index(self, notes: Optional[Iterable[Dict[str, Any]]] = None):
+        """Re-embed ``notes`` (or the constructor's notes_list) into a new generation that replaces the current one."""
+        return self._print_ingest_report(self.rebuild_index(notes if notes is not None else self.notes_list or []))
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """The stored index was built with other settings (or has no manifest), so the next sync rebuilds it."""
+        return not self.manifest.compatible or (self.manifest.is_empty() and self.count() > 0)
+
+    @property
+    def query_compatible(self) -> bool:
+        """Whether the stored vectors can answer queries embedded with the current model."""
+        return "embedding_model" not in self.manifest.stale_params
+
+    def sync_notes(self, notes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Bring the collection in line with a freshly loaded vault.
+
+        Diffs ``notes`` against the manifest, deletes the chunks of changed and
+        removed notes by id in a single call, then embeds only the added and
+        changed notes. Falls back to a full rebuild (see ``rebuild_index``,
+        queries keep using the old vectors meanwhile) when there is no usable
+        manifest for a non-empty collection (e.g. an index built before the
+        manifest existed, or with a different embedding model / chunk size).
+
+        ``notes`` may be a generator such as ``iter_vault``; only the added and
+        changed notes are held in memory.
+
+        Returns:
+            Dict of note/chunk counts and per-phase timings in seconds.
+        """
+        with self._write_lock:
+            start = time.perf_counter()
+
+            if self.needs_rebuild:
+                stale = ", ".join(self.manifest.stale_params) or "manifest missing"
+                print(f"Index built with different settings ({stale}) — rebuilding index...")
+                totals = self.rebuild_index(notes)
+                return {
+                    "mode": "full_rebuild",
+                    "added": totals["notes"],
+                    "changed": 0,
+                    "deleted": 0,
+                    "unchanged": 0,
+                    "chunks_added": totals["chunks"],
+                    "chunks_deleted": 0,
+                    "total_sec": round(time.perf_counter() - start, 3),
+                }
+
+            # Unchanged notes are not re-ingested, but the graph still needs their links.
+            diff = self.manifest.diff(self._track_links(notes))
+            diff_done = time.perf_counter()
+
+            changed_paths = [note.get("relative_path", "unknown") for note in diff["changed"]]
+            stale_ids = self.manifest.chunk_ids_for(changed_paths + diff["deleted"])
+            self._delete_chunks(stale_ids)
+            self._forget_notes(diff["deleted"])
+            delete_done = time.perf_counter()
+
+            totals = self.ingest_notes(diff["added"] + diff["changed"])
+            embed_done = time.perf_counter()
 
-        self._index_notes(self.notes_list)
+            report = {
+                "mode": "incremental",
+                "added": len(diff["added"]),
+                "changed": len(diff["changed"]),
+                "deleted": len(diff["deleted"]),
+                "unchanged": len(diff["unchanged"]),
+                "chunks_added": totals["chunks"],
+                "chunks_deleted": len(stale_ids),
+                "diff_sec": round(diff_done - start, 3),
+                "delete_sec": round(delete_done - diff_done, 3),
+                "embed_sec": round(embed_done - delete_done, 3),
+                "total_sec": round(embed_done - start, 3),
+            }
+            return report
+
+    def apply_note_changes(self, updated_notes: List[Dict[str, Any]], deleted_paths: Iterable[str] = ()) -> Dict[str, Any]:
+        """Re-embed a handful of touched notes and drop deleted ones.
+
+        Used by the vault watcher: only the given notes are looked at, notes
+        whose content hash is unchanged are skipped, and stale chunks are
+        deleted by id before the new ones are written.
+        """
+        with self._write_lock:
+            start = time.perf_counter()
+            to_embed = [note for note in self._track_links(updated_notes) if self.manifest.classify(note) != "unchanged"]
+            deleted = [rel_path for rel_path in deleted_paths if rel_path in self.manifest.entries]
+
+            stale_ids = self.manifest.chunk_ids_for([note.get("relative_path", "unknown") for note in to_embed] + deleted)
+            self._delete_chunks(stale_ids)
+            self._forget_notes(deleted)
+
+            totals = self.ingest_notes(to_embed)
+            return {
+                "updated": len(to_embed),
+                "deleted": len(deleted),
+                "chunks_added": totals["chunks"],
+                "chunks_deleted": len(stale_ids),
+                "total_sec": round(time.perf_counter() - start, 3),
+            }
 
     def similarity_search(
         self,
@@ -134,39 +575,166 @@ class ObsidianChromaDB:
     ) -> List[tuple[Document, float]]:
         return self._vectorstore.similarity_search_with_score(query, k=k, filter=filter)
 
+    def lexical_search(self, query: str, k: int = 6) -> List[Tuple[str, float]]:
+        """BM25 keyword search; returns ``(chunk_id, score)`` pairs, best first."""
+        return self.lexical_index.search(query, k=k)
+
+    def scope_sources(self, scope: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """Notes matching ``scope`` (see ``NoteMetadataIndex.select``), or ``None`` when it is empty."""
+        with METRICS.span("retrieve.scope"):
+            return self.metadata_index.select(scope)
+
+    @staticmethod
+    def source_filter(sources: Optional[Set[str]]) -> Optional[Dict[str, Any]]:
+        """Vector store ``filter`` for the chunks of ``sources``.
+
+        Matching on ``source`` lets the mmap backend score only the rows of the
+        notes in scope, so a scoped query costs less as the vault grows.
+        """
+        return None if sources is None else {"source": {"$in": list(sources)}}
+
+    def _search_sources(self, embedding: List[float], k: int, sources: Optional[Set[str]]) -> List[Document]:
+        """Top ``k`` chunks among ``sources`` (``None``: all notes, empty: none)."""
+        if sources is None:
+            return self._vectorstore.similarity_search_by_vector(embedding, k=k)
+        if not sources:
+            return []  # nothing in scope (Chroma rejects an empty $in)
+        if self.vector_backend == "chroma":
+            # Chroma scans every chunk matching a where-clause, so a wide scope is cheaper to cut out of an unfiltered top list.
+            share = len(sources) / max(1, len(self.manifest.entries))
+            fetch_k = int(k * 1.5 / share) + 1 if share >= self.CHROMA_POST_FILTER_SHARE else 0
+            if 0 < fetch_k <= self.CHROMA_POST_FILTER_MAX_FETCH:
+                hits = [doc for doc in self._vectorstore.similarity_search_by_vector(embedding, k=fetch_k) if doc.metadata.get("source") in sources]
+                if len(hits) >= k:
+                    return hits[:k]
+        return self._vectorstore.similarity_search_by_vector(embedding, k=k, filter=self.source_filter(sources))
+
+    def dense_search(self, embedding: List[float], k: int = 6, scope: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Nearest chunks to ``embedding``, only among the notes in ``scope`` when one is given."""
+        sources = self.scope_sources(scope)
+        with METRICS.span("retrieve.dense"):
+            return self._search_sources(embedding, k, sources)
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 6,
+        fetch_k: int = 30,
+        embedding: Optional[List[float]] = None,
+        rrf_k: int = 60,
+        scope: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """Fuse dense and BM25 rankings with reciprocal rank fusion.
+
+        Args:
+            query: The question text (used for BM25 and, if no ``embedding`` is given, embedded).
+            k: Number of chunks to return.
+            fetch_k: Candidates taken from each retriever before fusion.
+            embedding: Precomputed query embedding, to avoid embedding twice.
+            rrf_k: RRF damping constant; larger values flatten the rank weights.
+            scope: Tags, folder, modification dates and frontmatter values the
+                notes must match (see ``NoteMetadataIndex.select``); both
+                rankings only consider chunks of those notes.
+        """
+        if embedding is None:
+            embedding = self._embeddings.embed_query(query)
+        sources = self.scope_sources(scope)
+        if sources is not None and not sources:
+            return []
+        with METRICS.span("retrieve.dense"):
+            dense_docs = self._search_sources(embedding, fetch_k, sources)
+        with METRICS.span("retrieve.bm25"):
+            scoped_ids = None if sources is None else self.manifest.chunk_ids_for(sorted(sources))
+            lexical_ids = [chunk_id for chunk_id, _ in self.lexical_index.search(query, k=fetch_k, ids=scoped_ids)]
+        fused_ids = reciprocal_rank_fusion([[doc.id for doc in dense_docs], lexical_ids], k=rrf_k, limit=k)
+
+        by_id = {doc.id: doc for doc in dense_docs}
+        missing = [chunk_id for chunk_id in fused_ids if chunk_id not in by_id]
+        if missing:
+            by_id.update({doc.id: doc for doc in self._vectorstore.get_by_ids(missing)})
+        return [by_id[chunk_id] for chunk_id in fused_ids if chunk_id in by_id]
+
+    def graph_search(
+        self,
+        query: str,
+        k: int = 6,
+        hops: int = 1,
+        expand_notes: int = 3,
+        hybrid: bool = True,
+        embedding: Optional[List[float]] = None,
+        scope: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """Retrieve ``k`` chunks, then add the best chunk of notes linked to them.
+
+        The notes behind the top-``k`` hits seed ``LinkGraph.expand`` (earlier
+        hits weigh more); up to ``expand_notes`` notes reached over wikilinks or
+        shared tags within ``hops`` hops are added, each represented by its
+        chunk closest to the query. This pulls in the notes that connect the
+        hits without raising ``k`` for the whole search. With a ``scope`` both
+        the hits and the added notes stay inside it.
+        """
+        if embedding is None:
+            embedding = self._embeddings.embed_query(query)
+        if hybrid:
+            hits = self.hybrid_search(query, k=k, embedding=embedding, scope=scope)
+        else:
+            hits = self.dense_search(embedding, k=k, scope=scope)
+
+        seeds: Dict[str, float] = {}
+        for rank, doc in enumerate(hits):
+            source = doc.metadata.get("source", "unknown")
+            seeds[source] = seeds.get(source, 0.0) + 1.0 / (rank + 1)
+        # Ask for a few spare notes: very short notes are in the graph but have no chunks.
+        with METRICS.span("retrieve.graph_expand"):
+            expanded = self.link_graph.expand(seeds, hops=hops, limit=expand_notes * 2)
+        if scope:
+            sources = self.scope_sources(scope)
+            expanded = [(path, score) for path, score in expanded if sources is None or path in sources]
+        if not expanded:
+            return hits
+
+        paths = [path for path, _ in expanded]
+        with METRICS.span("retrieve.graph_chunks"):
+            candidates = self._vectorstore.similarity_search_by_vector(embedding, k=len(paths) * 3, filter={"source": {"$in": paths}})
+        best: Dict[str, Document] = {}
+        for doc in candidates:
+            best.setdefault(doc.metadata.get("source", "unknown"), doc)
+        extra = []
+        for path, score in expanded:
+            if path in best and len(extra) < expand_notes:
+                best[path].metadata["graph_score"] = round(score, 4)
+                extra.append(best[path])
+        return hits + extra
+
     def count(self) -> int:
-        return self._vectorstore._collection.count()
+        return self._vectorstore.count()
 
     def add_notes_to_index(self, notes):
         if self._vectorstore is None:
             raise ValueError(
                 "You need to create a new note index before you add to one"
             )
-        existing_sources = {
-            m.get("source", "")
-            for m in self._vectorstore.get(include=["metadatas"])["metadatas"]
-            if m
-        }
+        # The manifest already lists every indexed note; re-adding a note is an upsert by chunk id anyway.
+        existing_sources = set(self.manifest.entries)
 
-        new_notes = [
+        new_notes = (
             note
             for note in notes
             if note.get("relative_path", "unknown") not in existing_sources
-        ]
+        )
         processed_notes = self._index_notes(new_notes)
         print(f"Succesfully processed {processed_notes} notes!")
 
     def clear_collection(self) -> None:
         """Delete everything in the collection"""
-        self._vectorstore.delete_collection()
-        self._vectorstore = Chroma(
-            collection_name=self.collection_name,
-            embedding_function=self._embeddings,
-            persist_directory=str(self.db_location_path),
-        )
+        self.rebuild_index([])
 
     def delete_by_source(self, source_vaule: str) -> None:
-        self._vectorstore.delete(where={"source": source_vaule})
+        with self._write_lock:
+            ids = self._vectorstore.ids_for_source(source_vaule)
+            self._delete_chunks(ids)
+            self._forget_notes([source_vaule])
+            self._save_indexes()
 
     def get_status(self) -> dict:
         if self._vectorstore is None:
@@ -175,9 +743,20 @@ class ObsidianChromaDB:
         return {
             "status": "ready",
             "collection": self.collection_name,
+            "generation": self.generation,
+            "needs_rebuild": self.needs_rebuild,
             "location": str(self.db_location_path),
-            "document_count": self._vectorstore._collection.count(),
+            "document_count": self.count(),
+            "vector_backend": self.vector_backend,
             "embedding_model": self.embedding_model,
             "chunk_size": self.chunk_size,
             "chunk_overlap": self.chunk_overlap,
+            "chunker": self.chunker.name,
+            "index_version": self.index_version,
+            "manifest_notes": len(self.manifest.entries),
+            **self.lexical_index.stats(),
+            **self.link_graph.stats(),
+            **self.metadata_index.stats(),
+            **(self._vectorstore.stats() if hasattr(self._vectorstore, "stats") else {}),
+            **(self._embeddings.stats() if hasattr(self._embeddings, "stats") else {}),
         }
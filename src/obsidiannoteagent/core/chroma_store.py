@@ -0,0 +1,57 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from noteagent.core.vector_store import NoteVectorStore
+
+
+class ChromaNoteStore(Chroma, NoteVectorStore):
+    """The original ``langchain_chroma.Chroma`` backend.
+
+    Kept out of ``vector_store`` because importing ``langchain_chroma`` loads
+    chromadb (about a second); mmap-only processes never pay for it.
+    """
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def iter_texts(self, page_size: int = 5000) -> Iterator[Tuple[List[str], List[str]]]:
+        offset = 0
+        while True:
+            page = self._collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], [text or "" for text in page["documents"]]
+            offset += len(page["ids"])
+
+    def iter_embeddings(self, page_size: int = 5000) -> Iterator[Tuple[List[str], np.ndarray, List[dict]]]:
+        offset = 0
+        while True:
+            page = self._collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], np.asarray(page["embeddings"], dtype=np.float32), [metadata or {} for metadata in page["metadatas"]]
+            offset += len(page["ids"])
+
+    def ids_for_source(self, source: str) -> List[str]:
+        return self.get(where={"source": source}, include=[])["ids"]
+
+    def reset(self) -> None:
+        self.reset_collection()
+
+    def drop(self) -> None:
+        self.delete_collection()
+
+    def add_embedded(self, texts: List[str], embeddings: List[List[float]], metadatas: List[dict], ids: List[str]) -> List[str]:
+        # Chroma rejects empty metadata dicts; None means "no metadata".
+        cleaned: List[Optional[dict]] = [metadata or None for metadata in metadatas]
+        self._collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=cleaned)
+        return ids
+
+    def collection_names(self) -> List[str]:
+        """Every collection in this store's Chroma client (``list_collections`` returns names or objects by version)."""
+        return [getattr(collection, "name", collection) for collection in self._client.list_collections()]
+
+    def drop_collection(self, name: str) -> None:
+        self._client.delete_collection(name)
@@ -0,0 +1,107 @@
+from typing import List, Dict, Any, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import MarkdownTextSplitter, RecursiveCharacterTextSplitter, TextSplitter
+
+from noteagent.core.metadata_index import frontmatter_fields, note_folder, note_tags, note_timestamp
+from noteagent.core.metrics import METRICS
+
+
+class NoteChunker:
+    """Splits a note's clean body exactly once and builds its chunk Documents.
+
+    The splitter is created once and reused for every note. Any LangChain
+    ``TextSplitter`` can be swapped in; ``NoteChunker.markdown`` splits on
+    markdown headers first. Each chunk gets a stable id made of the note path
+    and the chunk's start offset, so re-ingesting a note upserts by id.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+        min_text_length: int = 50,
+        splitter: Optional[TextSplitter] = None,
+        name: str = "recursive",
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.min_text_length = min_text_length
+        self.name = name
+        self.splitter = splitter or RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""],
+        )
+
+    @classmethod
+    def markdown(cls, chunk_size: int = 1200, chunk_overlap: int = 200, min_text_length: int = 50) -> "NoteChunker":
+        """Chunker that prefers splitting on markdown headers, then paragraphs."""
+        splitter = MarkdownTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return cls(chunk_size, chunk_overlap, min_text_length, splitter=splitter, name="markdown")
+
+    @staticmethod
+    def chunk_id(source: str, start_index: int) -> str:
+        return f"{source}#{start_index}"
+
+    def split(self, text: str) -> List[Tuple[int, str]]:
+        """Split ``text`` once, returning ``(start_index, chunk)`` pairs.
+
+        Start offsets are located the same way LangChain's ``add_start_index``
+        does, searching forward from the end of the previous chunk minus the
+        overlap.
+        """
+        overlap = getattr(self.splitter, "_chunk_overlap", self.chunk_overlap)
+        spans = []
+        index = 0
+        previous_chunk_len = 0
+        for chunk in self.splitter.split_text(text):
+            offset = index + previous_chunk_len - overlap
+            index = text.find(chunk, max(0, offset))
+            spans.append((index, chunk))
+            previous_chunk_len = len(chunk)
+        return spans
+
+    def note_metadata(self, note: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata copied onto every chunk of ``note``.
+
+        Besides the source and counts, chunks carry typed fields a vector store
+        ``filter`` can match: ``folder``, ``modified_ts`` (Unix time), one
+        ``tag:<name>: True`` key per tag and ``fm:<key>`` for each scalar
+        frontmatter value. Tags are separate boolean keys because Chroma
+        metadata cannot hold lists.
+        """
+        source = note.get("relative_path", "unknown")
+        metadata: Dict[str, Any] = {
+            "source": source,
+            "note_name": note.get("name", ""),
+            "n_backlinks": note.get("n_backlinks", 0),
+            "n_tags": note.get("n_tags", 0),
+            "folder": note_folder(source),
+        }
+        modified = note_timestamp(note)
+        if modified is not None:
+            metadata["modified_ts"] = modified
+        metadata.update({f"tag:{tag}": True for tag in note_tags(note)})
+        metadata.update({f"fm:{key}": value for key, value in frontmatter_fields(note).items()})
+        return metadata
+
+    def chunk_note(self, note: Dict[str, Any]) -> Tuple[List[Document], List[str]]:
+        """Return the note's chunk Documents and their ids (empty for short notes)."""
+        clean_text = (note.get("clean_body", "") or "").strip()
+        if len(clean_text) < self.min_text_length:
+            print(f"Skipping short/empty note: {note.get('relative_path')}")
+            return [], []
+
+        with METRICS.span("ingest.chunk"):
+            metadata = self.note_metadata(note)
+            source = metadata["source"]
+            documents, ids = [], []
+            for i, (start_index, chunk) in enumerate(self.split(clean_text)):
+                # find() only misses if the splitter rewrote the chunk text; keep ids unique regardless.
+                chunk_id = self.chunk_id(source, start_index) if start_index >= 0 else f"{source}#chunk{i}"
+                documents.append(Document(page_content=chunk, metadata={**metadata, "start_index": start_index}, id=chunk_id))
+                ids.append(chunk_id)
+        METRICS.count("chunks_generated", len(documents))
+        return documents, ids
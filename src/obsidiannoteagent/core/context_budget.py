@@ -0,0 +1,187 @@
+import math
+import re
+import threading
+from typing import Callable, List, Dict, Any, Optional, Set
+
+from langchain_core.documents import Document
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Splitters strip the separator between chunks, so neighbouring chunks that don't overlap
+# are usually a newline or two apart; those gaps are whitespace and are merged as newlines.
+MAX_WHITESPACE_GAP = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English prose and markdown)."""
+    return math.ceil(len(text) / 4)
+
+
+def _shingles(text: str, size: int = 3) -> Set[int]:
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i : i + size])) for i in range(len(words) - size + 1)}
+
+
+class Passage:
+    """A contiguous span of one note, built from one or more retrieved chunks."""
+
+    __slots__ = ("source", "start", "end", "text", "rank", "n_chunks", "shingles")
+
+    def __init__(self, source: str, start: int, text: str, rank: int):
+        self.source = source
+        self.start = start
+        self.end = start + len(text)
+        self.text = text
+        self.rank = rank
+        self.n_chunks = 1
+        self.shingles: Set[int] = set()
+
+    def absorb(self, start: int, text: str, rank: int) -> None:
+        """Append an overlapping or adjacent chunk that starts at ``start``."""
+        end = start + len(text)
+        if start > self.end:
+            self.text += "\n" * (start - self.end) + text
+            self.end = end
+        elif end > self.end:
+            self.text += text[self.end - start :]
+            self.end = end
+        self.rank = min(self.rank, rank)
+        self.n_chunks += 1
+
+
+class ContextBudgeter:
+    """Turns retrieved chunks into a compact, token-budgeted context string.
+
+    1. Chunks of the same note whose spans overlap (the splitter's
+       ``chunk_overlap``) or are only separated by a stripped separator are
+       merged into one passage, so the overlap is sent once.
+    2. Passages whose word 3-grams are mostly contained in a better-ranked
+       passage (clipped copies, templates, repeated boilerplate) are dropped.
+    3. Passages are added in retrieval order until ``max_tokens`` is reached,
+       then rendered grouped by note under a ``### <source>`` header.
+
+    Token counts use ``token_counter`` (a chars/4 estimate by default).
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 6000,
+        dedup_threshold: float = 0.85,
+        min_passage_tokens: int = 64,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_passage_tokens = min_passage_tokens
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+        self._totals = {"queries": 0, "tokens_naive": 0, "tokens_packed": 0, "tokens_saved": 0}
+
+    def merge_chunks(self, docs: List[Document]) -> List[Passage]:
+        """Merge overlapping chunks per note; passages come back ordered by their best rank."""
+        by_source: Dict[str, List[tuple]] = {}
+        loose: List[Passage] = []
+        for rank, doc in enumerate(docs):
+            source = doc.metadata.get("source", "unknown")
+            start = doc.metadata.get("start_index")
+            if not isinstance(start, int) or start < 0:
+                loose.append(Passage(source, -1, doc.page_content, rank))
+                continue
+            by_source.setdefault(source, []).append((start, rank, doc.page_content))
+
+        passages = list(loose)
+        for source, spans in by_source.items():
+            spans.sort()
+            current: Optional[Passage] = None
+            for start, rank, text in spans:
+                if current is not None and start <= current.end + MAX_WHITESPACE_GAP:
+                    current.absorb(start, text, rank)
+                else:
+                    current = Passage(source, start, text, rank)
+                    passages.append(current)
+        passages.sort(key=lambda passage: passage.rank)
+        return passages
+
+    def drop_near_duplicates(self, passages: List[Passage]) -> List[Passage]:
+        kept: List[Passage] = []
+        for passage in passages:
+            passage.shingles = _shingles(passage.text)
+            duplicate = False
+            for other in kept:
+                smaller = min(len(passage.shingles), len(other.shingles))
+                if smaller and len(passage.shingles & other.shingles) / smaller >= self.dedup_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(passage)
+        return kept
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        # Cut at a word boundary near the estimated character budget, then trim until it fits.
+        cut = text[: max_tokens * 4].rsplit(" ", 1)[0]
+        while cut and self.token_counter(cut + " …") > max_tokens:
+            cut = cut[: int(len(cut) * 0.9)].rsplit(" ", 1)[0]
+        return cut + " …" if cut else ""
+
+    def assemble(self, docs: List[Document]) -> Dict[str, Any]:
+        """Build the context for ``docs`` (in retrieval order).
+
+        Returns:
+            Dict with ``context`` (the string for the prompt) and ``report``:
+            chunk/passage counts, the naive token count of joining every chunk,
+            the packed token count and the tokens saved.
+        """
+        naive_tokens = self.token_counter("\n\n".join(doc.page_content for doc in docs))
+        passages = self.merge_chunks(docs)
+        n_merged = len(passages)
+        passages = self.drop_near_duplicates(passages)
+
+        selected: Dict[str, List[str]] = {}
+        used = 0
+        truncated = 0
+        dropped_for_budget = 0
+        for passage in passages:
+            header_cost = 0 if passage.source in selected else self.token_counter(f"### {passage.source}\n\n")
+            remaining = self.max_tokens - used - header_cost
+            text = passage.text
+            cost = self.token_counter(text)
+            if cost > remaining:
+                if remaining < self.min_passage_tokens:
+                    dropped_for_budget += 1
+                    continue
+                text = self._truncate(text, remaining)
+                if not text:
+                    dropped_for_budget += 1
+                    continue
+                cost = self.token_counter(text)
+                truncated += 1
+            selected.setdefault(passage.source, []).append(text)
+            used += header_cost + cost
+
+        context = "\n\n".join(f"### {source}\n\n" + "\n\n[…]\n\n".join(texts) for source, texts in selected.items())
+        packed_tokens = self.token_counter(context)
+        report = {
+            "chunks": len(docs),
+            "passages": sum(len(texts) for texts in selected.values()),
+            "notes": len(selected),
+            "merged_chunks": len(docs) - n_merged,
+            "duplicates_dropped": n_merged - len(passages),
+            "over_budget_dropped": dropped_for_budget,
+            "truncated": truncated,
+            "tokens_naive": naive_tokens,
+            "tokens_packed": packed_tokens,
+            "tokens_saved": naive_tokens - packed_tokens,
+        }
+        with self._lock:
+            self._totals["queries"] += 1
+            self._totals["tokens_naive"] += naive_tokens
+            self._totals["tokens_packed"] += packed_tokens
+            self._totals["tokens_saved"] += naive_tokens - packed_tokens
+        return {"context": context, "report": report}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {f"context_{k}": v for k, v in self._totals.items()}
+            stats["context_max_tokens"] = self.max_tokens
+            return stats
@@ -0,0 +1,150 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+
+from langchain_core.embeddings import Embeddings
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding store keyed by (embedding model, sha256 of the text).
+
+    Vectors are stored as float32 blobs in SQLite. Once more than
+    ``max_entries`` vectors are stored, the least recently used ones are
+    evicted. The file is shared by every process using the same cache path
+    (CLI, server, registry), so the row count is always read from SQLite
+    rather than tracked per instance.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 500_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for i in range(0, len(hashes), 500):
+                part = hashes[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+                for hash_, blob in rows:
+                    found[hash_] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, hash_) for hash_ in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, hash_, array("f", vector).tobytes(), now) for hash_, vector in vectors.items()],
+            )
+            if self._conn.total_changes > before:
+                # The insert holds the write lock until commit, so no other process can add rows between this count and the delete.
+                size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if size > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (size - self.max_entries,),
+                    )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an ``EmbeddingCache``.
+
+    Only texts missing from the cache reach the wrapped embedder, each unique
+    text once per call.
+    """
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache, model: str):
+        self.inner = inner
+        self.cache = cache
+        self.model = model
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.get_many(self.model, hashes)
+
+        missing: Dict[str, str] = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in found and hash_ not in missing:
+                missing[hash_] = text
+        if missing:
+            computed = dict(zip(missing, self.inner.embed_documents(list(missing.values()))))
+            self.cache.put_many(self.model, computed)
+            found.update(computed)
+
+        with self._stats_lock:
+            self._misses += len(missing)
+            self._hits += len(texts) - len(missing)
+        return [found[hash_] for hash_ in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            cache_stats = {
+                "embedding_cache_hits": self._hits,
+                "embedding_cache_misses": self._misses,
+                "embedding_cache_hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "embedding_cache_entries": len(self.cache),
+            }
+        inner_stats = self.inner.stats() if hasattr(self.inner, "stats") else {}
+        return {**inner_stats, **cache_stats}
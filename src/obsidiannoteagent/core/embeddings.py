@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.metrics import METRICS
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """Ollama embedding client that batches and embeds concurrently.
+
+    Texts are split into ``batch_size`` requests against Ollama's ``/api/embed``
+    endpoint and up to ``max_concurrency`` requests are in flight at once over
+    a shared keep-alive connection pool. Transient failures (connection errors,
+    429/5xx) are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434",
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_sec: float = 0.5,
+        timeout_sec: float = 120.0,
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+
+        self._client = httpx.Client(
+            base_url=base_url,
+            timeout=timeout_sec,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ollama-embed")
+        self._stats_lock = threading.Lock()
+        self._embedded = 0
+        self._requests = 0
+        self._retries = 0
+        self._busy_sec = 0.0
+
+    def _post_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                response = self._client.post("/api/embed", json={"model": self.model, "input": texts})
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    embeddings = response.json()["embeddings"]
+                    if len(embeddings) != len(texts):
+                        raise ValueError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+                    return embeddings
+                error: Exception = httpx.HTTPStatusError(
+                    f"Ollama returned {response.status_code}", request=response.request, response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            METRICS.count("embed_errors")
+            if attempt >= self.max_retries:
+                raise error
+            with self._stats_lock:
+                self._retries += 1
+            time.sleep(self.backoff_sec * (2**attempt))
+            attempt += 1
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self._post_batch(texts)
+        with self._stats_lock:
+            self._requests += 1
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        with METRICS.span("embed.documents"):
+            if len(batches) == 1:
+                results = [self._embed_batch(batches[0])]
+            else:
+                results = list(self._executor.map(self._embed_batch, batches))
+        METRICS.count("texts_embedded", len(texts))
+        embeddings = [embedding for batch in results for embedding in batch]
+        with self._stats_lock:
+            self._embedded += len(texts)
+            self._busy_sec += time.perf_counter() - start
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "embedded_chunks": self._embedded,
+                "embed_requests": self._requests,
+                "embed_retries": self._retries,
+                "embed_seconds": round(self._busy_sec, 3),
+                "chunks_per_sec": round(self._embedded / self._busy_sec, 1) if self._busy_sec else 0.0,
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._client.close()
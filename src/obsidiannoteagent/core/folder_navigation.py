@@ -1,57 +1,170 @@
+import functools
+import multiprocessing as mp
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import obsidiantools.api as otools
+import obsidiantools.md_utils as md_utils
 import pandas as pd
 
+from noteagent.core.metrics import METRICS
 
-def walk(current: Path, max_depth: int, depth: int = 0) -> List[Dict]:
-    """Recursively search for Obsidian vaults under the given path.
+
+SKIP_DIRS = {".git", "node_modules", ".trash"}
+
+
+def _scan_dir(path: str) -> Tuple[List[str], int, bool]:
+    """One ``os.scandir`` pass: subdirectories, .md file count, has .obsidian.
+
+    Uses the d_type information scandir already returns, so no extra stat
+    call is made per entry on filesystems that provide it.
+    """
+    subdirs: List[str] = []
+    md_count = 0
+    is_vault = False
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name == ".obsidian":
+                            is_vault = True
+                        elif entry.name not in SKIP_DIRS:
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(".md") and entry.is_file():
+                        md_count += 1
+                except OSError:
+                    continue
+    except (PermissionError, OSError):
+        pass
+    return subdirs, md_count, is_vault
+
+
+def walk(current: Path, max_depth: int, depth: int = 0, workers: int = 1) -> List[Dict]:
+    """Search for Obsidian vaults under the given path.
 
     Looks for directories containing a '.obsidian' subfolder and counts
-    the number of .md files in each discovered vault.
+    the number of .md files in each discovered vault during the same walk.
+    '.git', 'node_modules' and '.trash' directories are never entered.
 
     Args:
         current: The starting directory path to scan.
-        depth: Current recursion depth (starts at 0).
-        max_depth: Maximum depth to recurse into subdirectories.
+        max_depth: Maximum depth (relative to ``current``) at which vaults
+            are discovered. Directories inside a discovered vault are still
+            walked past this depth so its markdown count is complete.
+        depth: Depth assigned to ``current`` (starts at 0).
+        workers: Number of threads scanning directories concurrently; worth
+            raising on network filesystems where each listing is slow.
 
     Returns:
         List of dictionaries, each describing a found vault with path,
-        name, markdown file count, and discovery depth.
+        name, markdown file count, and discovery depth, in breadth-first
+        discovery order.
 
     Raises:
         PermissionError/OSError: Silently skipped if access denied.
     """
-    vaults = []
-    if depth > max_depth:
-        return []
+    vaults: List[Dict] = []
+    # (directory, depth, indices into ``vaults`` of the vaults it belongs to)
+    level = [(str(current), depth, ())]
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
     try:
-        if (current / ".obsidian").is_dir():
-            md_count = sum(1 for p in current.rglob("*.md") if p.is_file())
-            vaults.append(
-                {
-                    "path": current.resolve(),
-                    "name": current.name or "[root]",
-                    "md_count": md_count,
-                    "depth": depth,
-                }
-            )
-
-        for item in current.iterdir():
-            if item.is_dir():
-                vaults_to_append = walk(item, depth + 1, max_depth)
-                if len(vaults_to_append) > 0:
-                    vaults.extend(vaults_to_append)
-    except (PermissionError, OSError):
-        pass
-    return [vault for vault in vaults]
+        while level:
+            paths = [path for path, _, _ in level]
+            scans = executor.map(_scan_dir, paths) if executor is not None else map(_scan_dir, paths)
+            next_level = []
+            for (path, dir_depth, owners), (subdirs, md_count, is_vault) in zip(level, scans):
+                if is_vault and dir_depth <= max_depth:
+                    owners = owners + (len(vaults),)
+                    vaults.append(
+                        {
+                            "path": Path(path).resolve(),
+                            "name": Path(path).name or "[root]",
+                            "md_count": 0,
+                            "depth": dir_depth,
+                        }
+                    )
+                for owner in owners:
+                    vaults[owner]["md_count"] += md_count
+                # Past max_depth only the contents of already found vaults matter.
+                if dir_depth < max_depth or owners:
+                    next_level.extend((subdir, dir_depth + 1, owners) for subdir in subdirs)
+            level = next_level
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return vaults
 
 
-def unpack_note(
+# (result key, obsidiantools index property, per-note getter) for the rich
+# per-note data. The index properties are the dicts the getters read from, so
+# pulling them once per vault avoids six validated lookups per note.
+_GETTER_FIELDS = [
+    ("raw_content", "source_text_index", "get_source_text"),
+    ("clean_body", "readable_text_index", "get_readable_text"),
+    ("frontmatter", "front_matter_index", "get_front_matter"),
+    ("tags", "tags_index", "get_tags"),
+    ("backlinks", "backlinks_index", "get_backlinks"),
+    ("embedded_files", "embedded_files_index", "get_embedded_files"),
+    ("outgoing_md_links", "md_links_index", "get_md_links"),
+    ("wikilinks", "wikilinks_index", "get_wikilinks"),
+]
+_LIST_FIELDS = {"backlinks", "embedded_files", "outgoing_md_links", "wikilinks"}
+_OPTIONAL_FIELDS = {"embedded_files", "outgoing_md_links"}
+_MISSING = object()
+
+
+def _base_stats(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "rel_filepath": row["rel_filepath"],
+        "note_exists": bool(row["note_exists"]),
+        "n_backlinks": int(row["n_backlinks"]),
+        "n_wikilinks": int(row["n_wikilinks"]) if pd.notna(row["n_wikilinks"]) else 0,
+        "n_tags": int(row["n_tags"]) if pd.notna(row["n_tags"]) else 0,
+        "n_embedded_files": int(row["n_embedded_files"]) if pd.notna(row["n_embedded_files"]) else 0,
+        "modified_time_iso": row["modified_time"].isoformat() if pd.notna(row["modified_time"]) else None,
+    }
+
+
+def index_note_metadata(note_metadata_df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Turn the vault metadata frame into a dict of records keyed by abs path.
+
+    Replaces a boolean-mask scan of the whole frame per note with a single
+    O(N) conversion and O(1) lookups afterwards.
+    """
+    records = note_metadata_df.to_dict("records")
+    return {str(record["abs_filepath"]): record for record in records}
+
+
+def gather_getter_indexes(vault: otools.Vault) -> Dict[str, Any]:
+    """Grab the per-note data dicts behind the ``vault.get_*`` getters once.
+
+    Fields whose index property is not available in the installed
+    obsidiantools version map to ``None`` and fall back to the getter.
+    """
+    return {field: getattr(vault, index_attr, None) for field, index_attr, _ in _GETTER_FIELDS}
+
+
+def _collect_getters(vault: otools.Vault, stem: str, getter_indexes: Dict[str, Any]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"name": stem}
+    for field, _, getter_name in _GETTER_FIELDS:
+        index = getter_indexes.get(field)
+        value = index.get(stem, _MISSING) if isinstance(index, dict) else _MISSING
+        if value is _MISSING:
+            if field in _OPTIONAL_FIELDS and not hasattr(vault, getter_name):
+                continue
+            value = getattr(vault, getter_name)(stem)
+        data[field] = list(value) if field in _LIST_FIELDS else value
+    return data
+
+
+def _unpack_note_record(
     vault: otools.Vault,
     abs_filepath: str,
     vault_root: Path,
-    note_metadata_df: pd.DataFrame,
+    metadata_row: Optional[Dict[str, Any]],
+    getter_indexes: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     note_path = Path(abs_filepath)
     if not note_path.is_file():
@@ -60,52 +173,22 @@ def unpack_note(
     rel_path = note_path.relative_to(vault_root).as_posix()
 
     # Fast stats
-    row_match = note_metadata_df[note_metadata_df["abs_filepath"] == abs_filepath]
-    base_stats = {}
-    if not row_match.empty:
-        row = row_match.iloc[0]
-        base_stats = {
-            "rel_filepath": row["rel_filepath"],
-            "note_exists": bool(row["note_exists"]),
-            "n_backlinks": int(row["n_backlinks"]),
-            "n_wikilinks": int(row["n_wikilinks"])
-            if pd.notna(row["n_wikilinks"])
-            else 0,
-            "n_tags": int(row["n_tags"]) if pd.notna(row["n_tags"]) else 0,
-            "n_embedded_files": int(row["n_embedded_files"])
-            if pd.notna(row["n_embedded_files"])
-            else 0,
-            "modified_time_iso": row["modified_time"].isoformat()
-            if pd.notna(row["modified_time"])
-            else None,
-        }
+    base_stats = _base_stats(metadata_row) if metadata_row is not None else {}
 
     # Rich getters
     getters_data: Dict[str, Any] = {}
     try:
-        getters_data.update(
-            {
-                "name": note_path.stem,
-                "raw_content": vault.get_source_text(note_path.stem),
-                "clean_body": vault.get_readable_text(note_path.stem),
-                "frontmatter": vault.get_front_matter(note_path.stem),
-                "tags": vault.get_tags(note_path.stem),
-                "backlinks": list(vault.get_backlinks(note_path.stem)),
-            }
-        )
-        if hasattr(vault, "get_embedded_files"):
-            getters_data["embedded_files"] = list(
-                vault.get_embedded_files(note_path.stem)
-            )
-        if hasattr(vault, "get_md_links"):
-            getters_data["outgoing_md_links"] = list(vault.get_md_links(note_path.stem))
+        getters_data.update(_collect_getters(vault, note_path.stem, getter_indexes or {}))
     except Exception as e:
         getters_data["getters_error"] = str(e)
 
+    return _assemble_note(rel_path, base_stats, getters_data)
+
+
+def _assemble_note(rel_path: str, base_stats: Dict[str, Any], getters_data: Dict[str, Any]) -> Dict[str, Any]:
     # Derived
     derived = {
-        "is_isolated": base_stats.get("n_backlinks", 0) == 0
-        and base_stats.get("n_wikilinks", 0) == 0,
+        "is_isolated": base_stats.get("n_backlinks", 0) == 0 and base_stats.get("n_wikilinks", 0) == 0,
         "approx_word_count": len(getters_data.get("clean_body", "").split()),
         "has_frontmatter": bool(getters_data.get("frontmatter", {})),
         "last_modified": base_stats.get("modified_time_iso"),
@@ -119,30 +202,220 @@ def unpack_note(
     }
 
 
-def load_vault(vault_path: Path) -> List[Dict]:
+def _parse_note_file(note_path: Path, vault_root: Path) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """Read one note the way ``Vault.connect`` and ``Vault.gather`` do, in a single markdown to HTML pass.
+
+    Returns the relative path, the getter fields and the stats. Backlinks
+    depend on every other note, so they are left to ``_with_backlinks``.
+    """
+    rel_path = note_path.relative_to(vault_root).as_posix()
+    getters_data: Dict[str, Any] = {}
+    try:
+        front_matter, content = md_utils._get_md_front_matter_and_content(note_path)
+        html = md_utils._get_html_from_md_content(content)
+        src_txt = md_utils.get_source_text_from_html(html, remove_code=True)
+        getters_data.update(
+            {
+                "name": note_path.stem,
+                "raw_content": md_utils.get_source_text_from_html(html, remove_code=True, remove_math=True),
+                "clean_body": md_utils._get_readable_text_from_html(html),
+                "frontmatter": front_matter,
+                "tags": md_utils.get_tags(note_path),
+                "embedded_files": list(md_utils._get_all_embedded_files_from_source_text(src_txt, remove_aliases=True)),
+                "outgoing_md_links": list(md_utils._get_md_links_from_source_text(src_txt)),
+                "wikilinks": list(md_utils._get_all_wikilinks_from_source_text(src_txt, remove_aliases=True, exclude_canvas=True)),
+            }
+        )
+    except Exception as e:
+        getters_data["getters_error"] = str(e)
+
+    stats = {
+        "rel_filepath": str(note_path.relative_to(vault_root)),
+        "note_exists": True,
+        "n_wikilinks": len(getters_data.get("wikilinks", [])),
+        "n_tags": len(getters_data.get("tags", [])),
+        "n_embedded_files": len(getters_data.get("embedded_files", [])),
+        "modified_time_iso": pd.to_datetime(note_path.lstat().st_mtime, unit="s").isoformat(),
+    }
+    return rel_path, getters_data, stats
+
+
+def _with_backlinks(parsed: Tuple[str, Dict[str, Any], Dict[str, Any]], backlinks: List[str]) -> Dict[str, Any]:
+    rel_path, getters_data, stats = parsed
+    if "getters_error" not in getters_data:
+        getters_data = {**getters_data, "backlinks": list(backlinks)}
+    stats = {**stats, "n_backlinks": len(getters_data.get("backlinks", []))}
+    return _assemble_note(rel_path, stats, getters_data)
+
+
+def unpack_note_file(
+    abs_filepath: str | Path,
+    vault_root: Path,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Re-parse a single note from disk without gathering the whole vault.
+
+    Uses the same obsidiantools parsers as ``Vault.connect`` and
+    ``Vault.gather``, so the result matches what ``load_vault`` produces for
+    the note. Backlinks depend on every other note, so they are carried over
+    from ``previous`` (the note's last known dict) instead of recomputed.
+    """
+    note_path = Path(abs_filepath)
+    if not note_path.is_file():
+        return {"relative_path": "unknown", "error": "not_a_file"}
+    return _with_backlinks(_parse_note_file(note_path, vault_root), (previous or {}).get("backlinks", []))
+
+
+def unpack_note(
+    vault: otools.Vault,
+    abs_filepath: str,
+    vault_root: Path,
+    note_metadata_df: pd.DataFrame,
+) -> Dict[str, Any]:
+    """Unpack a single note, looking its stats up in the metadata frame.
+
+    Convenient for one-off lookups; scans the whole frame, so bulk loading
+    should go through ``load_vault`` which indexes the frame once.
+    """
+    row_match = note_metadata_df[note_metadata_df["abs_filepath"] == abs_filepath]
+    metadata_row = row_match.iloc[0].to_dict() if not row_match.empty else None
+    return _unpack_note_record(vault, abs_filepath, vault_root, metadata_row)
+
+
+def _prepare_unpack_state(vault: otools.Vault, vault_path: Path) -> Dict[str, Any]:
+    note_metadata_df = vault.get_note_metadata()
+    note_metadata_df["abs_filepath"] = note_metadata_df["abs_filepath"].astype(str)
+    note_metadata_df["rel_filepath"] = note_metadata_df["rel_filepath"].astype(str)
+    return {
+        "vault": vault,
+        "vault_path": vault_path,
+        "metadata_by_path": index_note_metadata(note_metadata_df),
+        "getter_indexes": gather_getter_indexes(vault),
+    }
+
+
+def _unpack_one(state: Dict[str, Any], note_path_str: str) -> Tuple[Optional[Dict], Optional[str]]:
+    abs_path = str(state["vault_path"] / note_path_str)
+    try:
+        data = _unpack_note_record(
+            state["vault"],
+            abs_path,
+            state["vault_path"],
+            state["metadata_by_path"].get(abs_path),
+            state["getter_indexes"],
+        )
+        return data, None
+    except Exception as e:
+        return None, str(e)
+
+
+def iter_vault_notes(vault: otools.Vault, vault_path: Path) -> Iterator[Dict]:
+    """Yield the unpacked notes of an already gathered vault one at a time.
+
+    Args:
+        vault: A connected and gathered obsidiantools vault.
+        vault_path: Root directory of the vault.
+
+    Yields:
+        Note dicts in ``vault.md_file_index`` order.
+    """
+    state = _prepare_unpack_state(vault, vault_path)
+    for note_path_str in (str(p) for p in vault.md_file_index.values()):
+        data, error = _unpack_one(state, note_path_str)
+        if error is not None:
+            print(f"Failed to unpack {note_path_str}: {error}")
+            continue
+        yield data
+
+
+def unpack_vault_notes(vault: otools.Vault, vault_path: Path) -> List[Dict]:
+    """Unpack every note of an already gathered vault in a single linear pass."""
+    return list(iter_vault_notes(vault, vault_path))
+
+
+def _check_vault_dir(vault_path: Path) -> None:
     if not vault_path.is_dir():
         raise ValueError(f"Not a directory: {vault_path}")
     if not (vault_path / ".obsidian").is_dir():
         raise ValueError(f"No .obsidian folder found in {vault_path}")
 
-    vault = otools.Vault(vault_path).connect().gather()
-    note_metadata_df = vault.get_note_metadata()
-    file_paths: List = note_metadata_df["abs_filepath"].copy().to_list()
-    note_metadata_df["abs_filepath"] = note_metadata_df["abs_filepath"].astype(str)
-    note_metadata_df["rel_filepath"] = note_metadata_df["rel_filepath"].astype(str)
 
-    all_notes_data = []
-    for note_path_str in vault.md_file_index.values():
-        abs_path = str(vault_path / note_path_str)
+def _connect_vault(vault_path: Path) -> otools.Vault:
+    _check_vault_dir(vault_path)
+    return otools.Vault(vault_path).connect().gather()
+
+
+def _parse_shard(vault_root: Path, note_paths: List[str]) -> List[Tuple[Optional[Tuple[str, Dict[str, Any], Dict[str, Any]]], Optional[str]]]:
+    results = []
+    for note_path_str in note_paths:
         try:
-            data = unpack_note(vault, abs_path, vault_path, note_metadata_df)
-            all_notes_data.append(data)
+            results.append((_parse_note_file(vault_root / note_path_str, vault_root), None))
         except Exception as e:
-            print(f"Failed to unpack {note_path_str}: {e}")
+            results.append((None, str(e)))
+    return results
+
+
+def _iter_vault_parallel(vault_path: Path, workers: int) -> Iterator[Dict]:
+    """Parse the notes in ``workers`` processes, each reading its own shard of files from disk.
+
+    Only the note paths go to the workers and compact note dicts come back;
+    the parent just joins every note's wikilinks into backlinks, which is
+    why every note is parsed before the first one is yielded.
+    """
+    md_file_index = otools.Vault(vault_path).md_file_index  # lists the notes without parsing them
+    names = list(md_file_index)
+    note_paths = [str(p) for p in md_file_index.values()]
+    # A few shards per worker keeps the pool balanced without paying per-note IPC.
+    shard_size = max(1, -(-len(note_paths) // (workers * 4)))
+    shards = [note_paths[i : i + shard_size] for i in range(0, len(note_paths), shard_size)]
+    # Loads run from the background sync, watcher and server threads, and forking a threaded process
+    # can deadlock the child on a lock another thread held; forkserver/spawn workers start clean.
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    with mp.get_context(method).Pool(processes=min(workers, len(shards))) as pool:
+        results = [result for shard in pool.imap(functools.partial(_parse_shard, vault_path), shards) for result in shard]
+
+    backlinks: Dict[str, List[str]] = {}
+    for name, (parsed, _) in zip(names, results):
+        for target in parsed[1].get("wikilinks", []) if parsed is not None else []:
+            backlinks.setdefault(target, []).append(name)
+    for note_path_str, (parsed, error) in zip(note_paths, results):
+        if error is not None:
+            print(f"Failed to unpack {note_path_str}: {error}")
             continue
+        yield _with_backlinks(parsed, backlinks.get(Path(note_path_str).stem, []))
+
+
+def iter_vault(vault_path: Path, workers: int = 1) -> Iterator[Dict]:
+    """Streaming counterpart of ``load_vault``.
+
+    Yields note dicts as they are unpacked instead of building the full list,
+    so they can be chunked and embedded in bounded batches by
+    ``ObsidianChromaDB.ingest_notes`` / ``sync_notes``. obsidiantools still
+    holds the gathered vault text while the generator is alive.
+
+    With ``workers`` > 1 the vault is not gathered: the notes are parsed in
+    that many processes (see ``_iter_vault_parallel``), which pays off once
+    parsing outweighs starting the pool, i.e. from a few hundred notes.
+    The notes are the same either way.
+    """
+    if workers > 1:
+        _check_vault_dir(vault_path)
+        notes = _iter_vault_parallel(vault_path, workers)
+    else:
+        with METRICS.span("load.gather"):
+            vault = _connect_vault(vault_path)
+        notes = iter_vault_notes(vault, vault_path)
+    n_notes = 0
+    for note in METRICS.timed_iter("load.unpack_note", notes):
+        n_notes += 1
+        yield note
+    METRICS.count("notes_loaded", n_notes)
+    print(f"Processed {n_notes} notes successfully")
+
 
-    print(f"Processed {len(all_notes_data)} notes successfully")
-    return all_notes_data
+def load_vault(vault_path: Path, workers: int = 1) -> List[Dict]:
+    with METRICS.span("load.vault"):
+        return list(iter_vault(vault_path, workers=workers))
 
 
 # Example usage
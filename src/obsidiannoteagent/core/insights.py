@@ -0,0 +1,360 @@
+import datetime as dt
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from langchain_core.language_models import BaseLLM
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.metrics import METRICS
+
+CLUSTER_PROMPT = """You are reviewing one cluster of related notes from my Obsidian vault.
+
+Notes in the cluster, most central first (title: opening text):
+{notes}
+
+Notes here with no links to or from any other note: {orphans}
+Note pairs here that are very similar but not linked: {missing_links}
+
+Answer in markdown, concisely:
+1. First line: a short title for the theme these notes share.
+2. Connections: how these notes relate to each other.
+3. Gaps: what seems to be missing or unfinished.
+4. Suggestions: concrete links, tags or new notes to add.
+"""
+
+
+def note_vectors(db: ObsidianChromaDB, page_size: int = 5000) -> Tuple[List[str], np.ndarray, int]:
+    """Pull every chunk embedding in bulk and average them per note (the normalised sum).
+
+    Returns:
+        ``(paths, vectors, n_chunks)`` with one unit-length float32 row per
+        note that has chunks, in first-seen order.
+    """
+    index_of: Dict[str, int] = {}
+    sums = np.zeros((0, 0), dtype=np.float32)
+    n_chunks = 0
+    for _, embeddings, metadatas in db._vectorstore.iter_embeddings(page_size):
+        if not len(metadatas):
+            continue
+        rows = np.fromiter((index_of.setdefault(meta.get("source", "unknown"), len(index_of)) for meta in metadatas), dtype=np.int64, count=len(metadatas))
+        if len(index_of) > len(sums):
+            grown = np.zeros((max(len(index_of), 2 * len(sums), len(db.manifest.entries)), embeddings.shape[1]), dtype=np.float32)
+            if len(sums):
+                grown[: len(sums)] = sums
+            sums = grown
+        # One reduceat over the page sorted by note sums each note's chunks.
+        order = np.argsort(rows, kind="stable")
+        notes, starts = np.unique(rows[order], return_index=True)
+        sums[notes] += np.add.reduceat(embeddings[order], starts, axis=0)
+        n_chunks += len(metadatas)
+    vectors = sums[: len(index_of)]
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return list(index_of), vectors, n_chunks
+
+
+def _assign(vectors: np.ndarray, centers: np.ndarray, block_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Closest center (by cosine) and its similarity for every row, ``block_rows`` rows at a time."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    best = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        sims = vectors[start : start + block_rows] @ centers.T
+        labels[start : start + block_rows] = sims.argmax(axis=1)
+        best[start : start + block_rows] = sims.max(axis=1)
+    return labels, best
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 25,
+    seed: int = 0,
+    init_sample: int = 10_000,
+    block_rows: int = 8192,
+    tol: float = 0.001,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means on unit-length rows.
+
+    Centers are seeded with k-means++ on a sample of at most ``init_sample``
+    rows. Each Lloyd step is a blocked matrix product against the centers
+    plus one masked sum per cluster. Iteration stops after ``n_iter`` steps
+    or once fewer than ``tol`` of the rows change cluster. An empty cluster
+    is re-seeded with the row that is furthest from its own center.
+
+    Returns:
+        ``(labels, centers)``: the cluster of each row and the unit-length centers.
+    """
+    n = len(vectors)
+    n_clusters = max(1, min(n_clusters, n))
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(n, size=min(n, init_sample), replace=False)]
+    centers = np.empty((n_clusters, vectors.shape[1]), dtype=np.float32)
+    centers[0] = sample[rng.integers(len(sample))]
+    # Cosine distance to the closest chosen center, updated as centers are added; rows are drawn by its square.
+    distance = np.maximum(1.0 - sample @ centers[0], 0.0)
+    for c in range(1, n_clusters):
+        weights = distance.astype(np.float64) ** 2
+        total = float(weights.sum())
+        pick = rng.choice(len(sample), p=weights / total) if total > 0 else rng.integers(len(sample))
+        centers[c] = sample[pick]
+        distance = np.minimum(distance, np.maximum(1.0 - sample @ centers[c], 0.0))
+
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(n_iter):
+        new_labels, best = _assign(vectors, centers, block_rows)
+        moved = int(np.count_nonzero(new_labels != labels))
+        labels = new_labels
+        for c in range(n_clusters):
+            members = labels == c
+            if members.any():
+                centers[c] = vectors[members].sum(axis=0)
+            else:
+                far = int(best.argmin())
+                centers[c], labels[far], best[far] = vectors[far], c, 1.0
+        centers /= np.maximum(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12)
+        if moved <= tol * n:
+            break
+    return labels, centers
+
+
+def neighbor_join(
+    vectors: np.ndarray,
+    labels: np.ndarray,
+    centers: np.ndarray,
+    n_neighbors: int = 5,
+    n_probe: int = 3,
+    block_rows: int = 2048,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Approximate ``n_neighbors`` nearest notes of every note, using the clusters as an IVF index.
+
+    The notes of each cluster are compared with the notes of the ``n_probe``
+    clusters whose centers are closest to theirs (its own included), instead
+    of with the whole vault. With about sqrt(n) notes per cluster that is
+    O(n * sqrt(n)) dot products instead of O(n^2).
+
+    Returns:
+        ``(neighbors, similarities)``, both ``(n, n_neighbors)`` and best
+        first. Slots without a candidate hold ``-1`` and ``-inf``.
+    """
+    n = len(vectors)
+    neighbors = np.full((n, n_neighbors), -1, dtype=np.int64)
+    similarities = np.full((n, n_neighbors), -np.inf, dtype=np.float32)
+    members = [np.flatnonzero(labels == c) for c in range(len(centers))]
+    probes = np.argsort(-(centers @ centers.T), axis=1)[:, : max(1, n_probe)]
+    for c, queries in enumerate(members):
+        if not len(queries):
+            continue
+        candidates = np.concatenate([members[p] for p in probes[c]] + ([] if c in probes[c] else [queries]))
+        candidate_vectors = vectors[candidates]
+        m = min(n_neighbors, len(candidates) - 1)
+        if m <= 0:
+            continue
+        for start in range(0, len(queries), block_rows):
+            block = queries[start : start + block_rows]
+            sims = vectors[block] @ candidate_vectors.T
+            sims[candidates[None, :] == block[:, None]] = -np.inf  # a note is not its own neighbor
+            top = np.argpartition(-sims, m - 1, axis=1)[:, :m]
+            top_sims = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_sims, axis=1)
+            neighbors[block, :m] = candidates[np.take_along_axis(top, order, axis=1)]
+            similarities[block, :m] = np.take_along_axis(top_sims, order, axis=1)
+    return neighbors, similarities
+
+
+def _link_name(path: str) -> str:
+    return f"[[{path[:-3] if path.endswith('.md') else path}]]"
+
+
+def _cluster_prompt(cluster: Dict[str, Any], snippets: Dict[str, str]) -> str:
+    notes = "\n".join(f"- {PurePosixPath(path).stem}: {snippets.get(path, '')}" for path in cluster["notes"])
+    orphans = ", ".join(PurePosixPath(path).stem for path in cluster["orphans"]) or "none"
+    missing = ", ".join(f"{PurePosixPath(a).stem} <-> {PurePosixPath(b).stem}" for a, b, _ in cluster["missing_links"]) or "none"
+    return CLUSTER_PROMPT.format(notes=notes, orphans=orphans, missing_links=missing)
+
+
+def generate_insights(
+    db: ObsidianChromaDB,
+    llm: Optional[BaseLLM] = None,
+    n_clusters: Optional[int] = None,
+    n_neighbors: int = 5,
+    n_probe: int = 3,
+    min_link_similarity: float = 0.8,
+    max_missing_links: int = 200,
+    notes_per_cluster: int = 8,
+    snippet_chars: int = 280,
+    llm_concurrency: int = 1,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Cluster the whole vault, find orphans and likely missing links, and summarise each cluster.
+
+    Every chunk embedding is read in bulk and averaged per note
+    (``note_vectors``), the notes are clustered with ``kmeans``, and
+    ``neighbor_join`` finds each note's nearest notes. From these:
+
+    * orphans are indexed notes with no wikilink to or from another note,
+      each with its closest notes as link suggestions;
+    * missing links are pairs of notes at least ``min_link_similarity``
+      similar that the link graph does not connect, best first.
+
+    With an ``llm`` each cluster is summarised with a single call (its most
+    central notes, orphans and missing links in one prompt), so the number
+    of LLM calls is the number of clusters, not the number of notes. A
+    failed call is recorded on its cluster and does not stop the job.
+
+    Args:
+        db: The index to analyse.
+        llm: Model for the cluster summaries; ``None`` skips them.
+        n_clusters: Number of clusters (default ``sqrt(notes / 2)``, between 2 and 100).
+        n_neighbors: Nearest notes kept per note.
+        n_probe: Clusters searched per note by the neighbor join.
+        min_link_similarity: Cosine similarity above which two unlinked notes are reported.
+        max_missing_links: Cap on the missing-link list.
+        notes_per_cluster: Central notes listed per cluster (and sent to the LLM).
+        snippet_chars: Characters of each listed note's first chunk shown to the LLM.
+        llm_concurrency: Cluster summaries requested at once.
+        seed: Random seed for k-means.
+
+    Returns:
+        Report dict with ``clusters``, ``orphans``, ``missing_links`` and per-phase ``timings``.
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    with METRICS.span("insights.load"):
+        paths, vectors, n_chunks = note_vectors(db)
+    timings["load_sec"] = round(time.perf_counter() - start, 3)
+    report: Dict[str, Any] = {
+        "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "collection": db.collection_name,
+        "notes": len(paths),
+        "chunks": n_chunks,
+        "clusters": [],
+        "orphans": [],
+        "missing_links": [],
+        "timings": timings,
+    }
+    if len(paths) < 2:
+        return report
+
+    phase = time.perf_counter()
+    n_clusters = n_clusters or min(100, max(2, round(math.sqrt(len(paths) / 2))))
+    with METRICS.span("insights.cluster"):
+        labels, centers = kmeans(vectors, n_clusters, seed=seed)
+    timings["cluster_sec"] = round(time.perf_counter() - phase, 3)
+
+    phase = time.perf_counter()
+    with METRICS.span("insights.neighbor_join"):
+        neighbors, similarities = neighbor_join(vectors, labels, centers, n_neighbors=n_neighbors, n_probe=n_probe)
+    timings["neighbor_join_sec"] = round(time.perf_counter() - phase, 3)
+
+    phase = time.perf_counter()
+    linked = {path: set(db.link_graph.neighbors(path)) for path in paths}
+    orphan_rows = [i for i, path in enumerate(paths) if not linked[path]]
+    report["orphans"] = [
+        {
+            "note": paths[i],
+            "cluster": int(labels[i]),
+            "suggestions": [{"note": paths[j], "similarity": round(float(s), 4)} for j, s in zip(neighbors[i], similarities[i]) if j >= 0],
+        }
+        for i in orphan_rows
+    ]
+    rows, slots = np.nonzero(similarities >= min_link_similarity)
+    pairs: Dict[Tuple[int, int], float] = {}
+    for i, j, sim in zip(rows, neighbors[rows, slots], similarities[rows, slots]):
+        pair = (min(i, j), max(i, j))
+        if pair not in pairs and paths[pair[1]] not in linked[paths[pair[0]]]:
+            pairs[pair] = float(sim)
+    missing = sorted(pairs.items(), key=lambda item: -item[1])[:max_missing_links]
+    report["missing_links"] = [
+        {"a": paths[i], "b": paths[j], "similarity": round(sim, 4), "cluster": int(labels[i]) if labels[i] == labels[j] else None} for (i, j), sim in missing
+    ]
+    timings["links_sec"] = round(time.perf_counter() - phase, 3)
+
+    similarity_to_center = np.einsum("ij,ij->i", vectors, centers[labels])
+    orphan_set = {paths[i] for i in orphan_rows}
+    clusters = []
+    for c in range(len(centers)):
+        members = np.flatnonzero(labels == c)
+        if not len(members):
+            continue
+        central = members[np.argsort(-similarity_to_center[members])]
+        clusters.append(
+            {
+                "cluster": c,
+                "size": int(len(members)),
+                "notes": [paths[i] for i in central[:notes_per_cluster]],
+                "orphans": [paths[i] for i in central if paths[i] in orphan_set],
+                "missing_links": [(link["a"], link["b"], link["similarity"]) for link in report["missing_links"] if link["cluster"] == c],
+                "summary": None,
+            }
+        )
+    clusters.sort(key=lambda cluster: -cluster["size"])
+    report["clusters"] = clusters
+
+    if llm is not None:
+        phase = time.perf_counter()
+        first_chunks = [db.manifest.entries.get(path, {}).get("chunk_ids", [None])[0] for cluster in clusters for path in cluster["notes"]]
+        snippets = {
+            doc.metadata.get("source", ""): " ".join(doc.page_content.split())[:snippet_chars]
+            for doc in db._vectorstore.get_by_ids([chunk_id for chunk_id in first_chunks if chunk_id])
+        }
+
+        def summarise(cluster: Dict[str, Any]) -> None:
+            try:
+                with METRICS.span("insights.llm"):
+                    cluster["summary"] = str(llm.invoke(_cluster_prompt(cluster, snippets))).strip()
+            except Exception as e:  # one bad cluster should not lose the whole report
+                cluster["error"] = str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="insights-llm") as executor:
+            list(executor.map(summarise, clusters))
+        timings["llm_sec"] = round(time.perf_counter() - phase, 3)
+        timings["llm_calls"] = len(clusters)
+    timings["total_sec"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def render_markdown(report: Dict[str, Any]) -> str:
+    """The report as an Obsidian note: clusters with their summaries, orphans and missing links as wikilinks."""
+    lines = [
+        f"# Vault insights ({report['generated_at']})",
+        "",
+        f"{report['notes']} notes, {report['chunks']} chunks in `{report['collection']}`; "
+        f"{len(report['clusters'])} clusters, {len(report['orphans'])} orphans, {len(report['missing_links'])} likely missing links.",
+        "",
+        "## Clusters",
+    ]
+    for cluster in report["clusters"]:
+        lines += ["", f"### Cluster {cluster['cluster']} ({cluster['size']} notes)", ""]
+        if cluster.get("summary"):
+            lines += [cluster["summary"], ""]
+        elif cluster.get("error"):
+            lines += [f"_Summary failed: {cluster['error']}_", ""]
+        lines.append("Central notes: " + ", ".join(_link_name(path) for path in cluster["notes"]))
+        if cluster["orphans"]:
+            lines.append("Orphans: " + ", ".join(_link_name(path) for path in cluster["orphans"]))
+    lines += ["", "## Orphan notes", ""]
+    for orphan in report["orphans"]:
+        suggestions = ", ".join(f"{_link_name(s['note'])} ({s['similarity']:.2f})" for s in orphan["suggestions"])
+        lines.append(f"- {_link_name(orphan['note'])} -> {suggestions or 'no close notes'}")
+    lines += ["", "## Likely missing links", ""]
+    for link in report["missing_links"]:
+        lines.append(f"- {_link_name(link['a'])} <-> {_link_name(link['b'])} ({link['similarity']:.2f})")
+    timings = ", ".join(f"{name} {value}" for name, value in report["timings"].items())
+    lines += ["", f"_Timings: {timings}_", ""]
+    return "\n".join(lines)
+
+
+def write_report(report: Dict[str, Any], path: str | Path) -> Path:
+    """Write the markdown report to ``path`` and the raw report as JSON next to it (both atomically)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for target, text in ((path, render_markdown(report)), (path.with_suffix(".json"), json.dumps(report, indent=2))):
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, target)
+    return path
@@ -1,12 +1,221 @@
-from langchain_core.runnables import RunnablePassthrough
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLLM
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableGenerator, RunnableLambda, RunnableParallel, RunnablePassthrough
 from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.metadata_index import parse_scope
+from noteagent.core.metrics import METRICS
+from noteagent.core.query_cache import QueryCache
+from noteagent.core.vault_registry import VaultRegistry
 
-from langchain_ollama import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 
-def traditional_obsidian_retrieval_chain(db: ObsidianChromaDB, prompt_template: ChatPromptTemplate = None, llm_model: str = "qwen3:14b"):
+def search_chunks(
+    db: ObsidianChromaDB,
+    question: str,
+    embedding: List[float],
+    k: int = 7,
+    hybrid: bool = False,
+    graph_hops: int = 0,
+    scope: Optional[Dict[str, Any]] = None,
+) -> List[Document]:
+    """Run the configured retrieval mode for an already embedded question, restricted to ``scope`` if given."""
+    with METRICS.span("retrieve"):
+        if graph_hops > 0:
+            return db.graph_search(question, k=k, hops=graph_hops, hybrid=hybrid, embedding=embedding, scope=scope)
+        if hybrid:
+            return db.hybrid_search(question, k=k, embedding=embedding, scope=scope)
+        return db.dense_search(embedding, k=k, scope=scope)
+
+
+def embed_question(db: ObsidianChromaDB, question: str) -> List[float]:
+    with METRICS.span("query.embed"):
+        return db._embeddings.embed_query(question)
+
+
+def note_retriever(db: ObsidianChromaDB, k: int = 7, hybrid: bool = True, graph_hops: int = 0) -> RunnableLambda:
+    """Uncached retriever; scope tokens in the question (``#tag``, ``folder:``, see ``parse_scope``) narrow the search."""
+
+    def retrieve(question: str) -> List[Document]:
+        question, scope = parse_scope(question)
+        return search_chunks(db, question, embed_question(db, question), k=k, hybrid=hybrid, graph_hops=graph_hops, scope=scope)
+
+    return RunnableLambda(retrieve)
+
+
+def multi_vault_retriever(registry: VaultRegistry, vaults: Optional[Sequence[str]] = None, k: int = 7) -> RunnableLambda:
+    """Retriever that fans the question out to several vaults and keeps the ``k`` closest chunks overall."""
+
+    def retrieve(question: str) -> List[Document]:
+        question, scope = parse_scope(question)
+        with METRICS.span("retrieve"):
+            return [doc for doc, _ in registry.search(question, vaults=vaults, k=k, scope=scope)]
+
+    return RunnableLambda(retrieve)
+
+
+def cached_retriever(db: ObsidianChromaDB, cache: QueryCache, k: int = 7, hybrid: bool = False, graph_hops: int = 0) -> RunnableLambda:
+    """Retriever that reuses the chunk ids found earlier for the same query embedding.
+
+    The query is embedded once (through the embedding cache when enabled) and
+    the vector search is skipped on a hit; chunks are then fetched by id and
+    get back the metadata they were retrieved with (``graph_score`` etc.),
+    so a cached context is the same as a fresh one.
+    With ``hybrid`` the lookup also depends on the question text, since the
+    BM25 half of the ranking is computed from it. Scope tokens are parsed
+    out of the question as in ``note_retriever`` and are part of the key.
+    """
+
+    def retrieve(question: str) -> List[Document]:
+        version = cache.version()
+        question, scope = parse_scope(question)
+        embedding = embed_question(db, question)
+        extra = f"hybrid:{question}" if hybrid else ""
+        if graph_hops > 0:
+            extra += f"|graph:{graph_hops}"
+        if scope:
+            extra += f"|scope:{json.dumps(scope, sort_keys=True)}"
+        key = QueryCache.embedding_key(embedding, k, extra=extra)
+        hits = cache.get_retrieval(key)
+        if hits is not None:
+            with METRICS.span("retrieve.cached"):
+                by_id = {doc.id: doc for doc in db._vectorstore.get_by_ids([chunk_id for chunk_id, _ in hits])}
+            if len(by_id) == len(hits):
+                return [Document(id=chunk_id, page_content=by_id[chunk_id].page_content, metadata=dict(metadata)) for chunk_id, metadata in hits]
+        docs = search_chunks(db, question, embedding, k=k, hybrid=hybrid, graph_hops=graph_hops, scope=scope)
+        cache.put_retrieval(key, [(doc.id, doc.metadata) for doc in docs], version)
+        return docs
+
+    return RunnableLambda(retrieve)
+
+
+def cached_llm(llm: BaseLLM, cache: QueryCache) -> RunnableGenerator:
+    """Wrap the LLM so an identical prompt (question + retrieved context) is answered from cache.
+
+    Misses are streamed token by token from the LLM and the joined answer is
+    cached at the end; hits are yielded as a single chunk.
+    """
+
+    def generate(prompts: Iterator[PromptValue]) -> Iterator[str]:
+        prompt = None
+        for prompt in prompts:
+            pass
+        version = cache.version()
+        key = QueryCache.prompt_key(prompt.to_string(), llm.model)
+        answer = cache.get_answer(key)
+        if answer is not None:
+            yield answer
+            return
+        tokens = []
+        for token in llm.stream(prompt):
+            tokens.append(token)
+            yield token
+        cache.put_answer(key, "".join(tokens), version)
+
+    async def agenerate(prompts: AsyncIterator[PromptValue]) -> AsyncIterator[str]:
+        prompt = None
+        async for prompt in prompts:
+            pass
+        version = cache.version()
+        key = QueryCache.prompt_key(prompt.to_string(), llm.model)
+        answer = cache.get_answer(key)
+        if answer is not None:
+            yield answer
+            return
+        tokens = []
+        async for token in llm.astream(prompt):
+            tokens.append(token)
+            yield token
+        cache.put_answer(key, "".join(tokens), version)
+
+    return RunnableGenerator(generate, agenerate)
+
+
+def metered_llm(generator: Runnable) -> RunnableGenerator:
+    """Wrap the LLM (or ``cached_llm``) to record ``generate``, time to first token and tokens generated."""
+
+    def record(start: float, first_token_at: Optional[float], n_tokens: int) -> None:
+        end = time.perf_counter()
+        METRICS.observe("generate", end - start)
+        METRICS.observe("generate.first_token", (first_token_at or end) - start)
+        METRICS.count("tokens_generated", n_tokens)
+
+    def meter(prompts: Iterator[PromptValue]) -> Iterator[str]:
+        prompt = None
+        for prompt in prompts:
+            pass
+        if not METRICS.enabled:
+            yield from generator.stream(prompt)
+            return
+        start, first_token_at, n_tokens = time.perf_counter(), None, 0
+        for token in generator.stream(prompt):
+            first_token_at = first_token_at or time.perf_counter()
+            n_tokens += 1
+            yield token
+        record(start, first_token_at, n_tokens)
+
+    async def ameter(prompts: AsyncIterator[PromptValue]) -> AsyncIterator[str]:
+        prompt = None
+        async for prompt in prompts:
+            pass
+        start, first_token_at, n_tokens = time.perf_counter(), None, 0
+        async for token in generator.astream(prompt):
+            first_token_at = first_token_at or time.perf_counter()
+            n_tokens += 1
+            yield token
+        if METRICS.enabled:
+            record(start, first_token_at, n_tokens)
+
+    return RunnableGenerator(meter, ameter)
+
+
+def format_docs(docs: List[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def build_rag_stages(
+    db: ObsidianChromaDB | VaultRegistry,
+    prompt_template: ChatPromptTemplate = None,
+    llm_model: str = "qwen3:14b",
+    k: int = 7,
+    cache: Optional[QueryCache] = None,
+    hybrid: bool = True,
+    graph_hops: int = 0,
+    budgeter: Optional[ContextBudgeter] = None,
+    retriever: Optional[Runnable] = None,
+    llm: Optional[BaseLLM] = None,
+) -> Tuple[Runnable, Runnable]:
+    """Build the RAG chain as two stages that can be run independently.
+
+    Returns:
+        ``(context_stage, answer_stage)``: the first maps a question to
+        ``{"context": ..., "question": ...}`` (embedding + retrieval), the
+        second maps that dict to the answer and supports ``stream``/``astream``
+        token by token. Splitting them lets the caller retrieve context for the
+        next question while the current answer is still being generated.
+        With ``hybrid`` (the default) retrieval fuses dense and BM25 rankings,
+        so exact terms such as tags, names and project codes are found too.
+        ``graph_hops`` > 0 adds notes linked to the hits (wikilinks and shared
+        tags) on top of the ``k`` chunks, for "how do X and Y connect" questions.
+        Scope tokens in a question (``#project``, ``folder:References``,
+        ``since:30d``, ``prop:status=done``; see ``parse_scope``) restrict
+        retrieval to the matching notes before any vector is scored.
+        With a ``budgeter`` the retrieved chunks are merged, deduplicated and
+        packed to its token budget, and the context stage also returns a
+        ``context_report`` with the prompt tokens saved.
+        A custom ``retriever`` (e.g. ``multi_vault_retriever``) replaces the
+        single-collection one, so a ``VaultRegistry`` can be passed as ``db``.
+        Cached results are versioned by the ``cache``'s own version source.
+        ``llm`` replaces the Ollama model built from ``llm_model`` (it needs a
+        ``model`` attribute when a ``cache`` is used).
+    """
     default_system = """
                         You are an intelligent second brain assistant for my Obsidian vault.
                         Use ONLY the provided context from my notes.
@@ -21,11 +230,14 @@ def traditional_obsidian_retrieval_chain(db: ObsidianChromaDB, prompt_template:
                         Context from notes:
                         {context}
                     """
-    llm = OllamaLLM(
-        model=llm_model,
-        temperature=0.35,  # low for factual + reasoning
-        num_ctx=32000,  # adjust to your model's context limit
-    )
+    if llm is None:
+        from langchain_ollama import OllamaLLM  # deferred: only needed once a chain is built
+
+        llm = OllamaLLM(
+            model=llm_model,
+            temperature=0.35,  # low for factual + reasoning
+            num_ctx=32000,  # adjust to your model's context limit
+        )
     if prompt_template is None:
         prompt_template = ChatPromptTemplate.from_messages(
             [
@@ -34,16 +246,43 @@ def traditional_obsidian_retrieval_chain(db: ObsidianChromaDB, prompt_template:
             ]
         )
 
-    retriever = db._vectorstore.as_retriever(search_kwargs={"k": 7})
-
-    rag_chain = (
-        {
-            "context": retriever | (lambda docs: "\n\n".join(doc.page_content for doc in docs)),
-            "question": RunnablePassthrough(),
-        }
-        | prompt_template
-        | llm
-        | StrOutputParser()
-    )
+    generator = cached_llm(llm, cache) if cache is not None else llm
+    if retriever is None:
+        if cache is not None:
+            retriever = cached_retriever(db, cache, k=k, hybrid=hybrid, graph_hops=graph_hops)
+        else:
+            retriever = note_retriever(db, k=k, hybrid=hybrid, graph_hops=graph_hops)
+
+    if budgeter is not None:
+
+        def pack_context(inputs: dict) -> dict:
+            with METRICS.span("context.assemble"):
+                assembled = budgeter.assemble(inputs["docs"])
+            return {"context": assembled["context"], "context_report": assembled["report"], "question": inputs["question"]}
+
+        context_stage = RunnableParallel({"docs": retriever, "question": RunnablePassthrough()}) | RunnableLambda(pack_context)
+    else:
+        context_stage = RunnableParallel(
+            {
+                "context": retriever | format_docs,
+                "question": RunnablePassthrough(),
+            }
+        )
+    answer_stage = prompt_template | metered_llm(generator) | StrOutputParser()
+    return context_stage, answer_stage
+
+
+def traditional_obsidian_retrieval_chain(
+    db: ObsidianChromaDB,
+    prompt_template: ChatPromptTemplate = None,
+    llm_model: str = "qwen3:14b",
+    k: int = 7,
+    cache: Optional[QueryCache] = None,
+    hybrid: bool = True,
+    graph_hops: int = 0,
+    budgeter: Optional[ContextBudgeter] = None,
+):
+    context_stage, answer_stage = build_rag_stages(db, prompt_template, llm_model, k, cache, hybrid, graph_hops, budgeter)
+    rag_chain = context_stage | answer_stage
 
     return rag_chain
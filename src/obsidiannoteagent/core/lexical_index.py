@@ -0,0 +1,213 @@
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its me my of on or so that the their "
+    "then there these they this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, dropping stopwords and single letters (but not single digits)."""
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and (len(token) > 1 or token.isdigit())]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60, limit: Optional[int] = None) -> List[str]:
+    """Fuse several ranked id lists with reciprocal rank fusion.
+
+    Each id scores ``sum(1 / (k + rank))`` over the lists it appears in, so
+    ids ranked well by more than one retriever rise to the top without
+    having to calibrate their raw scores against each other.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores, key=scores.__getitem__, reverse=True)
+    return fused[:limit] if limit is not None else fused
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over chunk texts, keyed by chunk id.
+
+    Chunks are added and removed by id alongside the vector store, so the
+    index never needs a full rebuild after the first ingest. Each term's
+    postings are two packed arrays (chunk slot as uint32, term frequency as
+    uint16), about 6 bytes per posting, and are read as zero-copy NumPy views
+    when scoring, so a query only touches the postings of its own terms.
+
+    Removing a chunk only tombstones its slot; once more than
+    ``compact_ratio`` of the slots are dead the postings are rewritten
+    without them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._postings: Dict[str, Tuple[array, array]] = {}
+            self._slot_of: Dict[str, int] = {}
+            self._ids: List[Optional[str]] = []
+            self._doc_len = np.zeros(1024, dtype=np.float32)
+            self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._slot_of
+
+    def _kill_slot(self, slot: int) -> None:
+        self._total_len -= int(self._doc_len[slot])
+        self._doc_len[slot] = 0
+        self._ids[slot] = None
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index ``texts`` under ``ids``, replacing any chunk already stored under the same id."""
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._slot_of:
+                    self._kill_slot(self._slot_of.pop(chunk_id))
+                slot = len(self._ids)
+                if slot >= len(self._doc_len):
+                    self._doc_len = np.concatenate([self._doc_len, np.zeros(len(self._doc_len), dtype=np.float32)])
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                self._ids.append(chunk_id)
+                self._slot_of[chunk_id] = slot
+                self._doc_len[slot] = length
+                self._total_len += length
+                for term, tf in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array("I"), array("H"))
+                    postings[0].append(slot)
+                    postings[1].append(min(tf, 65535))
+            self._maybe_compact()
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Drop chunks by id; unknown ids are ignored. Returns how many were removed."""
+        removed = 0
+        with self._lock:
+            for chunk_id in ids:
+                slot = self._slot_of.pop(chunk_id, None)
+                if slot is not None:
+                    self._kill_slot(slot)
+                    removed += 1
+            self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self) -> None:
+        dead = len(self._ids) - len(self._slot_of)
+        if dead and dead > self.compact_ratio * len(self._ids):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the postings without tombstoned slots and renumber the live ones."""
+        with self._lock:
+            n_slots = len(self._ids)
+            alive = np.fromiter((chunk_id is not None for chunk_id in self._ids), dtype=bool, count=n_slots)
+            remap = np.cumsum(alive, dtype=np.int64) - 1
+            postings: Dict[str, Tuple[array, array]] = {}
+            for term, (slots, tfs) in self._postings.items():
+                slot_view = np.frombuffer(slots, dtype=np.uint32)
+                keep = alive[slot_view]
+                if keep.any():
+                    postings[term] = (
+                        array("I", remap[slot_view[keep]].astype(np.uint32).tobytes()),
+                        array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()),
+                    )
+            self._postings = postings
+            self._ids = [chunk_id for chunk_id in self._ids if chunk_id is not None]
+            self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self._ids)}
+            live_len = self._doc_len[:n_slots][alive]
+            self._doc_len = np.concatenate([live_len, np.zeros(max(1024, len(live_len)), dtype=np.float32)])
+
+    def search(self, query: str, k: int = 10, ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(chunk_id, bm25 score)`` pairs, best first (only among ``ids`` when given)."""
+        with self._lock:
+            n_docs = len(self._slot_of)
+            terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+            if not n_docs or not terms or k <= 0:
+                return []
+            avg_len = self._total_len / n_docs
+            doc_len = self._doc_len[: len(self._ids)]
+            alive = doc_len > 0
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in terms:
+                slot_array, tf_array = self._postings[term]
+                slots = np.frombuffer(slot_array, dtype=np.uint32)
+                tf = np.frombuffer(tf_array, dtype=np.uint16).astype(np.float32)
+                df = int(np.count_nonzero(alive[slots]))
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * doc_len[slots] / avg_len)
+                # Each slot appears at most once per term, so fancy-index += is safe here.
+                scores[slots] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+            # Tombstoned slots (length 0) keep stale postings until the next compaction.
+            scores[~alive] = 0.0
+            if ids is not None:
+                allowed = np.zeros(len(scores), dtype=bool)
+                allowed[[self._slot_of[chunk_id] for chunk_id in ids if chunk_id in self._slot_of]] = True
+                scores[~allowed] = 0.0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._ids[slot], float(scores[slot])) for slot in candidates]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "lexical_chunks": len(self._slot_of),
+                "lexical_terms": len(self._postings),
+                "lexical_postings": sum(len(slots) for slots, _ in self._postings.values()),
+            }
+
+    def save(self, path: str | Path) -> None:
+        """Pickle the index atomically (write to a temp file, then rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self._ids,
+                "doc_len": self._doc_len[: len(self._ids)].copy(),
+                "postings": self._postings,
+            }
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["BM25Index"]:
+        """Load a saved index, or return None if it is missing or unreadable."""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        index = cls(k1=state["k1"], b=state["b"])
+        index._ids = state["ids"]
+        index._postings = state["postings"]
+        index._doc_len = np.concatenate([state["doc_len"], np.zeros(1024, dtype=np.float32)])
+        index._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(index._ids) if chunk_id is not None}
+        index._total_len = int(state["doc_len"].sum())
+        return index
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+def note_key(name_or_path: str) -> str:
+    """Normalise a note name, wikilink target or relative path for lookups."""
+    key = name_or_path.strip().lower()
+    return key[:-3] if key.endswith(".md") else key
+
+
+class LinkGraph:
+    """Note adjacency built from wikilinks and tags, for graph-expanded retrieval.
+
+    The source of truth is a small per-note record (outgoing wikilink targets
+    and tags) that is updated incrementally as notes are ingested, changed or
+    deleted, and persisted as JSON next to the collection. Backlinks are not
+    stored: they are the reverse of other notes' wikilinks. For queries the
+    records are frozen into CSR arrays (rebuilt lazily after any change):
+
+    * note <-> note links, symmetric, weighted ``count / sqrt(deg(u) * deg(v))``
+      so hub notes (indexes, daily notes) don't swamp the expansion;
+    * note -> tag memberships, where a shared tag contributes ``1 / n_notes(tag)``.
+
+    The watcher and background syncs update records while queries expand
+    hits, so updates and the CSR build share a lock.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.notes: Dict[str, Dict[str, Any]] = {}
+            self._csr: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __contains__(self, relative_path: str) -> bool:
+        return relative_path in self.notes
+
+    def load(self) -> "LinkGraph":
+        self.reset()
+        if self.path is None or not self.path.exists():
+            return self
+        try:
+            notes = json.loads(self.path.read_text(encoding="utf-8")).get("notes", {})
+        except (OSError, json.JSONDecodeError):
+            return self
+        with self._lock:
+            self.notes, self._csr = notes, None
+        return self
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = json.dumps({"notes": self.notes})
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def update_note(self, note: Dict[str, Any]) -> None:
+        rel_path = note.get("relative_path", "unknown")
+        record = {
+            "name": note.get("name") or PurePosixPath(rel_path).stem,
+            "links": sorted(set(note.get("wikilinks") or [])),
+            "tags": sorted(set(note.get("tags") or [])),
+        }
+        with self._lock:
+            if self.notes.get(rel_path) != record:
+                self.notes[rel_path] = record
+                self._csr = None
+
+    def remove_note(self, relative_path: str) -> None:
+        with self._lock:
+            if self.notes.pop(relative_path, None) is not None:
+                self._csr = None
+
+    def _build(self) -> Dict[str, Any]:
+        csr = self._csr
+        if csr is not None:
+            return csr
+        with self._lock:
+            if self._csr is None:
+                self._csr = self._build_csr(self.notes)
+            return self._csr
+
+    @staticmethod
+    def _build_csr(notes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        paths = sorted(notes)
+        node_of = {path: i for i, path in enumerate(paths)}
+        # Links may name a note ("Note"), a vault path ("Folder/Note") or either with .md.
+        by_key: Dict[str, int] = {}
+        for path in paths:
+            by_key.setdefault(note_key(notes[path]["name"]), node_of[path])
+        for path in paths:
+            by_key.setdefault(note_key(path), node_of[path])
+
+        edges: Dict[Tuple[int, int], int] = {}
+        tag_ids: Dict[str, int] = {}
+        tag_rows: List[int] = []
+        tag_cols: List[int] = []
+        for path in paths:
+            u = node_of[path]
+            record = notes[path]
+            for target in record["links"]:
+                v = by_key.get(note_key(target))
+                if v is None:
+                    v = by_key.get(note_key(PurePosixPath(target).name))
+                if v is None or v == u:
+                    continue
+                pair = (min(u, v), max(u, v))
+                edges[pair] = edges.get(pair, 0) + 1
+            for tag in record["tags"]:
+                tag_rows.append(u)
+                tag_cols.append(tag_ids.setdefault(tag, len(tag_ids)))
+
+        n = len(paths)
+        if edges:
+            pairs = np.array(list(edges.keys()), dtype=np.int64)
+            counts = np.array(list(edges.values()), dtype=np.float32)
+            rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+            cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+            weights = np.concatenate([counts, counts])
+        else:
+            rows = cols = np.zeros(0, dtype=np.int64)
+            weights = np.zeros(0, dtype=np.float32)
+        degree = np.bincount(rows, minlength=n).astype(np.float32)
+        if len(rows):
+            weights = weights / np.sqrt(degree[rows] * degree[cols])
+        order = np.argsort(rows, kind="stable")
+        return {
+            "paths": paths,
+            "node_of": node_of,
+            "indptr": np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64),
+            "indices": cols[order],
+            "weights": weights[order].astype(np.float32),
+            "rows": rows[order],
+            "tag_rows": np.array(tag_rows, dtype=np.int64),
+            "tag_cols": np.array(tag_cols, dtype=np.int64),
+            "tag_size": np.bincount(np.array(tag_cols, dtype=np.int64), minlength=len(tag_ids)).astype(np.float32),
+        }
+
+    def neighbors(self, relative_path: str) -> List[str]:
+        """Notes linked to or from ``relative_path``."""
+        csr = self._build()
+        u = csr["node_of"].get(relative_path)
+        if u is None:
+            return []
+        return [csr["paths"][v] for v in csr["indices"][csr["indptr"][u] : csr["indptr"][u + 1]]]
+
+    def expand(
+        self,
+        seeds: Dict[str, float],
+        hops: int = 1,
+        limit: int = 5,
+        tag_weight: float = 0.5,
+        decay: float = 0.5,
+    ) -> List[Tuple[str, float]]:
+        """Spread seed scores over links and shared tags and return the best new notes.
+
+        Args:
+            seeds: ``{relative_path: score}`` for the notes already retrieved.
+            hops: How many link/tag hops to spread (1 or 2 is usually enough).
+            limit: Maximum number of expanded notes to return.
+            tag_weight: Weight of a shared-tag hop relative to a direct link.
+            decay: Multiplier applied to every hop after the first.
+
+        Returns:
+            ``(relative_path, score)`` pairs for notes not in ``seeds``, best
+            first. A note linked from several seeds sums their contributions,
+            so notes that connect the retrieved notes rank highest.
+        """
+        csr = self._build()
+        n = len(csr["paths"])
+        frontier = np.zeros(n, dtype=np.float32)
+        for path, score in seeds.items():
+            u = csr["node_of"].get(path)
+            if u is not None:
+                frontier[u] += score
+        if not frontier.any() or hops <= 0 or limit <= 0:
+            return []
+
+        seed_mask = frontier > 0
+        total = np.zeros(n, dtype=np.float32)
+        for hop in range(hops):
+            spread = np.bincount(csr["indices"], weights=csr["weights"] * frontier[csr["rows"]], minlength=n)
+            if len(csr["tag_rows"]) and tag_weight > 0:
+                tag_mass = np.bincount(csr["tag_cols"], weights=frontier[csr["tag_rows"]], minlength=len(csr["tag_size"]))
+                shared = np.bincount(csr["tag_rows"], weights=(tag_mass / csr["tag_size"])[csr["tag_cols"]], minlength=n)
+                # A note shares all of its own tags with itself; only count the other notes' mass.
+                own = np.bincount(csr["tag_rows"], weights=frontier[csr["tag_rows"]] / csr["tag_size"][csr["tag_cols"]], minlength=n)
+                spread += tag_weight * (shared - own)
+            frontier = (spread * (decay if hop else 1.0)).astype(np.float32)
+            total += frontier
+
+        total[seed_mask] = 0.0
+        candidates = np.flatnonzero(total > 1e-9)
+        candidates = candidates[np.argsort(-total[candidates], kind="stable")][:limit]
+        return [(csr["paths"][v], float(total[v])) for v in candidates]
+
+    def stats(self) -> Dict[str, int]:
+        csr = self._build()
+        return {
+            "graph_notes": len(csr["paths"]),
+            "graph_links": int(len(csr["indices"]) // 2),
+            "graph_tags": int(len(csr["tag_size"])),
+        }
@@ -1,48 +1,194 @@
+import asyncio
+import os
+import threading
 import time
 import sys
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Set
 
-from noteagent.core.folder_navigation import load_vault
 from noteagent.core.chroma_db import ObsidianChromaDB
-from noteagent.core.langchain_rag import traditional_obsidian_retrieval_chain
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.langchain_rag import build_rag_stages, multi_vault_retriever
+from noteagent.core.metrics import METRICS
+from noteagent.core.query_cache import QueryCache
+from noteagent.core.query_server import QueryServer
+from noteagent.core.vault_registry import VaultRegistry
+from noteagent.core.vault_watcher import VaultWatcher
 
 # ────────────────────────────────────────────────
 # CONFIG
 # ────────────────────────────────────────────────
 
 VAULT_DIR = Path.cwd() / "data/test_vault/kepano-obsidian-main"
-POLL_INTERVAL_SEC = 60  # how often to check for changes if no watcher
+MAIN_VAULT = "main"
+# Other vaults served from this process, by name; each is opened on first use (":use name" or ":sync name").
+EXTRA_VAULTS: Dict[str, Path] = {}
+WATCH_VAULT = True  # apply vault edits to the index live in the background
+POLL_INTERVAL_SEC = 5  # how often to check for changes if no watcher (watchdog not installed)
+WATCH_DEBOUNCE_SEC = 1.5  # wait for saves to settle before re-embedding
 DEFAULT_K = 7  # retrieval k
+HYBRID_RETRIEVAL = True  # fuse BM25 keyword matches with dense similarity
+CONTEXT_TOKEN_BUDGET = 6000  # max (estimated) tokens of retrieved notes sent to the LLM per question
+GRAPH_HOPS = 1  # add notes linked to the hits (wikilinks / shared tags) up to this many hops; 0 disables
 DEFAULT_LLM = "qwen3:14b"
+ASYNC_QUERIES = True  # read the next question (and retrieve its context) while an answer is streaming
+LOAD_WORKERS = min(4, (os.cpu_count() or 1) - 1) or 1  # processes parsing notes in iter_vault (1 = gather in-process)
+FAST_START = True  # with an existing index, answer right away and sync the vault in the background
+VECTOR_BACKEND = "chroma"  # "mmap" keeps vectors in a memory-mapped NumPy file instead of Chroma (near-instant start)
+VECTOR_QUANTIZATION = "none"  # mmap only: "int8" (4x smaller) or "binary" (32x) first pass, reranked in full precision
+HTTP_HOST = "127.0.0.1"  # `python -m noteagent.core.main --serve` answers over HTTP instead of the prompt
+HTTP_PORT = 8765
+MAX_CONCURRENT_GENERATIONS = 2  # LLM generations running at once in server mode; further queries queue
+METRICS_ENABLED = True  # per-stage timings and counters, shown by :status / :metrics and served at /metrics
+METRICS_EVENTS_PATH: Optional[Path] = None  # also append every timed span here as a JSON line
+METRICS_SNAPSHOT_PATH: Optional[Path] = None  # append a JSON-lines snapshot of all metrics on exit
+INSIGHTS_REPORT_PATH = Path.cwd() / "data/insights/insights.md"  # ":insights" writes its report here (and the raw report as .json)
+INSIGHTS_SUMMARIES = True  # one LLM call per cluster; False reports clusters, orphans and missing links only
 
 
 class AgentLoop:
     def __init__(self):
         self.vault_path = VAULT_DIR
+        self.registry: Optional[VaultRegistry] = None
         self.vector_db: Optional[ObsidianChromaDB] = None
+        self.active_vaults: List[str] = [MAIN_VAULT]
         self.rag_chains = []
+        self.context_stage = None
+        self.answer_stage = None
         self.last_full_index = None
         self.running = False
+        self.watcher: Optional[VaultWatcher] = None
+        self.startup_sync: Optional[threading.Thread] = None
+        self.query_cache: Optional[QueryCache] = None
+        self.k = DEFAULT_K
+        self.graph_hops = GRAPH_HOPS
+        self.context_budgeter = ContextBudgeter(max_tokens=CONTEXT_TOKEN_BUDGET)
 
-    def initialize(self):
-        print("[Agent] Loading vault...")
-        all_notes = load_vault(self.vault_path)
-
+    def initialize(self, fast_start: bool = FAST_START):
+        if METRICS_ENABLED:
+            METRICS.enable(METRICS_EVENTS_PATH)
+        started = time.perf_counter()
         print("[Agent] Initializing vector store...")
-        self.vector_db = ObsidianChromaDB(all_notes)
+        with METRICS.span("startup.open_index"):
+            # One embedding pool and Chroma client for every vault; the main vault keeps its original collection.
+            self.registry = VaultRegistry(vector_backend=VECTOR_BACKEND, vector_quantization=VECTOR_QUANTIZATION)
+            self.registry.register(MAIN_VAULT, self.vault_path, collection_name="obsidian_notes")
+            for name, path in EXTRA_VAULTS.items():
+                self.registry.register(name, path)
+            self.vector_db = self.registry.get(MAIN_VAULT)
+            has_index = self.vector_db.check_if_existing_vectorstorage()
 
-        if not self.vector_db.check_if_existing_vectorstorage():
+        # Notes are streamed from the vault straight into embedding batches.
+        if not has_index:
             print("[Agent] No documents found — creating full index...")
-            self.vector_db.create_new_note_index()
+            with METRICS.span("startup.full_index"):
+                self.reindex()
+        elif fast_start and self.vector_db.query_compatible:
+            # Queries are answered from the index as it is; edits made while the agent was down show up when this finishes.
+            # A rebuild for new chunk settings also runs here: queries use the old generation until it is swapped in.
+            print("[Agent] Existing index found — checking for updates in the background...")
+            self.startup_sync = threading.Thread(target=self.background_sync, name="startup-sync", daemon=True)
+            self.startup_sync.start()
         else:
+            # Also taken when the vectors come from another embedding model: they can't answer its queries, so rebuild before serving.
             print("[Agent] Existing index found — checking for updates...")
+            with METRICS.span("startup.sync"):
+                self.print_sync_report(self.sync_vault())
 
         print("[Agent] Building RAG chain...")
-        self.rag_chains.append(traditional_obsidian_retrieval_chain(self.vector_db, llm_model=DEFAULT_LLM))
+        with METRICS.span("startup.build_chain"):
+            # Invalidated automatically whenever a sync, re-index or watcher update writes to the index.
+            self.query_cache = QueryCache(lambda: self.registry.index_version)
+            self.build_chain()
 
         self.last_full_index = time.time()
-        print("[Agent] Ready.")
+
+        if WATCH_VAULT:
+            self.watcher = VaultWatcher(
+                self.vault_path,
+                self.apply_vault_changes,
+                debounce_sec=WATCH_DEBOUNCE_SEC,
+                poll_interval_sec=POLL_INTERVAL_SEC,
+            ).start()
+            print(f"[Agent] Watching vault for changes ({self.watcher.backend}).")
+        METRICS.observe("startup.ready", time.perf_counter() - started)
+        print(f"[Agent] Ready ({time.perf_counter() - started:.1f}s).")
+
+    def sync_vault(self) -> Dict[str, Any]:
+        from noteagent.core.folder_navigation import iter_vault  # deferred: obsidiantools + pandas cost ~0.7s to import
+
+        return self.vector_db.sync_notes(iter_vault(self.vault_path, workers=LOAD_WORKERS))
+
+    def reindex(self) -> None:
+        from noteagent.core.folder_navigation import iter_vault
+
+        self.vector_db.create_new_note_index(iter_vault(self.vault_path, workers=LOAD_WORKERS))
+
+    def background_sync(self):
+        try:
+            with METRICS.span("startup.background_sync"):
+                report = self.sync_vault()
+        except Exception as e:
+            print(f"\n[Sync] Background sync failed: {e}")
+            return
+        if report.get("changed") or report.get("added") or report.get("deleted"):
+            print("\n[Agent] Background sync finished.")
+            self.print_sync_report(report)
+
+    def apply_vault_changes(self, changed: Set[str], deleted: Set[str]):
+        """Watcher callback: re-parse only the touched notes and update their chunks."""
+        from noteagent.core.folder_navigation import unpack_note_file
+
+        vault_root = self.vault_path.resolve()
+        updated_notes = []
+        for rel_path in sorted(changed):
+            previous = self.vector_db.manifest.entries.get(rel_path)
+            note = unpack_note_file(vault_root / rel_path, vault_root, previous=previous)
+            if "error" not in note:
+                updated_notes.append(note)
+        report = self.vector_db.apply_note_changes(updated_notes, deleted)
+        if report["updated"] or report["deleted"]:
+            print(f"\n[Watcher] Re-indexed {report['updated']} note(s), removed {report['deleted']} ({report['total_sec']}s)")
+
+    def build_chain(self):
+        if self.active_vaults == [MAIN_VAULT]:
+            self.context_stage, self.answer_stage = build_rag_stages(
+                self.vector_db,
+                llm_model=DEFAULT_LLM,
+                k=self.k,
+                cache=self.query_cache,
+                hybrid=HYBRID_RETRIEVAL,
+                graph_hops=self.graph_hops,
+                budgeter=self.context_budgeter,
+            )
+        else:
+            # Across vaults hits are merged by dense distance; BM25 and graph expansion stay per-vault features.
+            self.context_stage, self.answer_stage = build_rag_stages(
+                self.registry,
+                llm_model=DEFAULT_LLM,
+                cache=self.query_cache,
+                budgeter=self.context_budgeter,
+                retriever=multi_vault_retriever(self.registry, self.active_vaults, k=self.k),
+            )
+        self.rag_chains = [self.context_stage | self.answer_stage]
+
+    def sync(self):
+        print("[Agent] Syncing index with vault...")
+        self.print_sync_report(self.sync_vault())
+
+    @staticmethod
+    def print_sync_report(report: Dict[str, Any]):
+        print("[Sync]")
+        for k, v in report.items():
+            print(f"  {k}: {v}")
+
+    @staticmethod
+    def print_timing(start: float, first_token_at: Optional[float], context: Optional[Dict[str, Any]] = None):
+        total = time.perf_counter() - start
+        ttft = f"{first_token_at - start:.1f}s" if first_token_at is not None else "n/a"
+        report = (context or {}).get("context_report")
+        tokens = f", context {report['tokens_packed']} tokens, saved {report['tokens_saved']}" if report else ""
+        print(f"\n[Agent] (first token {ttft}, total {total:.1f}s{tokens})\n")
 
     def handle_user_query(self, query: str):
         if not query.strip():
@@ -51,13 +197,70 @@ class AgentLoop:
         print(f"\n[You] {query}")
 
         try:
-            start = time.time()
-            answer = self.rag_chains[0].invoke(query)
-            elapsed = time.time() - start
-            print(f"[Agent] ({elapsed:.1f}s)\n{answer}\n")
+            start = time.perf_counter()
+            first_token_at = None
+            print("[Agent] ", end="", flush=True)
+            context = self.context_stage.invoke(query)
+            for token in self.answer_stage.stream(context):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                print(token, end="", flush=True)
+            METRICS.observe("query", time.perf_counter() - start)
+            self.print_timing(start, first_token_at, context)
         except Exception as e:
             print(f"[Error] {e}")
 
+    async def answer_queued_queries(self, queue: asyncio.Queue):
+        """Consume (query, context task) pairs in order and stream each answer.
+
+        Context tasks are started as soon as a question is typed, so embedding
+        and retrieval for queued questions overlap with the current generation.
+        """
+        while True:
+            query, context_task, start = await queue.get()
+            try:
+                first_token_at = None
+                print(f"\n[You] {query}\n[Agent] ", end="", flush=True)
+                context = await context_task
+                async for token in self.answer_stage.astream(context):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    print(token, end="", flush=True)
+                METRICS.observe("query", time.perf_counter() - start)
+                self.print_timing(start, first_token_at, context)
+            except Exception as e:
+                print(f"[Error] {e}")
+            finally:
+                queue.task_done()
+
+    async def run_async(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        answer_task = asyncio.create_task(self.answer_queued_queries(queue))
+        try:
+            while self.running:
+                user_input = (await asyncio.to_thread(input, "> ")).strip()
+                if user_input.startswith(":"):
+                    # Commands may rebuild the chain or touch the index, so let queued answers finish first.
+                    await queue.join()
+                    if not await asyncio.to_thread(self.handle_command, user_input[1:]):
+                        break
+                elif user_input:
+                    context_task = asyncio.create_task(self.context_stage.ainvoke(user_input))
+                    queue.put_nowait((user_input, context_task, time.perf_counter()))
+        finally:
+            answer_task.cancel()
+
+    def resolve_vaults(self, names: str) -> List[str]:
+        registered = {name.lower(): name for name in self.registry.names()}
+        if names.strip() == "all":
+            return list(registered.values())
+        resolved = []
+        for name in names.split(","):
+            if name.strip() not in registered:
+                raise KeyError(name.strip())
+            resolved.append(registered[name.strip()])
+        return resolved
+
     def handle_command(self, cmd: str) -> bool:
         cmd = cmd.strip().lower()
         if cmd in ("exit", "quit", "q"):
@@ -66,27 +269,79 @@ class AgentLoop:
 
         elif cmd == "reindex":
             print("[Agent] Full re-index requested...")
-            self.vector_db.create_new_note_index()
+            self.reindex()
             self.last_full_index = time.time()
             print("[Agent] Re-index complete.")
 
+        elif cmd == "sync":
+            self.sync()
+
+        elif cmd.startswith("sync "):
+            try:
+                for name in self.resolve_vaults(cmd[len("sync ") :]):
+                    print(f"[Agent] Syncing vault '{name}'...")
+                    self.print_sync_report(self.registry.sync(name, workers=LOAD_WORKERS))
+            except KeyError as e:
+                print(f"[Error] Unknown vault {e}. Registered: {', '.join(self.registry.names())}")
+
+        elif cmd == "vaults":
+            print("[Vaults]")
+            for name, info in self.registry.status()["vaults"].items():
+                active = "*" if name in self.active_vaults else " "
+                count = info["document_count"] if info["loaded"] else "not loaded"
+                print(f"  {active} {name}: {info['vault_path']} ({count})")
+
+        elif cmd.startswith("use "):
+            try:
+                self.active_vaults = self.resolve_vaults(cmd[len("use ") :])
+                print(f"[Agent] Answering from: {', '.join(self.active_vaults)}")
+                self.build_chain()
+            except KeyError as e:
+                print(f"[Error] Unknown vault {e}. Registered: {', '.join(self.registry.names())}")
+
         elif cmd == "status":
             status = self.vector_db.get_status()
+            if self.query_cache is not None:
+                status.update({f"query_cache_{k}": v for k, v in self.query_cache.stats().items()})
+            status.update(self.context_budgeter.stats())
             print("[Status]")
             for k, v in status.items():
                 print(f"  {k}: {v}")
+            self.print_metrics()
+
+        elif cmd == "insights":
+            self.insights()
+
+        elif cmd == "metrics":
+            self.print_metrics()
+
+        elif cmd == "metrics prom":
+            print(METRICS.to_prometheus(), end="")
+
+        elif cmd == "metrics reset":
+            METRICS.reset()
+            print("[Agent] Metrics reset.")
 
         elif cmd.startswith("set k="):
             try:
                 new_k = int(cmd.split("=")[1])
                 print(f"[Agent] Changing retrieval k to {new_k}")
                 # Re-create chain with new k
-                self.rag_chains = traditional_obsidian_retrieval_chain(self.vector_db, llm_model=DEFAULT_LLM)
+                self.k = new_k
+                self.build_chain()
             except:
                 print("[Error] Invalid k value")
 
+        elif cmd.startswith("set hops="):
+            try:
+                self.graph_hops = int(cmd.split("=")[1])
+                print(f"[Agent] Changing graph expansion hops to {self.graph_hops}")
+                self.build_chain()
+            except ValueError:
+                print("[Error] Invalid hops value")
+
         else:
-            print("Unknown command. Try: reindex, status, set k=10, exit")
+            print("Unknown command. Try: sync [vault], reindex, status, insights, metrics [prom|reset], vaults, use a,b|all, set k=10, set hops=1, exit")
 
         return True
 
@@ -94,9 +349,17 @@ class AgentLoop:
         self.initialize()
         self.running = True
 
-        print("\nAgent loop started. Commands: reindex, status, set k=NN, exit")
+        print("\nAgent loop started. Commands: sync [vault], reindex, status, insights, metrics [prom|reset], vaults, use a,b|all, set k=NN, set hops=N, exit")
         print("Or just type any question about your notes.\n")
 
+        if ASYNC_QUERIES:
+            try:
+                asyncio.run(self.run_async())
+            except (KeyboardInterrupt, EOFError):
+                print("\n[Agent] Interrupted. Shutting down...")
+            self.stop()
+            return
+
         while self.running:
             try:
                 user_input = input("> ").strip()
@@ -110,9 +373,6 @@ class AgentLoop:
                     # normal query
                     self.handle_user_query(user_input)
 
-                # Optional: poll for vault changes every few cycles
-                time.sleep(0.5)  # small delay to avoid CPU spin
-
             except KeyboardInterrupt:
                 print("\n[Agent] Interrupted. Shutting down...")
                 break
@@ -120,9 +380,80 @@ class AgentLoop:
                 print(f"[Unexpected error] {e}")
                 time.sleep(2)  # backoff
 
+        self.stop()
+
+    def serve(self, host: str = HTTP_HOST, port: int = HTTP_PORT):
+        """Serve /query, /search, /sync and /status over HTTP until interrupted."""
+        self.initialize()
+        server = QueryServer(
+            self.vector_db,
+            self.answer_stage,
+            vault_path=self.vault_path,
+            budgeter=self.context_budgeter,
+            query_cache=self.query_cache,
+            host=host,
+            port=port,
+            k=self.k,
+            hybrid=HYBRID_RETRIEVAL,
+            graph_hops=self.graph_hops,
+            max_generations=MAX_CONCURRENT_GENERATIONS,
+            load_workers=LOAD_WORKERS,
+        )
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("\n[Agent] Interrupted. Shutting down...")
+        self.stop()
+
+    def insights(self):
+        """Batch job: cluster the vault, find orphans and missing links, summarise each cluster with one LLM call."""
+        from noteagent.core.insights import generate_insights, write_report  # deferred: only this command needs it
+
+        llm = None
+        if INSIGHTS_SUMMARIES:
+            from langchain_ollama import OllamaLLM
+
+            llm = OllamaLLM(model=DEFAULT_LLM)
+        print("[Agent] Generating vault insights...")
+        try:
+            report = generate_insights(self.vector_db, llm=llm)
+        except Exception as e:
+            print(f"[Error] {e}")
+            return
+        path = write_report(report, INSIGHTS_REPORT_PATH)
+        print(
+            f"[Insights] {report['notes']} notes, {len(report['clusters'])} clusters, {len(report['orphans'])} orphans, "
+            f"{len(report['missing_links'])} likely missing links -> {path}"
+        )
+        print("  " + ", ".join(f"{name} {value}" for name, value in report["timings"].items()))
+
+    @staticmethod
+    def print_metrics():
+        if not METRICS.enabled:
+            print("[Metrics] disabled (set METRICS_ENABLED or NOTEAGENT_METRICS=1)")
+            return
+        print("[Metrics]")
+        for line in METRICS.summary_lines():
+            print(f"  {line}")
+
+    def stop(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.startup_sync is not None and self.startup_sync.is_alive():
+            # Let it finish writing the manifest and side indexes rather than dying mid-write.
+            print("[Agent] Waiting for the background sync to finish...")
+            self.startup_sync.join()
+        if self.registry is not None:
+            self.registry.close()
+        if METRICS_SNAPSHOT_PATH is not None and METRICS.enabled:
+            METRICS.write_jsonl(METRICS_SNAPSHOT_PATH)
+        METRICS.close()
         print("[Agent] Loop ended.")
 
 
 if __name__ == "__main__":
     agent = AgentLoop()
-    agent.run()
+    if "--serve" in sys.argv[1:]:
+        agent.serve()
+    else:
+        agent.run()
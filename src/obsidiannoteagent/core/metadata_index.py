@@ -0,0 +1,272 @@
+import datetime as dt
+import json
+import os
+import re
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+
+# Conditions ``NoteMetadataIndex.select`` understands.
+SCOPE_KEYS = frozenset({"tags", "folder", "modified_after", "modified_before", "frontmatter"})
+
+# Frontmatter keys that are indexed as tags, or are lists with no useful scalar form.
+_FRONTMATTER_SKIP = {"tags", "tag", "aliases", "alias", "cssclasses", "cssclass"}
+
+# Scope tokens typed into a question, see ``parse_scope``.
+_SCOPE_TOKEN = re.compile(r'(?<!\S)(?:#(?P<tag>[^\W\d][\w/-]*)|(?P<op>folder|in|after|since|before|prop):(?:"(?P<quoted>[^"]*)"|(?P<value>\S+)))')
+_RELATIVE_DATE = re.compile(r"(\d+)([dwmy])")
+_DAYS_PER_UNIT = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lstrip("#").lower()
+
+
+def note_tags(note: Dict[str, Any]) -> List[str]:
+    """Inline tags plus the ``tags`` frontmatter field, lowercased and without ``#``."""
+    tags = list(note.get("tags") or [])
+    frontmatter = note.get("frontmatter") or {}
+    for key in ("tags", "tag"):
+        value = frontmatter.get(key) if isinstance(frontmatter, dict) else None
+        if isinstance(value, str):
+            tags.extend(re.split(r"[,\s]+", value))
+        elif isinstance(value, list):
+            tags.extend(str(item) for item in value if item is not None)
+    return sorted({normalize_tag(tag) for tag in tags if normalize_tag(tag)})
+
+
+def note_folder(relative_path: str) -> str:
+    folder = PurePosixPath(relative_path).parent.as_posix()
+    return "" if folder == "." else folder
+
+
+def note_timestamp(note: Dict[str, Any]) -> Optional[float]:
+    """``last_modified`` as a Unix timestamp (naive ISO times are UTC, as ``folder_navigation`` writes them)."""
+    value = note.get("last_modified")
+    if not value:
+        return None
+    try:
+        parsed = dt.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed.timestamp()
+
+
+def frontmatter_fields(note: Dict[str, Any]) -> Dict[str, str | int | float | bool]:
+    """Scalar frontmatter values, typed; dates become ISO strings and lists are dropped."""
+    frontmatter = note.get("frontmatter") or {}
+    if not isinstance(frontmatter, dict):
+        return {}
+    fields: Dict[str, str | int | float | bool] = {}
+    for key, value in frontmatter.items():
+        key = str(key).strip()
+        if not key or key.lower() in _FRONTMATTER_SKIP or value is None:
+            continue
+        if isinstance(value, (dt.date, dt.datetime)):
+            value = value.isoformat()
+        if isinstance(value, (str, int, float, bool)):
+            fields[key] = value
+    return fields
+
+
+def _field_value(value: Any) -> str:
+    """Frontmatter values are matched case-insensitively as text (``true``, ``3``, ``done``)."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).strip().lower()
+
+
+def _parse_date(value: str, now: float) -> Optional[float]:
+    relative = _RELATIVE_DATE.fullmatch(value.lower())
+    if relative:
+        return now - int(relative.group(1)) * _DAYS_PER_UNIT[relative.group(2)] * 86400.0
+    try:
+        parsed = dt.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_scope(question: str, now: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+    """Pull scope tokens out of a question.
+
+    Understood tokens (any number, anywhere in the question):
+
+    * ``#project`` - notes tagged ``project`` (or a nested ``project/...`` tag);
+    * ``folder:References`` or ``in:"Area/Sub folder"`` - notes under that folder;
+    * ``after:2024-05-01``, ``since:30d``, ``before:2w`` - by last modification,
+      as an ISO date or days/weeks/months/years ago;
+    * ``prop:status=done`` - a frontmatter field with that value.
+
+    Returns:
+        ``(question without the tokens, scope)``. The scope dict is empty when
+        the question has no tokens and is accepted by ``NoteMetadataIndex.select``.
+        Unparseable dates are left in the question.
+    """
+    now = time.time() if now is None else now
+    scope: Dict[str, Any] = {}
+
+    def take(match: re.Match) -> str:
+        if match.group("tag"):
+            scope.setdefault("tags", []).append(normalize_tag(match.group("tag")))
+            return ""
+        op, value = match.group("op"), match.group("quoted") if match.group("quoted") is not None else match.group("value")
+        if op in ("folder", "in"):
+            scope["folder"] = value.strip("/")
+        elif op == "prop":
+            key, sep, field = value.partition("=")
+            if not sep or not key:
+                return match.group(0)
+            scope.setdefault("frontmatter", {})[key] = field
+        else:
+            timestamp = _parse_date(value, now)
+            if timestamp is None:
+                return match.group(0)
+            scope["modified_before" if op == "before" else "modified_after"] = timestamp
+        return ""
+
+    stripped = _SCOPE_TOKEN.sub(take, question)
+    return " ".join(stripped.split()), scope
+
+
+class NoteMetadataIndex:
+    """Inverted index from tags, folders, frontmatter fields and mtimes to note paths.
+
+    Lets retrieval narrow a search to the notes in scope ("#project notes in
+    References/ edited this month") before any vector is scored. Like
+    ``LinkGraph`` the source of truth is a small per-note record, updated as
+    notes are ingested, synced or deleted and persisted as JSON next to the
+    collection; the lookup tables are rebuilt lazily after any change.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path) if path is not None else None
+        self.reset()
+
+    def reset(self) -> None:
+        self.notes: Dict[str, Dict[str, Any]] = {}
+        self._tables: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __contains__(self, relative_path: str) -> bool:
+        return relative_path in self.notes
+
+    def load(self) -> "NoteMetadataIndex":
+        self.reset()
+        if self.path is None or not self.path.exists():
+            return self
+        try:
+            self.notes = json.loads(self.path.read_text(encoding="utf-8")).get("notes", {})
+        except (OSError, json.JSONDecodeError):
+            self.reset()
+        return self
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"notes": self.notes}), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def update_note(self, note: Dict[str, Any]) -> None:
+        rel_path = note.get("relative_path", "unknown")
+        record = {
+            "folder": note_folder(rel_path),
+            "tags": note_tags(note),
+            "modified": note_timestamp(note),
+            "fields": {key.lower(): _field_value(value) for key, value in frontmatter_fields(note).items()},
+        }
+        if self.notes.get(rel_path) != record:
+            self.notes[rel_path] = record
+            self._tables = None
+
+    def remove_note(self, relative_path: str) -> None:
+        if self.notes.pop(relative_path, None) is not None:
+            self._tables = None
+
+    def _build(self) -> Dict[str, Any]:
+        if self._tables is not None:
+            return self._tables
+        tags: Dict[str, Set[str]] = {}
+        folders: Dict[str, Set[str]] = {}
+        fields: Dict[Tuple[str, str], Set[str]] = {}
+        dated: List[Tuple[float, str]] = []
+        for path, record in list(self.notes.items()):
+            for tag in record["tags"]:
+                tags.setdefault(tag, set()).add(path)
+            folders.setdefault(record["folder"], set()).add(path)
+            for key, value in record["fields"].items():
+                fields.setdefault((key, value), set()).add(path)
+            if record["modified"] is not None:
+                dated.append((record["modified"], path))
+        dated.sort()
+        self._tables = {
+            "tags": tags,
+            "folders": folders,
+            "fields": fields,
+            "times": [timestamp for timestamp, _ in dated],
+            "dated_paths": [path for _, path in dated],
+        }
+        return self._tables
+
+    @staticmethod
+    def _under(prefix: str, names: Iterable[str]) -> List[str]:
+        """``names`` equal to ``prefix`` or nested below it (``a`` matches ``a`` and ``a/b``, not ``ab``)."""
+        return [name for name in names if name == prefix or name.startswith(prefix + "/")]
+
+    def select(self, scope: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """Paths of the notes matching every condition in ``scope``.
+
+        ``scope`` keys (all optional): ``tags`` (list, all required; nested
+        tags match their parents), ``folder`` (the folder or any subfolder),
+        ``modified_after`` / ``modified_before`` (Unix timestamps) and
+        ``frontmatter`` (``{key: value}``, compared case-insensitively as text).
+
+        Returns:
+            ``None`` for an empty scope (no restriction), otherwise the set of
+            matching paths, which may be empty. The cost grows with the number
+            of matching notes, not with the size of the vault.
+        """
+        if not scope:
+            return None
+        tables = self._build()
+        candidates: List[Set[str]] = []
+        for tag in scope.get("tags") or []:
+            tag = normalize_tag(tag)
+            candidates.append(set().union(*(tables["tags"][name] for name in self._under(tag, tables["tags"]))))
+        folder = scope.get("folder")
+        if folder is not None:
+            folder = str(folder).strip("/")
+            names = list(tables["folders"]) if not folder else self._under(folder, tables["folders"])
+            candidates.append(set().union(*(tables["folders"][name] for name in names)))
+        for key, value in (scope.get("frontmatter") or {}).items():
+            candidates.append(tables["fields"].get((str(key).lower(), _field_value(value)), set()))
+        after, before = scope.get("modified_after"), scope.get("modified_before")
+        if after is not None or before is not None:
+            lo = bisect_left(tables["times"], after) if after is not None else 0
+            hi = bisect_right(tables["times"], before) if before is not None else len(tables["times"])
+            candidates.append(set(tables["dated_paths"][lo:hi]))
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        selected = set(candidates[0])
+        for other in candidates[1:]:
+            selected &= other
+        return selected
+
+    def stats(self) -> Dict[str, int]:
+        tables = self._build()
+        return {
+            "metadata_notes": len(self.notes),
+            "metadata_tags": len(tables["tags"]),
+            "metadata_folders": len(tables["folders"]),
+            "metadata_fields": len(tables["fields"]),
+        }
@@ -0,0 +1,223 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# Histogram bucket upper bounds in seconds (Prometheus ``le`` labels).
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SAMPLES = 1024
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Timing:
+    """Count, total, min/max, bucket counts and a window of recent samples for one span name."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "total_sec": round(self.total, 4),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(recent[len(recent) // 2] * 1000, 3) if recent else 0.0,
+            "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 3) if recent else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Span timers and counters for the ingest and query pipelines.
+
+    Stages are timed with ``with METRICS.span("embed.documents"):`` and
+    counted with ``METRICS.count("chunks_embedded", n)``. Span names are
+    dotted ``<pipeline>.<stage>``; spans nest, so a parent's time includes
+    its children (``retrieve`` includes ``retrieve.dense``).
+
+    While disabled ``span`` returns a shared no-op context manager and
+    ``count``/``observe`` return immediately, so instrumented code pays one
+    attribute check per call. When an ``events_path`` is set every finished
+    span is also appended to that file as a JSON line.
+    """
+
+    def __init__(self, enabled: bool = False, events_path: Optional[str | Path] = None):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timings: Dict[str, _Timing] = {}
+        self._counters: Dict[str, float] = {}
+        self._events: Optional[TextIO] = None
+        self._started = time.time()
+        if events_path is not None:
+            self.enable(events_path)
+
+    def enable(self, events_path: Optional[str | Path] = None) -> None:
+        with self._lock:
+            if events_path is not None and self._events is None:
+                self._events = open(events_path, "a", encoding="utf-8", buffering=1 << 16)
+            self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._started = time.time()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = _Timing()
+            timing.add(seconds)
+            if self._events is not None:
+                self._events.write(json.dumps({"ts": round(time.time(), 6), "span": name, "ms": round(seconds * 1000, 3)}) + "\n")
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def timed(self, name: str) -> Callable:
+        """Decorator form of ``span``."""
+
+        def decorate(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def timed_iter(self, name: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield from ``items``, timing only the work done producing each item (not the consumer's)."""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter() if self.enabled else None
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            if start is not None:
+                self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ts": round(time.time(), 3),
+                "uptime_sec": round(time.time() - self._started, 3),
+                "spans": {name: timing.summary() for name, timing in sorted(self._timings.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def summary_lines(self) -> List[str]:
+        """One human-readable line per span and counter, for ``:status``."""
+        snapshot = self.snapshot()
+        lines = [
+            f"{name}: n={s['count']} total={s['total_sec']}s avg={s['avg_ms']}ms p50={s['p50_ms']}ms p95={s['p95_ms']}ms max={s['max_ms']}ms"
+            for name, s in snapshot["spans"].items()
+        ]
+        lines += [f"{name}: {value:g}" for name, value in snapshot["counters"].items()]
+        return lines
+
+    def write_jsonl(self, path: str | Path) -> None:
+        """Append the current snapshot to ``path`` as one JSON line."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    @staticmethod
+    def _metric_name(name: str) -> str:
+        return "".join(c if c.isalnum() else "_" for c in name)
+
+    def to_prometheus(self, prefix: str = "noteagent") -> str:
+        """Render spans as ``<prefix>_span_seconds`` histograms and counters as ``<prefix>_<name>_total``."""
+        with self._lock:
+            timings = [(name, list(t.buckets), t.count, t.total) for name, t in sorted(self._timings.items())]
+            counters = sorted(self._counters.items())
+        lines = [f"# HELP {prefix}_span_seconds Time spent in each pipeline stage.", f"# TYPE {prefix}_span_seconds histogram"]
+        for name, buckets, count, total in timings:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {count}')
+        for name, value in counters:
+            metric = f"{prefix}_{self._metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide instance used by the pipeline; NOTEAGENT_METRICS=1 turns it on at import time.
+METRICS = Metrics(enabled=os.environ.get("NOTEAGENT_METRICS", "") not in ("", "0"))
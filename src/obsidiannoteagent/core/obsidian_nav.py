@@ -1,10 +1,13 @@
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 from langchain_chroma import Chroma
 
+from noteagent.core.chunking import NoteChunker
+from noteagent.core.embedding_cache import CachedEmbeddings, EmbeddingCache
+
 
 def ingest_plain_text(
     notes_list: List[Dict[str, Any]],
@@ -13,45 +16,46 @@ def ingest_plain_text(
     chunk_size: int = 1200,
     chunk_overlap: int = 200,
     min_text_length: int = 50,
+    embedding_cache_size: int = 500_000,
+    embeddings: Optional[Embeddings] = None,
+    client: Optional[Any] = None,
 ) -> Chroma:
-    embeddings = OllamaEmbeddings(
-        model=embedding_model,
-        base_url="http://localhost:11434",
-    )
-    vectorstore = Chroma(
-        collection_name="obsiddian_plain_text",
-        embedding_function=embeddings,
-        persist_directory=str(persist_dir),
-    )
+    """Chunk and embed notes into the plain-text collection.
+
+    Pass ``embeddings`` and ``client`` (e.g. ``VaultRegistry.embeddings`` and
+    ``VaultRegistry.client``) to reuse a running process's embedding pool and
+    Chroma client instead of opening new ones.
+    """
+    if embeddings is None:
+        embeddings = OllamaEmbeddings(
+            model=embedding_model,
+            base_url="http://localhost:11434",
+        )
+        if embedding_cache_size > 0:
+            # Same cache file as ObsidianChromaDB, so chunks already embedded there are reused.
+            cache = EmbeddingCache(Path(persist_dir) / "embedding_cache.sqlite", max_entries=embedding_cache_size)
+            embeddings = CachedEmbeddings(embeddings, cache, embedding_model)
+    if client is not None:
+        vectorstore = Chroma(client=client, collection_name="obsiddian_plain_text", embedding_function=embeddings)
+    else:
+        vectorstore = Chroma(
+            collection_name="obsiddian_plain_text",
+            embedding_function=embeddings,
+            persist_directory=str(persist_dir),
+        )
     documents = []
+    ids = []
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""],
-        add_start_index=True,
-    )
+    chunker = NoteChunker(chunk_size, chunk_overlap, min_text_length)
     for note in notes_list:
-        clean_text = note.get("clean_body", "").strip()
-        if len(clean_text) < min_text_length:
-            print(f"Skipping short/empty note: {note.get('relative_path')}")
-        metadata = {
-            "source": note.get("relative_path", "unkown"),
-            "note_name": note.get("name", ""),
-            "n_backlinks": note.get("n_backlinks", 0),
-            "n_tags": note.get("n_tags", 0),
-        }
-        chunks = text_splitter.create_documents(
-            [clean_text],
-            metadatas=[metadata] * len(text_splitter.split_text(clean_text)),
-        )
-        documents.extend(chunks)
+        note_docs, note_ids = chunker.chunk_note(note)
+        documents.extend(note_docs)
+        ids.extend(note_ids)
     if not documents:
         print("No valid text to index.")
         return vectorstore
 
-    vectorstore.add_documents(documents)
+    vectorstore.add_documents(documents, ids=ids)
     print(f"Ingestion complete")
     print(f"  - Total notes processed: {len(notes_list)}")
     print(f"  - Total chunks added:    {len(documents)}")
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+
+class QueryCache:
+    """Two-level cache in front of the RAG chain.
+
+    Level 1 maps a query embedding (plus k) to the ids and metadata of the
+    chunks that were retrieved for it, skipping the vector search; the
+    metadata keeps per-query fields such as ``graph_score``. Level 2 maps the fully
+    rendered prompt, which already contains the question and retrieved
+    context, to the LLM answer. Both levels are dropped as soon as
+    ``version_fn()`` (the index version) changes, so answers never outlive
+    the chunks they were built from.
+    """
+
+    def __init__(self, version_fn: Callable[[], int], max_entries: int = 256):
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = version_fn()
+        self._retrieval: OrderedDict[str, List[Tuple[str, Dict[str, Any]]]] = OrderedDict()
+        self._answers: OrderedDict[str, str] = OrderedDict()
+        self._counters = {"retrieval_hits": 0, "retrieval_misses": 0, "answer_hits": 0, "answer_misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def embedding_key(embedding: List[float], k: int, extra: str = "") -> str:
+        hasher = hashlib.sha256(array("f", embedding).tobytes())
+        hasher.update(f"|k={k}|{extra}".encode("utf-8"))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def prompt_key(prompt_text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\x00{prompt_text}".encode("utf-8")).hexdigest()
+
+    def version(self) -> int:
+        """The current index version; results must be stored under the version read before computing them."""
+        return self.version_fn()
+
+    def _check_version(self) -> None:
+        version = self.version_fn()
+        if version != self._version:
+            self._retrieval.clear()
+            self._answers.clear()
+            self._version = version
+            self._counters["invalidations"] += 1
+
+    def _get(self, store: OrderedDict, key: str, counter: str) -> Optional[Any]:
+        with self._lock:
+            self._check_version()
+            value = store.get(key)
+            if value is None:
+                self._counters[f"{counter}_misses"] += 1
+                return None
+            store.move_to_end(key)
+            self._counters[f"{counter}_hits"] += 1
+            return value
+
+    def _put(self, store: OrderedDict, key: str, value: Any, version: int) -> None:
+        with self._lock:
+            self._check_version()
+            # Don't cache results computed against an index that changed meanwhile.
+            if version != self._version:
+                return
+            store[key] = value
+            store.move_to_end(key)
+            while len(store) > self.max_entries:
+                store.popitem(last=False)
+
+    def get_retrieval(self, key: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        return self._get(self._retrieval, key, "retrieval")
+
+    def put_retrieval(self, key: str, hits: List[Tuple[str, Dict[str, Any]]], version: int) -> None:
+        """Cache ``(chunk id, metadata as retrieved)`` pairs, in rank order."""
+        self._put(self._retrieval, key, [(chunk_id, dict(metadata)) for chunk_id, metadata in hits], version)
+
+    def get_answer(self, key: str) -> Optional[str]:
+        return self._get(self._answers, key, "answer")
+
+    def put_answer(self, key: str, answer: str, version: int) -> None:
+        self._put(self._answers, key, answer, version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._retrieval.clear()
+            self._answers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            for level in ("retrieval", "answer"):
+                lookups = stats[f"{level}_hits"] + stats[f"{level}_misses"]
+                stats[f"{level}_hit_rate"] = round(stats[f"{level}_hits"] / lookups, 3) if lookups else 0.0
+            stats["retrieval_entries"] = len(self._retrieval)
+            stats["answer_entries"] = len(self._answers)
+            stats["index_version"] = self._version
+            return stats
@@ -0,0 +1,403 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.langchain_rag import format_docs, search_chunks
+from noteagent.core.metadata_index import SCOPE_KEYS, parse_scope
+from noteagent.core.metrics import METRICS
+from noteagent.core.query_cache import QueryCache
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+MAX_BODY_BYTES = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent query embeddings into batched ``embed_documents`` calls.
+
+    Each ``embed`` call queues its text; a collector waits up to
+    ``max_wait_ms`` for more texts (up to ``max_batch``) and embeds them in
+    one request on a worker thread. Up to ``max_inflight`` batches run at
+    once; while they do, new texts keep queueing, so batches grow with load.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch: int = 32, max_wait_ms: float = 5.0, max_inflight: int = 4):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_inflight = max_inflight
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batches = 0
+        self._texts = 0
+        self._largest = 0
+
+    async def embed(self, text: str) -> List[float]:
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._collector = asyncio.create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._embed_batch(batch))
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vectors = await asyncio.to_thread(self.embeddings.embed_documents, [text for text, _ in batch])
+            self._batches += 1
+            self._texts += len(batch)
+            self._largest = max(self._largest, len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embed_batches": self._batches,
+            "embed_batched_queries": self._texts,
+            "embed_avg_batch": round(self._texts / self._batches, 2) if self._batches else 0.0,
+            "embed_largest_batch": self._largest,
+        }
+
+    def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+
+
+class QueryServer:
+    """Asyncio HTTP/1.1 JSON server in front of one ``ObsidianChromaDB`` and its answer chain.
+
+    Endpoints:
+        ``POST /query``  ``{"question", "k"?, "scope"?, "stream"?}`` -> answer, sources and timings
+                         (``stream`` sends the answer tokens as a chunked text response).
+        ``POST /search`` ``{"query", "k"?, "scope"?}`` -> retrieved chunks, no LLM call.
+        ``POST /sync``   re-sync the index with the vault.
+        ``GET /status``  index, cache and server counters.
+        ``GET /metrics`` pipeline span timings and counters in Prometheus text format.
+
+    ``scope`` restricts retrieval to matching notes (``{"tags": [...],
+    "folder", "modified_after", "modified_before", "frontmatter": {...}}``,
+    see ``NoteMetadataIndex.select``); scope tokens typed into the question
+    (``#project``, ``folder:References``, ``since:30d``) work as well.
+
+    Query embeddings of concurrent requests are micro-batched by
+    ``EmbeddingBatcher``; retrieval runs on worker threads; at most
+    ``max_generations`` LLM generations run at once, the rest wait in line.
+    """
+
+    def __init__(
+        self,
+        db: ObsidianChromaDB,
+        answer_stage: Runnable,
+        vault_path: Optional[Path] = None,
+        budgeter: Optional[ContextBudgeter] = None,
+        query_cache: Optional[QueryCache] = None,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        k: int = 7,
+        hybrid: bool = True,
+        graph_hops: int = 0,
+        max_generations: int = 2,
+        embed_batch_size: int = 32,
+        embed_wait_ms: float = 5.0,
+        load_workers: int = 1,
+    ):
+        self.db = db
+        self.answer_stage = answer_stage
+        self.vault_path = vault_path
+        self.budgeter = budgeter
+        self.query_cache = query_cache
+        self.host = host
+        self.port = port
+        self.k = k
+        self.hybrid = hybrid
+        self.graph_hops = graph_hops
+        self.max_generations = max_generations
+        self.load_workers = load_workers
+        self.batcher = EmbeddingBatcher(db._embeddings, max_batch=embed_batch_size, max_wait_ms=embed_wait_ms)
+        self._generation_slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._counters = {"requests": 0, "errors": 0, "generations": 0, "generations_waiting": 0, "generations_running": 0}
+
+    async def start(self) -> "QueryServer":
+        self._generation_slots = asyncio.Semaphore(self.max_generations)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Report the real port when started with port=0.
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        print(f"[Server] Listening on http://{self.host}:{self.port} (max {self.max_generations} concurrent generations)")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        self.batcher.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _head(status: int, content_type: str, extra: str, keep_alive: bool) -> bytes:
+        connection = "keep-alive" if keep_alive else "close"
+        return f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\nContent-Type: {content_type}\r\nConnection: {connection}\r\n{extra}\r\n".encode(
+            "latin-1"
+        )
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(self._head(status, "application/json", f"Content-Length: {len(body)}\r\n", keep_alive) + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                    self._counters["requests"] += 1
+                    payload = json.loads(body) if body else {}
+                    if not isinstance(payload, dict):
+                        raise HTTPError(400, "Request body must be a JSON object")
+                    if path == "/query" and method == "POST" and payload.get("stream"):
+                        keep_alive = await self._stream_query(writer, payload, keep_alive)
+                    elif path == "/metrics" and method == "GET":
+                        body = METRICS.to_prometheus().encode("utf-8")
+                        writer.write(self._head(200, "text/plain; version=0.0.4", f"Content-Length: {len(body)}\r\n", keep_alive) + body)
+                        await writer.drain()
+                    else:
+                        await self._send_json(writer, 200, await self._dispatch(method, path, payload), keep_alive)
+                except HTTPError as e:
+                    self._counters["errors"] += 1
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except json.JSONDecodeError:
+                    self._counters["errors"] += 1
+                    await self._send_json(writer, 400, {"error": "Invalid JSON body"}, keep_alive)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    self._counters["errors"] += 1
+                    await self._send_json(writer, 500, {"error": str(e)}, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        routes = {"/query": ("POST", self.handle_query), "/search": ("POST", self.handle_search), "/sync": ("POST", self.handle_sync), "/status": ("GET", self.handle_status)}
+        if path not in routes:
+            raise HTTPError(404, f"No route for {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise HTTPError(405, f"{path} expects {expected}")
+        return await handler(payload)
+
+    async def retrieve(self, question: str, k: int, scope: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[Any], Dict[str, float]]:
+        """Embed (batched), retrieve and assemble the context for one question."""
+        start = time.perf_counter()
+        search_text, parsed_scope = parse_scope(question)
+        scope = {**parsed_scope, **(scope or {})}
+        embedding = await self.batcher.embed(search_text)
+        embedded = time.perf_counter()
+        METRICS.observe("query.embed", embedded - start)
+        docs = await asyncio.to_thread(search_chunks, self.db, search_text, embedding, k, self.hybrid, self.graph_hops, scope)
+        retrieved = time.perf_counter()
+        if self.budgeter is not None:
+            with METRICS.span("context.assemble"):
+                assembled = self.budgeter.assemble(docs)
+            context = {"context": assembled["context"], "context_report": assembled["report"], "question": question}
+        else:
+            context = {"context": format_docs(docs), "question": question}
+        timings = {"embed_sec": round(embedded - start, 4), "retrieve_sec": round(retrieved - embedded, 4)}
+        return context, docs, timings
+
+    @staticmethod
+    def _question(payload: Dict[str, Any], field: str) -> str:
+        question = payload.get(field)
+        if not isinstance(question, str) or not question.strip():
+            raise HTTPError(400, f"'{field}' must be a non-empty string")
+        return question.strip()
+
+    @staticmethod
+    def _scope(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        scope = payload.get("scope")
+        if scope is None:
+            return None
+        if not isinstance(scope, dict) or not set(scope) <= SCOPE_KEYS:
+            raise HTTPError(400, f"'scope' must be an object with keys from: {', '.join(sorted(SCOPE_KEYS))}")
+        if not isinstance(scope.get("tags", []), list) or not isinstance(scope.get("frontmatter", {}), dict):
+            raise HTTPError(400, "'scope.tags' must be a list and 'scope.frontmatter' an object")
+        return scope
+
+    def _k(self, payload: Dict[str, Any]) -> int:
+        k = payload.get("k", self.k)
+        if not isinstance(k, int) or not 1 <= k <= 100:
+            raise HTTPError(400, "'k' must be an integer between 1 and 100")
+        return k
+
+    async def _generation_slot(self) -> float:
+        """Wait for a free LLM slot; returns the seconds spent waiting."""
+        start = time.perf_counter()
+        self._counters["generations_waiting"] += 1
+        try:
+            await self._generation_slots.acquire()
+        finally:
+            self._counters["generations_waiting"] -= 1
+        self._counters["generations_running"] += 1
+        METRICS.observe("query.generation_queue", time.perf_counter() - start)
+        return time.perf_counter() - start
+
+    def _release_generation_slot(self) -> None:
+        self._counters["generations_running"] -= 1
+        self._counters["generations"] += 1
+        self._generation_slots.release()
+
+    @staticmethod
+    def _sources(docs: List[Any]) -> List[Dict[str, Any]]:
+        return [{"source": doc.metadata.get("source"), "chunk_id": doc.id} for doc in docs]
+
+    async def handle_query(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        question = self._question(payload, "question")
+        context, docs, timings = await self.retrieve(question, self._k(payload), self._scope(payload))
+        timings["queue_sec"] = round(await self._generation_slot(), 4)
+        generation_start = time.perf_counter()
+        try:
+            answer = await self.answer_stage.ainvoke(context)
+        finally:
+            self._release_generation_slot()
+        timings["generate_sec"] = round(time.perf_counter() - generation_start, 4)
+        timings["total_sec"] = round(time.perf_counter() - start, 4)
+        METRICS.observe("query", time.perf_counter() - start)
+        return {"answer": answer, "sources": self._sources(docs), "context_report": context.get("context_report"), "timings": timings}
+
+    async def _stream_query(self, writer: asyncio.StreamWriter, payload: Dict[str, Any], keep_alive: bool) -> bool:
+        """Stream the answer as a chunked body; returns whether the connection can be reused.
+
+        Errors before the 200 head is written propagate and become a JSON
+        error response. After it, the stream is ended with an ``X-Error``
+        trailer and the connection is closed instead, since a JSON response
+        in the middle of the chunked body would corrupt it.
+        """
+        question = self._question(payload, "question")
+        context, _, _ = await self.retrieve(question, self._k(payload), self._scope(payload))
+        await self._generation_slot()
+        try:
+            writer.write(self._head(200, "text/plain; charset=utf-8", "Transfer-Encoding: chunked\r\nTrailer: X-Error\r\n", keep_alive))
+            async for token in self.answer_stage.astream(context):
+                data = token.encode("utf-8")
+                if data:
+                    writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return keep_alive
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self._counters["errors"] += 1
+            message = " ".join(str(e).split()) or type(e).__name__
+            writer.write(f"0\r\nX-Error: {message[:200]}\r\n\r\n".encode("latin-1", errors="replace"))
+            await writer.drain()
+            return False
+        finally:
+            self._release_generation_slot()
+
+    async def handle_search(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        query = self._question(payload, "query")
+        context, docs, timings = await self.retrieve(query, self._k(payload), self._scope(payload))
+        results = [{**source, "text": doc.page_content} for source, doc in zip(self._sources(docs), docs)]
+        timings["total_sec"] = round(time.perf_counter() - start, 4)
+        return {"results": results, "context_report": context.get("context_report"), "timings": timings}
+
+    async def handle_sync(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.vault_path is None:
+            raise HTTPError(400, "Server was started without a vault path")
+        from noteagent.core.folder_navigation import iter_vault  # deferred: obsidiantools + pandas
+
+        # sync_notes takes the index write lock, so concurrent queries keep being served meanwhile.
+        return await asyncio.to_thread(lambda: self.db.sync_notes(iter_vault(self.vault_path, workers=self.load_workers)))
+
+    async def handle_status(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        status = await asyncio.to_thread(self.db.get_status)
+        if self.query_cache is not None:
+            status.update({f"query_cache_{k}": v for k, v in self.query_cache.stats().items()})
+        if self.budgeter is not None:
+            status.update(self.budgeter.stats())
+        status.update({f"server_{k}": v for k, v in self._counters.items()})
+        status.update(self.batcher.stats())
+        if METRICS.enabled:
+            status["metrics"] = METRICS.snapshot()
+        return status
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional
+
+from noteagent.core.metadata_index import frontmatter_fields, note_tags
+
+MANIFEST_VERSION = 1
+
+
+def note_fingerprint(note: Dict[str, Any]) -> str:
+    """Hash everything about a note that ends up in its Chroma chunks.
+
+    The clean body is what gets embedded; the name, link/tag counts, tags and
+    frontmatter are copied into chunk metadata, so a change to any of them
+    means the stored chunks are stale. Tags and frontmatter only enter the
+    hash when present, so notes without them keep their earlier fingerprint.
+    """
+    hasher = hashlib.sha256()
+    parts = [
+        note.get("clean_body", "") or "",
+        note.get("name", "") or "",
+        str(note.get("n_backlinks", 0)),
+        str(note.get("n_tags", 0)),
+    ]
+    tags, fields = note_tags(note), frontmatter_fields(note)
+    if tags or fields:
+        parts.append(json.dumps([tags, fields], sort_keys=True, default=str))
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+class NoteManifest:
+    """Per-note record of what is currently stored in a Chroma collection.
+
+    Lives next to the Chroma directory as ``<collection>.manifest.json`` and
+    maps each note's relative path to its mtime, content hash and the ids of
+    the chunks that were written for it. The embedding model and chunk
+    parameters are stored alongside so an index built with different settings
+    is never mistaken for an up-to-date one.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        embedding_model: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunker: str = "recursive",
+    ):
+        self.path = Path(path)
+        self.embedding_model = embedding_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunker = chunker
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.compatible = True
+        # Settings the stored index was built with that differ from the current ones (e.g. ["chunk_size"]).
+        self.stale_params: List[str] = []
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            "embedding_model": self.embedding_model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunker": self.chunker,
+        }
+
+    def load(self) -> "NoteManifest":
+        """Read the manifest from disk, if there is one.
+
+        A manifest written with different embedding/chunk settings is loaded
+        but flagged as incompatible so callers can force a rebuild.
+        """
+        self.entries = {}
+        self.compatible = True
+        self.stale_params = []
+        if not self.path.is_file():
+            return self
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {self.path}: {e}")
+            return self
+
+        self.entries = data.get("notes", {})
+        # Manifests written before the chunker was recorded used the recursive splitter.
+        stored_params = {key: data.get(key) for key in self.params}
+        stored_params["chunker"] = data.get("chunker") or "recursive"
+        self.stale_params = [key for key in self.params if stored_params[key] != self.params[key]]
+        self.compatible = data.get("version") == MANIFEST_VERSION and not self.stale_params
+        return self
+
+    def save(self) -> None:
+        """Atomically write the manifest next to the Chroma directory."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": MANIFEST_VERSION, **self.params, "notes": self.entries}
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        self.entries = {}
+        self.compatible = True
+        self.stale_params = []
+
+    def is_empty(self) -> bool:
+        return not self.entries
+
+    def record(self, note: Dict[str, Any], chunk_ids: List[str]) -> None:
+        self.entries[note.get("relative_path", "unknown")] = {
+            "mtime": note.get("last_modified"),
+            "hash": note_fingerprint(note),
+            "chunk_ids": list(chunk_ids),
+            # Kept so a single re-parsed note (see unpack_note_file) keeps its backlinks.
+            "backlinks": list(note.get("backlinks", [])),
+        }
+
+    def forget(self, relative_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.pop(relative_path, None)
+
+    def chunk_ids_for(self, relative_paths: List[str]) -> List[str]:
+        ids = []
+        for rel_path in relative_paths:
+            ids.extend(self.entries.get(rel_path, {}).get("chunk_ids", []))
+        return ids
+
+    def classify(self, note: Dict[str, Any]) -> str:
+        """Return ``"added"``, ``"changed"`` or ``"unchanged"`` for one note."""
+        entry = self.entries.get(note.get("relative_path", "unknown"))
+        if entry is None:
+            return "added"
+        if entry.get("hash") != note_fingerprint(note):
+            return "changed"
+        return "unchanged"
+
+    def diff(self, notes: Iterable[Dict[str, Any]]) -> Dict[str, List]:
+        """Compare freshly loaded notes against the manifest.
+
+        ``notes`` is consumed once, so it may be a generator; unchanged notes
+        are reduced to their path and not kept around.
+
+        Returns:
+            Dict with ``added`` and ``changed`` (lists of note dicts to embed),
+            ``deleted`` (relative paths no longer in the vault) and
+            ``unchanged`` (relative paths whose chunks are still current).
+        """
+        added, changed, unchanged = [], [], []
+        seen = set()
+        for note in notes:
+            rel_path = note.get("relative_path", "unknown")
+            seen.add(rel_path)
+            status = self.classify(note)
+            if status == "added":
+                added.append(note)
+            elif status == "changed":
+                changed.append(note)
+            else:
+                unchanged.append(rel_path)
+        deleted = [rel_path for rel_path in self.entries if rel_path not in seen]
+        return {
+            "added": added,
+            "changed": changed,
+            "deleted": deleted,
+            "unchanged": unchanged,
+        }
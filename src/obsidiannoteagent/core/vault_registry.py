@@ -0,0 +1,183 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from noteagent.core.embeddings import PooledOllamaEmbeddings
+
+
+def collection_name_for(vault_name: str) -> str:
+    """Chroma-safe collection name for a vault (letters, digits, ``_`` and ``-`` only)."""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", vault_name).strip("_-")
+    return f"vault_{slug or 'default'}"
+
+
+class VaultRegistry:
+    """Serves many vaults from one process.
+
+    Every vault gets its own Chroma collection (and manifest, BM25 index and
+    link graph next to it) but they all share one embedding pool, one
+    embedding cache and one Chroma client. A vault's ``ObsidianChromaDB`` is
+    only opened the first time it is used. Queries embed the question once
+    and fan out to the selected vaults on a shared thread pool; hits are
+    merged by distance, which is comparable because every collection uses
+    the same embedding model.
+    """
+
+    def __init__(
+        self,
+        db_location_path: str | Path = "./chroma_basic",
+        embedding_model: str = "bge-m3",
+        ollama_url: str = "http://localhost:11434",
+        embedding_batch_size: int = 32,
+        embedding_concurrency: int = 4,
+        embedding_cache_size: int = 500_000,
+        max_fanout: int = 8,
+        embeddings: Optional[Embeddings] = None,
+        **db_kwargs: Any,
+    ):
+        self.db_location_path = Path(db_location_path).expanduser().resolve()
+        self.embedding_model = embedding_model
+        self.db_kwargs = db_kwargs
+
+        if embeddings is None:
+            embeddings = PooledOllamaEmbeddings(
+                model=embedding_model,
+                base_url=ollama_url,
+                batch_size=embedding_batch_size,
+                max_concurrency=embedding_concurrency,
+            )
+            if embedding_cache_size > 0:
+                cache = EmbeddingCache(self.db_location_path / "embedding_cache.sqlite", max_entries=embedding_cache_size)
+                embeddings = CachedEmbeddings(embeddings, cache, embedding_model)
+        self.embeddings = embeddings
+        self.client = None
+        if db_kwargs.get("vector_backend", "chroma") == "chroma":
+            import chromadb  # deferred: about a second to import, and unused by the mmap backend
+
+            self.client = chromadb.PersistentClient(path=str(self.db_location_path))
+
+        self._vaults: Dict[str, Dict[str, Any]] = {}
+        self._dbs: Dict[str, ObsidianChromaDB] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_fanout, thread_name_prefix="vault-query")
+
+    def register(self, name: str, vault_path: str | Path, collection_name: Optional[str] = None) -> None:
+        """Add a vault; nothing is opened until it is first used."""
+        with self._lock:
+            self._vaults[name] = {
+                "vault_path": Path(vault_path),
+                "collection_name": collection_name or collection_name_for(name),
+            }
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def names(self) -> List[str]:
+        return list(self._vaults)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._dbs
+
+    def vault_path(self, name: str) -> Path:
+        return self._vaults[name]["vault_path"]
+
+    @property
+    def index_version(self) -> int:
+        """Sum of the loaded vaults' index versions; changes whenever any of them is written."""
+        return sum(db.index_version for db in list(self._dbs.values()))
+
+    def get(self, name: str) -> ObsidianChromaDB:
+        """Return the vault's index, opening its collection on first use."""
+        db = self._dbs.get(name)
+        if db is not None:
+            return db
+        if name not in self._vaults:
+            raise KeyError(f"Unknown vault: {name!r} (registered: {', '.join(self._vaults) or 'none'})")
+        # One lock per vault, so opening a big vault doesn't block queries to the others.
+        with self._load_locks[name]:
+            db = self._dbs.get(name)
+            if db is None:
+                db = ObsidianChromaDB(
+                    collection_name=self._vaults[name]["collection_name"],
+                    db_location_path=self.db_location_path,
+                    embedding_model=self.embedding_model,
+                    embeddings=self.embeddings,
+                    client=self.client,
+                    **self.db_kwargs,
+                )
+                self._dbs[name] = db
+        return db
+
+    def sync(self, name: str, workers: int = 1) -> Dict[str, Any]:
+        """Index the vault from scratch if its collection is empty, otherwise sync it incrementally."""
+        from noteagent.core.folder_navigation import iter_vault  # deferred: obsidiantools + pandas
+
+        db = self.get(name)
+        notes = iter_vault(self.vault_path(name), workers=workers)
+        if not db.check_if_existing_vectorstorage():
+            chunks = db.create_new_note_index(notes)
+            return {"mode": "full_index", "chunks_added": chunks}
+        return db.sync_notes(notes)
+
+    def _search_vault(self, name: str, embedding: List[float], k: int, scope: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        db = self.get(name)
+        sources = db.scope_sources(scope)
+        if sources is not None and not sources:
+            return []
+        hits = db._vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=db.source_filter(sources))
+        for doc, _ in hits:
+            doc.metadata["vault"] = name
+        return hits
+
+    def search(
+        self,
+        query: str,
+        vaults: Optional[Sequence[str]] = None,
+        k: int = 7,
+        per_vault_k: Optional[int] = None,
+        scope: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Search several vaults concurrently and merge the hits by distance.
+
+        Args:
+            query: The question text; it is embedded once for all vaults.
+            vaults: Vault names to search (default: every registered vault).
+            k: Number of hits to return overall.
+            per_vault_k: Hits taken from each vault before merging (default ``k``).
+            scope: Restricts every vault to the notes matching it (see ``NoteMetadataIndex.select``).
+
+        Returns:
+            ``(document, distance)`` pairs, closest first. Each document's
+            metadata carries the ``vault`` it came from.
+        """
+        names = list(vaults) if vaults else self.names()
+        embedding = self.embeddings.embed_query(query)
+        futures = [self._executor.submit(self._search_vault, name, embedding, per_vault_k or k, scope) for name in names]
+        merged = [hit for future in futures for hit in future.result()]
+        merged.sort(key=lambda hit: hit[1])
+        return merged[:k]
+
+    def status(self) -> Dict[str, Any]:
+        vaults = {}
+        for name, spec in self._vaults.items():
+            db = self._dbs.get(name)
+            vaults[name] = {
+                "collection": spec["collection_name"],
+                "vault_path": str(spec["vault_path"]),
+                "loaded": db is not None,
+                "document_count": db.count() if db is not None else None,
+            }
+        stats = self.embeddings.stats() if hasattr(self.embeddings, "stats") else {}
+        return {"vaults": vaults, **stats}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        inner = getattr(self.embeddings, "inner", self.embeddings)
+        if hasattr(inner, "close"):
+            inner.close()
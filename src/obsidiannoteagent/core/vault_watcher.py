@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Set
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency: fall back to mtime polling
+    FileSystemEventHandler = object
+    Observer = None
+
+IGNORED_DIRS = {".obsidian", ".trash", ".git", "node_modules"}
+
+
+def _is_note_path(rel_path: str) -> bool:
+    parts = Path(rel_path).parts
+    return rel_path.endswith(".md") and not any(part in IGNORED_DIRS for part in parts)
+
+
+class _NoteEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "VaultWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.notify(os.fsdecode(path))
+
+
+class VaultWatcher:
+    """Watches a vault for note edits and reports them in debounced batches.
+
+    Uses watchdog (inotify on Linux, FSEvents on macOS) when it is installed
+    and falls back to polling file mtimes every ``poll_interval_sec``. Bursts
+    of saves are collapsed: ``on_changes(changed, deleted)`` is called with
+    vault-relative paths once no event has arrived for ``debounce_sec``. The
+    callback runs on the watcher thread, never on the caller's.
+    """
+
+    def __init__(
+        self,
+        vault_path: Path,
+        on_changes: Callable[[Set[str], Set[str]], None],
+        debounce_sec: float = 1.0,
+        poll_interval_sec: float = 5.0,
+        use_native: bool = True,
+    ):
+        self.vault_path = Path(vault_path).resolve()
+        self.on_changes = on_changes
+        self.debounce_sec = debounce_sec
+        self.poll_interval_sec = poll_interval_sec
+        self.backend = "inotify" if use_native and Observer is not None else "polling"
+
+        self._pending: Set[str] = set()
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._observer = None
+        self._threads = []
+        self._mtimes: Dict[str, int] = {}
+
+    def notify(self, path: str) -> None:
+        """Record a touched path (absolute or vault-relative)."""
+        abs_path = Path(path)
+        if abs_path.is_absolute():
+            try:
+                rel_path = abs_path.relative_to(self.vault_path).as_posix()
+            except ValueError:
+                return
+        else:
+            rel_path = abs_path.as_posix()
+        if not _is_note_path(rel_path):
+            return
+        with self._cond:
+            self._pending.add(rel_path)
+            self._last_event = time.monotonic()
+            self._cond.notify()
+
+    def _scan_mtimes(self) -> Dict[str, int]:
+        mtimes = {}
+        for root, dirs, files in os.walk(self.vault_path):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for name in files:
+                if name.endswith(".md"):
+                    abs_path = os.path.join(root, name)
+                    try:
+                        mtimes[Path(abs_path).relative_to(self.vault_path).as_posix()] = os.stat(abs_path).st_mtime_ns
+                    except OSError:
+                        continue
+        return mtimes
+
+    def _poll_loop(self):
+        while not self._stopping:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping, timeout=self.poll_interval_sec)
+            if self._stopping:
+                break
+            current = self._scan_mtimes()
+            touched = {p for p, m in current.items() if self._mtimes.get(p) != m}
+            touched |= set(self._mtimes) - set(current)
+            self._mtimes = current
+            for rel_path in touched:
+                self.notify(rel_path)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping or self._pending)
+                if self._stopping:
+                    return
+                quiet_for = time.monotonic() - self._last_event
+                if quiet_for < self.debounce_sec:
+                    self._cond.wait(timeout=self.debounce_sec - quiet_for)
+                    continue
+                touched, self._pending = self._pending, set()
+
+            changed = {p for p in touched if (self.vault_path / p).is_file()}
+            try:
+                self.on_changes(changed, touched - changed)
+            except Exception as e:
+                print(f"[Watcher] Failed to apply changes: {e}")
+
+    def start(self) -> "VaultWatcher":
+        self._stopping = False
+        if self.backend == "inotify":
+            self._observer = Observer()
+            self._observer.schedule(_NoteEventHandler(self), str(self.vault_path), recursive=True)
+            self._observer.start()
+        else:
+            self._mtimes = self._scan_mtimes()
+            self._threads.append(threading.Thread(target=self._poll_loop, name="vault-poll", daemon=True))
+        self._threads.append(threading.Thread(target=self._flush_loop, name="vault-watch", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
@@ -0,0 +1,663 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+from abc import abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+VECTOR_BACKENDS = ("chroma", "mmap")
+VECTOR_QUANTIZATIONS = ("none", "int8", "binary")
+_SCAN_BLOCK_FLOATS = 1 << 18  # int8 rows are dequantised ~1 MB at a time; larger float32 copies fall out of cache and scan 3x slower
+
+
+class NoteVectorStore(VectorStore):
+    """A LangChain ``VectorStore`` plus the bookkeeping ``ObsidianChromaDB`` needs from its backend.
+
+    Retrieval code only uses the standard ``VectorStore`` API (and
+    ``similarity_search_by_vector_with_relevance_scores``, which returns
+    distances, lower is closer); index maintenance goes through the methods
+    below so no caller reaches into a backend's internals.
+    """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live chunks."""
+
+    @abstractmethod
+    def iter_texts(self, page_size: int = 5000) -> Iterator[Tuple[List[str], List[str]]]:
+        """Yield ``(ids, texts)`` pages covering every live chunk."""
+
+    @abstractmethod
+    def iter_embeddings(self, page_size: int = 5000) -> Iterator[Tuple[List[str], np.ndarray, List[dict]]]:
+        """Yield ``(ids, float32 embeddings, metadatas)`` pages covering every live chunk."""
+
+    @abstractmethod
+    def ids_for_source(self, source: str) -> List[str]:
+        """Ids of the chunks whose ``source`` metadata is ``source``."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Drop every chunk and start an empty collection."""
+
+    @abstractmethod
+    def drop(self) -> None:
+        """Delete the collection and its files for good."""
+
+    @abstractmethod
+    def add_embedded(self, texts: List[str], embeddings: List[List[float]], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Upsert chunks whose embeddings were computed by the caller."""
+
+    @abstractmethod
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """``(document, distance)`` pairs, closest first."""
+
+
+def compile_filter(where: Optional[Dict[str, Any]]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Turn a Chroma-style ``where`` dict into a predicate over a metadata dict.
+
+    Supports ``{"field": value}``, the operators ``$eq``, ``$ne``, ``$in``,
+    ``$nin``, ``$gt``, ``$gte``, ``$lt``, ``$lte`` and ``$and`` / ``$or``.
+    """
+    if not where:
+        return None
+    compare = {
+        "$eq": lambda a, b: a == b,
+        "$ne": lambda a, b: a != b,
+        "$in": lambda a, b: a in b,
+        "$nin": lambda a, b: a not in b,
+        "$gt": lambda a, b: a is not None and a > b,
+        "$gte": lambda a, b: a is not None and a >= b,
+        "$lt": lambda a, b: a is not None and a < b,
+        "$lte": lambda a, b: a is not None and a <= b,
+    }
+    clauses: List[Callable[[Dict[str, Any]], bool]] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [compile_filter(part) for part in condition]
+            combine = all if key == "$and" else any
+            clauses.append(lambda meta, parts=parts, combine=combine: combine(part(meta) for part in parts))
+        elif isinstance(condition, dict):
+            for op, value in condition.items():
+                if op not in compare:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                clauses.append(lambda meta, key=key, fn=compare[op], value=value: fn(meta.get(key), value))
+        else:
+            clauses.append(lambda meta, key=key, value=condition: meta.get(key) == value)
+    return lambda meta: all(clause(meta) for clause in clauses)
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compress unit-normalised float32 rows for the first search pass.
+
+    ``int8`` scales each row by its largest component so it spans -127..127
+    and returns the per-row scales (4x smaller); ``binary`` keeps one sign
+    bit per dimension, packed (32x smaller), and returns no scales.
+    """
+    if quantization == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12).astype(np.float32) / 127.0
+        return np.rint(vectors / scales[:, None]).astype(np.int8), scales
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=1), None
+    raise ValueError(f"Unknown quantization {quantization!r}; expected one of {', '.join(VECTOR_QUANTIZATIONS)}")
+
+
+class _Snapshot:
+    """What a search reads from one ``MmapVectorStore`` generation, published as a unit.
+
+    A snapshot is never modified after it is published: writes publish a new
+    one. Row lists (``ids``, ``spans``, ``metadatas``) and the id/source maps
+    are shared by the snapshots of one generation; the lists only grow, and
+    readers never look past the rows of their own ``alive`` mask.
+    """
+
+    __slots__ = ("ids", "spans", "metadatas", "alive", "row_of", "by_source", "vectors", "codes", "scales", "texts_file")
+
+    def __init__(
+        self,
+        ids: List[str],
+        spans: List[Tuple[int, int]],
+        metadatas: List[Dict[str, Any]],
+        alive: np.ndarray,
+        row_of: Dict[str, int],
+        by_source: Dict[str, List[int]],
+        vectors: np.ndarray,
+        codes: Optional[np.ndarray],
+        scales: Optional[np.ndarray],
+        texts_file: Any,
+    ):
+        self.ids = ids
+        self.spans = spans
+        self.metadatas = metadatas
+        self.alive = alive
+        self.row_of = row_of
+        self.by_source = by_source
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+        self.texts_file = texts_file
+
+    def replace(self, **changes: Any) -> "_Snapshot":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        return _Snapshot(**{**fields, **changes})
+
+
+class MmapVectorStore(NoteVectorStore):
+    """Flat vector store: float32 vectors in a memory-mapped NumPy file plus small sidecars.
+
+    Files of a generation directory (``CURRENT`` names the live one):
+
+    - ``vectors.f32``: unit-normalised embeddings, one row per chunk, append-only.
+    - ``texts.bin``: chunk texts (UTF-8), append-only.
+    - ``rows.jsonl``: one line per write batch with the batch's ids, text spans
+      and metadata, or the rows it tombstones.
+    - ``header.json``: committed row count and file sizes, replaced atomically
+      last, so a write interrupted half-way is cut off on the next open.
+
+    Opening only reads the header; the sidecar is parsed and the vectors are
+    mapped on first use. Search is an exact brute-force dot product over the
+    mapped rows, with tombstoned rows masked out. Distances are squared L2
+    between unit vectors (``2 - 2 * cosine``), matching Chroma's default
+    ``l2`` space for normalised embeddings. Re-adding an id tombstones its old
+    row. When tombstones exceed ``compact_ratio`` of the rows, the live rows
+    are copied into a new generation and ``CURRENT`` is switched to it.
+    Searches take no lock: each reads one ``_Snapshot`` of the parsed rows
+    and mappings, and writes (compaction included) swap in a new one.
+
+    With ``quantization`` set to ``"int8"`` or ``"binary"`` the first pass
+    scans compressed codes (``codes.i8`` + ``scales.f32``, or ``codes.b1``)
+    instead of the float32 rows, keeps the best ``k * rerank_factor``
+    candidates and rescores only those against ``vectors.f32``, so the full
+    precision file is paged in a few rows at a time rather than held in
+    memory. Codes are derived data: missing ones (an index written without
+    quantization) are computed from the vectors when the store is loaded.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        embedding_function: Embeddings,
+        compact_ratio: float = 0.25,
+        quantization: str = "none",
+        rerank_factor: int = 4,
+    ):
+        if quantization not in VECTOR_QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected one of {', '.join(VECTOR_QUANTIZATIONS)}")
+        self.path = Path(path)
+        self._embedding_function = embedding_function
+        self.compact_ratio = compact_ratio
+        self.quantization = quantization
+        self.rerank_factor = max(1, rerank_factor)
+        self._lock = threading.RLock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        current = self.path / "CURRENT"
+        self._generation = current.read_text(encoding="utf-8").strip() if current.exists() else self._new_generation(0)
+        self._header = self._read_header()
+        self._state: Optional[_Snapshot] = None  # loaded on first use
+
+    # -- files ------------------------------------------------------------
+
+    def _new_generation(self, number: int) -> str:
+        name = f"gen-{number:06d}"
+        gen_dir = self.path / name
+        gen_dir.mkdir(parents=True, exist_ok=True)
+        for file_name in ("vectors.f32", "texts.bin", "rows.jsonl"):
+            (gen_dir / file_name).touch()
+        self._write_json(gen_dir / "header.json", {"dim": 0, "rows": 0, "deleted": 0, "texts_bytes": 0, "rows_bytes": 0})
+        self._write_text(self.path / "CURRENT", name)
+        return name
+
+    @staticmethod
+    def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+        MmapVectorStore._write_text(path, json.dumps(payload))
+
+    @staticmethod
+    def _write_text(path: Path, text: str) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    @property
+    def _gen_dir(self) -> Path:
+        return self.path / self._generation
+
+    def _read_header(self) -> Dict[str, Any]:
+        return json.loads((self._gen_dir / "header.json").read_text(encoding="utf-8"))
+
+    def _ensure_loaded(self) -> "_Snapshot":
+        state = self._state
+        if state is not None:
+            return state
+        with self._lock:
+            if self._state is None:
+                self._state = self._load_state()
+            return self._state
+
+    def _load_state(self) -> "_Snapshot":
+        """Parse the committed rows of the current generation and map its files."""
+        header = self._header
+        n_rows = header["rows"]
+        ids: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        metadatas: List[Dict[str, Any]] = []
+        alive = np.ones(n_rows, dtype=bool)
+        with open(self._gen_dir / "rows.jsonl", "rb") as f:
+            committed = f.read(header["rows_bytes"])
+        for line in committed.splitlines():
+            record = json.loads(line)
+            if "deleted" in record:
+                alive[[row for row in record["deleted"] if row < n_rows]] = False
+            else:
+                ids.extend(record["ids"])
+                spans.extend(map(tuple, record["spans"]))
+                metadatas.extend(record["metadatas"])
+        # Drop anything written after the last committed header (an interrupted batch).
+        for name, size in (("rows.jsonl", header["rows_bytes"]), ("texts.bin", header["texts_bytes"])):
+            with open(self._gen_dir / name, "r+b") as f:
+                f.truncate(size)
+        for name, row_bytes in self._code_files(header["dim"]).items():
+            path = self._gen_dir / name
+            if path.exists() and path.stat().st_size > n_rows * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(n_rows * row_bytes)
+        ids, spans, metadatas = ids[:n_rows], spans[:n_rows], metadatas[:n_rows]
+        row_of = {chunk_id: row for row, chunk_id in enumerate(ids) if alive[row]}
+        by_source: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            if alive[row]:
+                by_source.setdefault(metadata.get("source", ""), []).append(row)
+        vectors, codes, scales = self._map_vectors()
+        texts_file = open(self._gen_dir / "texts.bin", "rb")
+        return _Snapshot(ids, spans, metadatas, alive, row_of, by_source, vectors, codes, scales, texts_file)
+
+    @staticmethod
+    def _code_files(dim: int) -> Dict[str, int]:
+        """Quantized sidecar files and their bytes per row."""
+        return {"codes.i8": dim, "scales.f32": 4, "codes.b1": (dim + 7) // 8}
+
+    def _map_vectors(self) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """Map the committed rows of ``vectors.f32`` and their quantized codes: ``(vectors, codes, scales)``."""
+        dim, n_rows = self._header["dim"], self._header["rows"]
+        if n_rows and dim:
+            vectors = np.memmap(self._gen_dir / "vectors.f32", dtype=np.float32, mode="r", shape=(n_rows, dim))
+        else:
+            vectors = np.zeros((0, max(dim, 1)), dtype=np.float32)
+        return (vectors, *self._map_codes(vectors))
+
+    def _map_codes(self, vectors: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        dim, n_rows = self._header["dim"], self._header["rows"]
+        if self.quantization == "none" or not (n_rows and dim):
+            return None, None
+        names = ("codes.i8", "scales.f32") if self.quantization == "int8" else ("codes.b1",)
+        row_bytes = self._code_files(dim)
+        done = min((self._gen_dir / name).stat().st_size // row_bytes[name] if (self._gen_dir / name).exists() else 0 for name in names)
+        if done < n_rows:
+            # New rows, rows added while quantization was off, or a fresh compaction: derive their codes now.
+            # Codes trail the header commit, so a crash in between only leaves codes to recompute.
+            for name in names:
+                with open(self._gen_dir / name, "ab") as f:
+                    f.truncate(done * row_bytes[name])
+            for start in range(done, n_rows, 65_536):
+                self._append_codes(np.asarray(vectors[start : min(start + 65_536, n_rows)]))
+        if self.quantization == "int8":
+            codes = np.memmap(self._gen_dir / "codes.i8", dtype=np.int8, mode="r", shape=(n_rows, dim))
+            return codes, np.memmap(self._gen_dir / "scales.f32", dtype=np.float32, mode="r", shape=(n_rows,))
+        width = row_bytes["codes.b1"]
+        # 64-bit words make the XOR + popcount scan 8x fewer operations; bge-m3 and most models have dim % 64 == 0.
+        dtype, width = (np.uint64, width // 8) if width % 8 == 0 else (np.uint8, width)
+        return np.memmap(self._gen_dir / "codes.b1", dtype=dtype, mode="r", shape=(n_rows, width)), None
+
+    def _append_codes(self, vectors: np.ndarray) -> None:
+        codes, scales = quantize(vectors, self.quantization)
+        with open(self._gen_dir / ("codes.i8" if self.quantization == "int8" else "codes.b1"), "ab") as f:
+            f.write(codes.tobytes())
+        if scales is not None:
+            with open(self._gen_dir / "scales.f32", "ab") as f:
+                f.write(scales.tobytes())
+
+    def _commit(self, **changes: int) -> None:
+        header = {**self._header, **changes}
+        self._write_json(self._gen_dir / "header.json", header)
+        self._header = header
+
+    def _append_record(self, record: Dict[str, Any]) -> int:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self._gen_dir / "rows.jsonl", "ab") as f:
+            f.write(line)
+        return len(line)
+
+    # -- writes -----------------------------------------------------------
+    #
+    # Writers hold ``_lock`` and publish a new ``_Snapshot`` with a single
+    # assignment to ``_state``. Readers take ``_state`` once and only use that
+    # snapshot, so a search never mixes rows of two generations.
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [f"row-{os.urandom(8).hex()}" for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        return self.add_embedded(texts, self._embedding_function.embed_documents(texts), metadatas, ids)
+
+    def add_embedded(self, texts: List[str], embeddings: List[List[float]], metadatas: List[dict], ids: List[str]) -> List[str]:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Append already embedded, unit-normalised rows (upserting by id)."""
+        with self._lock:
+            state = self._ensure_loaded()
+            if self._header["dim"] and vectors.shape[1] != self._header["dim"]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({self._header['dim']})")
+            self._delete_rows([state.row_of[chunk_id] for chunk_id in ids if chunk_id in state.row_of])
+            state = self._state
+            header = {**self._header, "dim": int(vectors.shape[1])}
+
+            encoded = [text.encode("utf-8") for text in texts]
+            spans, offset = [], header["texts_bytes"]
+            for data in encoded:
+                spans.append((offset, len(data)))
+                offset += len(data)
+            with open(self._gen_dir / "texts.bin", "ab") as f:
+                f.write(b"".join(encoded))
+            with open(self._gen_dir / "vectors.f32", "r+b") as f:
+                f.seek(header["rows"] * header["dim"] * 4)
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            rows_bytes = self._append_record({"ids": ids, "spans": spans, "metadatas": metadatas})
+
+            first_row = header["rows"]
+            self._header = header
+            self._commit(rows=first_row + len(ids), texts_bytes=offset, rows_bytes=header["rows_bytes"] + rows_bytes)
+            # The row lists only grow, so older snapshots (which never look past their own row count) can share them.
+            state.ids.extend(ids)
+            state.spans.extend(spans)
+            state.metadatas.extend(metadatas)
+            for i, (chunk_id, metadata) in enumerate(zip(ids, metadatas)):
+                row = first_row + i
+                state.row_of[chunk_id] = row
+                state.by_source.setdefault(metadata.get("source", ""), []).append(row)
+            vectors_map, codes, scales = self._map_vectors()
+            alive = np.concatenate([state.alive, np.ones(len(ids), dtype=bool)])
+            self._state = state.replace(alive=alive, vectors=vectors_map, codes=codes, scales=scales)
+        return ids
+
+    def _delete_rows(self, rows: List[int]) -> None:
+        state = self._state
+        rows = [row for row in rows if state.alive[row]]
+        if not rows:
+            return
+        rows_bytes = self._append_record({"deleted": rows})
+        self._commit(deleted=self._header["deleted"] + len(rows), rows_bytes=self._header["rows_bytes"] + rows_bytes)
+        alive = state.alive.copy()
+        alive[rows] = False
+        for row in rows:
+            del state.row_of[state.ids[row]]
+            source = state.metadatas[row].get("source", "")
+            if source in state.by_source:
+                # Replaced rather than edited: a filtered search may be reading the old list.
+                state.by_source[source] = [other for other in state.by_source[source] if other != row]
+        self._state = state.replace(alive=alive)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return None
+        with self._lock:
+            state = self._ensure_loaded()
+            self._delete_rows([state.row_of[chunk_id] for chunk_id in ids if chunk_id in state.row_of])
+            if self._header["deleted"] > self.compact_ratio * max(self._header["rows"], 1):
+                self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Copy the live rows into a fresh generation and switch ``CURRENT`` to it."""
+        with self._lock:
+            state = self._ensure_loaded()
+            live = np.flatnonzero(state.alive)
+            old_dir = self._gen_dir
+            number = int(self._generation.split("-")[1]) + 1
+            name = f"gen-{number:06d}"
+            new_dir = self.path / name
+            shutil.rmtree(new_dir, ignore_errors=True)
+            new_dir.mkdir(parents=True)
+
+            spans, offset = [], 0
+            with open(new_dir / "vectors.f32", "wb") as vectors_out, open(new_dir / "texts.bin", "wb") as texts_out:
+                for start in range(0, len(live), 65_536):
+                    block = live[start : start + 65_536]
+                    vectors_out.write(np.ascontiguousarray(state.vectors[block]).tobytes())
+                for row in live:
+                    data = self._read_text(state, int(row))
+                    texts_out.write(data)
+                    spans.append((offset, len(data)))
+                    offset += len(data)
+            ids = [state.ids[row] for row in live]
+            metadatas = [state.metadatas[row] for row in live]
+            line = (json.dumps({"ids": ids, "spans": spans, "metadatas": metadatas}) + "\n").encode("utf-8") if len(live) else b""
+            (new_dir / "rows.jsonl").write_bytes(line)
+            header = {"dim": self._header["dim"], "rows": len(live), "deleted": 0, "texts_bytes": offset, "rows_bytes": len(line)}
+            self._write_json(new_dir / "header.json", header)
+            self._write_text(self.path / "CURRENT", name)
+
+            self._generation = name
+            self._header = header
+            self._state = self._load_state()
+            # Searches already running keep the old snapshot and its mappings; on POSIX they stay readable after removal.
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            old_dir = self._gen_dir
+            number = int(self._generation.split("-")[1]) + 1
+            self._generation = self._new_generation(number)
+            self._header = self._read_header()
+            self._state = None
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def drop(self) -> None:
+        with self._lock:
+            # Open mappings and file handles stay valid on POSIX, so searches already running finish normally.
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._state = None
+
+    # -- reads ------------------------------------------------------------
+
+    def count(self) -> int:
+        return self._header["rows"] - self._header["deleted"]
+
+    def _read_text(self, state: "_Snapshot", row: int) -> bytes:
+        offset, length = state.spans[row]
+        return os.pread(state.texts_file.fileno(), length, offset) if hasattr(os, "pread") else self._read_text_seek(state, offset, length)
+
+    def _read_text_seek(self, state: "_Snapshot", offset: int, length: int) -> bytes:
+        with self._lock:
+            state.texts_file.seek(offset)
+            return state.texts_file.read(length)
+
+    def _document(self, state: "_Snapshot", row: int) -> Document:
+        return Document(id=state.ids[row], page_content=self._read_text(state, row).decode("utf-8"), metadata=dict(state.metadatas[row]))
+
+    def iter_texts(self, page_size: int = 5000) -> Iterator[Tuple[List[str], List[str]]]:
+        state = self._ensure_loaded()
+        live = np.flatnonzero(state.alive)
+        for start in range(0, len(live), page_size):
+            rows = live[start : start + page_size]
+            yield [state.ids[row] for row in rows], [self._read_text(state, int(row)).decode("utf-8") for row in rows]
+
+    def iter_embeddings(self, page_size: int = 5000) -> Iterator[Tuple[List[str], np.ndarray, List[dict]]]:
+        state = self._ensure_loaded()
+        live = np.flatnonzero(state.alive[: len(state.vectors)])
+        for start in range(0, len(live), page_size):
+            rows = live[start : start + page_size]
+            yield [state.ids[row] for row in rows], np.asarray(state.vectors[rows]), [state.metadatas[row] for row in rows]
+
+    def ids_for_source(self, source: str) -> List[str]:
+        state = self._ensure_loaded()
+        return [state.ids[row] for row in state.by_source.get(source, [])]
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        state = self._ensure_loaded()
+        rows = [state.row_of.get(chunk_id) for chunk_id in ids]
+        return [self._document(state, row) for row in rows if row is not None and row < len(state.alive)]
+
+    def _candidate_rows(self, state: "_Snapshot", filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows allowed by ``filter`` (``None`` means every live row)."""
+        if not filter:
+            return None
+        source = filter.get("source") if len(filter) == 1 else None
+        if isinstance(source, str):
+            return np.asarray(state.by_source.get(source, []), dtype=np.int64)
+        if isinstance(source, dict) and set(source) == {"$in"}:
+            rows = itertools.chain.from_iterable(state.by_source.get(path, ()) for path in source["$in"])
+            return np.sort(np.fromiter(rows, dtype=np.int64))
+        predicate = compile_filter(filter)
+        return np.asarray([row for row in np.flatnonzero(state.alive) if predicate(state.metadatas[row])], dtype=np.int64)
+
+    def _coarse_scores(self, state: "_Snapshot", query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Approximate similarities from the quantized codes (higher is closer)."""
+        codes = state.codes if rows is None else state.codes[rows]
+        if self.quantization == "binary":
+            query_bits = np.packbits(query > 0)
+            if codes.dtype == np.uint64:
+                query_bits = query_bits.view(np.uint64)
+            # Fewer differing sign bits = smaller angle.
+            return -np.bitwise_count(codes ^ query_bits).sum(axis=1, dtype=np.int32).astype(np.float32)
+        scales = state.scales if rows is None else state.scales[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        block = max(64, _SCAN_BLOCK_FLOATS // codes.shape[1])
+        for start in range(0, len(codes), block):
+            end = start + block
+            scores[start:end] = (codes[start:end].astype(np.float32) @ query) * scales[start:end]
+        return scores
+
+    def _search_quantized(self, state: "_Snapshot", query: np.ndarray, k: int, rows: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        scores = self._coarse_scores(state, query, rows)
+        candidates = np.arange(len(scores)) if rows is None else rows
+        if rows is None:
+            scores[~state.alive[: len(scores)]] = -np.inf
+        n_candidates = min(k * self.rerank_factor, int(np.isfinite(scores).sum()))
+        if n_candidates <= 0:
+            return []
+        shortlist = np.sort(candidates[np.argpartition(-scores, n_candidates - 1)[:n_candidates]])
+        # Full precision only for the shortlist; sorted rows keep the memmap reads sequential.
+        similarities = np.asarray(state.vectors[shortlist] @ query)
+        top = np.argsort(-similarities)[:k]
+        return [(int(shortlist[i]), float(2.0 - 2.0 * similarities[i])) for i in top]
+
+    def _search_rows(self, state: "_Snapshot", embedding: List[float], k: int, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        vectors, alive = state.vectors, state.alive
+        if not len(vectors):
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        rows = self._candidate_rows(state, filter)
+        if state.codes is not None:
+            return self._search_quantized(state, query, k, rows if rows is None else rows[rows < len(vectors)])
+        if rows is None:
+            similarities = np.asarray(vectors @ query)
+            similarities[~alive[: len(similarities)]] = -np.inf
+            candidates = np.arange(len(similarities))
+        else:
+            rows = rows[rows < len(vectors)]
+            if len(rows) * 3 > len(vectors):
+                # A large share of the rows is cheaper to score in one sequential pass than to gather.
+                similarities = np.asarray(vectors @ query)[rows]
+            else:
+                similarities = np.asarray(vectors[rows] @ query) if len(rows) else np.zeros(0, dtype=np.float32)
+            candidates = rows
+        n_live = int(np.isfinite(similarities).sum())
+        k = min(k, n_live)
+        if k <= 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(int(candidates[i]), float(2.0 - 2.0 * similarities[i])) for i in top]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        state = self._ensure_loaded()
+        return [(self._document(state, row), distance) for row, distance in self._search_rows(state, embedding, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        state = self._ensure_loaded()
+        return [self._document(state, row) for row, _ in self._search_rows(state, embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        state = self._ensure_loaded()
+        rows = [row for row, _ in self._search_rows(state, embedding, fetch_k, filter)]
+        if not rows:
+            return []
+        selected = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), np.asarray(state.vectors[rows]), k=k, lambda_mult=lambda_mult)
+        return [self._document(state, rows[i]) for i in selected]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self._embedding_function.embed_query(query), k, fetch_k, lambda_mult, filter)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str | Path = "./vectors",
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        store = cls(path, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        header = self._header
+        size = sum(f.stat().st_size for f in self._gen_dir.iterdir() if f.is_file())
+        row_bytes = {"none": header["dim"] * 4, "int8": header["dim"] + 4, "binary": (header["dim"] + 7) // 8}[self.quantization]
+        return {
+            "vector_rows": header["rows"],
+            "vector_tombstones": header["deleted"],
+            "vector_dim": header["dim"],
+            "vector_bytes": size,
+            "vector_quantization": self.quantization,
+            # What a full scan touches, i.e. what has to stay in memory for fast queries.
+            "vector_scan_bytes": header["rows"] * row_bytes,
+        }
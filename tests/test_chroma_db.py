@@ -0,0 +1,222 @@
+import json
+import threading
+
+import pytest
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.folder_navigation import iter_vault
+from test_vault_registry import WordHashEmbeddings, write_vault
+
+FILLER = " Some extra words so the note is long enough to be indexed."
+
+
+class GatedEmbeddings(WordHashEmbeddings):
+    """Blocks embedding while ``gate`` is clear and fails once ``fail`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+        self.fail = False
+
+    def embed_documents(self, texts):
+        self.entered.set()
+        self.gate.wait(timeout=10)
+        if self.fail:
+            raise RuntimeError("embedding server went away")
+        return super().embed_documents(texts)
+
+
+class RecordingEmbeddings(WordHashEmbeddings):
+    """Remembers every text it was asked to embed."""
+
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+def open_db(path, embeddings, **kwargs):
+    return ObsidianChromaDB(collection_name="notes", db_location_path=path, embeddings=embeddings, embedding_cache_size=0, **kwargs)
+
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_rebuild_serves_the_old_generation_until_an_atomic_switch(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(ObsidianChromaDB, "GENERATION_GC_DELAY_SEC", 0)
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts" + FILLER, "Bread": "sourdough starter feeding" + FILLER})
+    embeddings = GatedEmbeddings()
+    db = open_db(tmp_path / "db", embeddings, vector_backend=backend)
+    db.create_new_note_index(iter_vault(vault))
+    first = db.generation
+    assert first == "notes.g1" and db.count() == 2
+
+    (vault / "Lisbon.md").write_text("lisbon trip tram and pastries" + FILLER, encoding="utf-8")
+    embeddings.gate.clear()
+    embeddings.entered.clear()
+    rebuild = threading.Thread(target=db.create_new_note_index, args=(iter_vault(vault),))
+    rebuild.start()
+    assert embeddings.entered.wait(timeout=10)
+    # Mid-rebuild the live generation still answers (query embeddings use the same model and are not gated here).
+    assert db.generation == first and db.count() == 2
+    assert db._vectorstore.similarity_search_by_vector(WordHashEmbeddings._embed("kafka lag"), k=1)[0].metadata["source"] == "Kafka.md"
+    embeddings.gate.set()
+    rebuild.join(timeout=30)
+
+    assert db.generation == "notes.g2" and db.count() == 3
+    record = json.loads((tmp_path / "db" / "notes.active").read_text())
+    assert record["active"] == "notes.g2" and set(record["superseded"]) == {"notes.g1"}
+    assert not (tmp_path / "db" / "notes.g1.manifest.json").exists()
+
+    # A rebuild that fails half-way leaves the active generation alone and removes what it built.
+    embeddings.fail = True
+    with pytest.raises(RuntimeError):
+        db.create_new_note_index(iter_vault(vault))
+    embeddings.fail = False
+    reopened = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend=backend)
+    assert reopened.generation == "notes.g2" and reopened.count() == 3 and len(reopened.lexical_index) == 3
+    assert not any(p.name.startswith("notes.g3") for p in (tmp_path / "db").iterdir())
+    if backend == "chroma":
+        assert "notes.g3" not in reopened._vectorstore.collection_names()
+
+
+def test_changed_settings_rebuild_into_a_new_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(ObsidianChromaDB, "GENERATION_GC_DELAY_SEC", 0)
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts" + FILLER})
+    open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap").create_new_note_index(iter_vault(vault))
+
+    resized = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap", chunk_size=600)
+    assert resized.needs_rebuild and resized.query_compatible
+    assert resized.sync_notes(iter_vault(vault))["mode"] == "full_rebuild"
+    assert resized.generation == "notes.g2" and not resized.needs_rebuild
+
+    other_model = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap", chunk_size=600, embedding_model="nomic-embed-text")
+    assert other_model.needs_rebuild and not other_model.query_compatible
+
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_garbage_collection_only_drops_recorded_generations(tmp_path, backend):
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts" + FILLER})
+    # Names that look like generations of "notes": a separate collection, and a rebuild another process is running.
+    lookalike = ObsidianChromaDB(collection_name="notes_g1", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend=backend)
+    lookalike.create_new_note_index(iter_vault(vault))
+    (tmp_path / "db" / "notes.g5.vectors").mkdir()
+    (tmp_path / "db" / "notes.g5.manifest.json").write_text("{}", encoding="utf-8")
+
+    db = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend=backend)
+    db.create_new_note_index(iter_vault(vault))
+    db.create_new_note_index(iter_vault(vault))
+    assert db.generation == "notes.g2"
+
+    # Replaced generations outlive GENERATION_GC_DELAY_SEC for queries still holding them, then go on the next open.
+    assert open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend=backend).collect_garbage() == []
+    record = json.loads((tmp_path / "db" / "notes.active").read_text())
+    record["superseded"] = {name: 0.0 for name in record["superseded"]}
+    (tmp_path / "db" / "notes.active").write_text(json.dumps(record), encoding="utf-8")
+    assert open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend=backend).collect_garbage() == []  # dropped in __init__
+    assert not any(p.name.startswith("notes.g1.") for p in (tmp_path / "db").iterdir())
+
+    assert (tmp_path / "db" / "notes.g5.vectors").is_dir() and (tmp_path / "db" / "notes.g5.manifest.json").is_file()
+    reopened = ObsidianChromaDB(collection_name="notes_g1", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend=backend)
+    assert reopened.count() == 1 and len(reopened.manifest.entries) == 1
+
+
+def test_legacy_pointer_and_dotted_collection_names(tmp_path):
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts" + FILLER})
+    open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap").create_new_note_index(iter_vault(vault))
+    # Pointers written before replaced generations were recorded hold just the generation name.
+    (tmp_path / "db" / "notes.active").write_text("notes.g1", encoding="utf-8")
+    legacy = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap")
+    assert legacy.generation == "notes.g1" and legacy.count() == 1
+    legacy.create_new_note_index(iter_vault(vault))
+    assert legacy.generation == "notes.g2" and legacy.count() == 1
+
+    with pytest.raises(ValueError):
+        ObsidianChromaDB(collection_name="notes.g1", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings())
+
+
+def test_ingest_streams_bounded_batches_and_records_notes_after_their_last_chunk(tmp_path):
+    db = open_db(tmp_path / "db", WordHashEmbeddings(), vector_backend="mmap", chunk_size=80, chunk_overlap=0, min_text_length=10)
+    paragraph = "paragraph {} of note {} with a few filler words to pad it out"
+    notes = [{"relative_path": f"n{i}.md", "name": f"n{i}", "clean_body": "\n\n".join(paragraph.format(p, i) for p in range(3))} for i in range(10)]
+    chunk_ids = {note["relative_path"]: db.chunker.chunk_note(note)[1] for note in notes}
+    assert {len(ids) for ids in chunk_ids.values()} == {3}  # batches of 4 split every other note across two batches
+
+    consumed = []
+
+    def counting_notes():
+        for note in notes:
+            consumed.append(note["relative_path"])
+            yield note
+
+    stored = []
+    writes = []
+    add_embedded = db._vectorstore.add_embedded
+
+    def recording_add(texts, embeddings, metadatas, ids):
+        writes.append({"size": len(ids), "consumed": len(consumed), "recorded": set(db.manifest.entries)})
+        if len(writes) == 3 and fail_on_third[0]:
+            raise RuntimeError("store went away")
+        stored.extend(ids)
+        return add_embedded(texts, embeddings, metadatas, ids)
+
+    db._vectorstore.add_embedded = recording_add
+    fail_on_third = [False]
+    assert db.ingest_notes(counting_notes(), batch_size=4) == {"notes": 10, "chunks": 30, "batches": 8}
+
+    assert [write["size"] for write in writes] == [4] * 7 + [2]
+    for i, write in enumerate(writes):
+        # Lazy input: only the batch being written, the one being embedded ahead and the note being chunked are in memory.
+        in_flight = sum(len(chunk_ids[path]) for path in consumed[: write["consumed"]]) - 4 * i
+        assert in_flight <= 4 + 4 + 3
+        # A note reaches the manifest only once its last chunk is in the store.
+        assert all(set(chunk_ids[path]) <= set(stored[: 4 * i]) for path in write["recorded"])
+    assert writes[0]["consumed"] < len(notes)
+    assert set(db.manifest.entries) == set(chunk_ids)
+
+    # Failing mid-note leaves that note (chunks 7-9 of n2 straddle batches 2 and 3) out of the manifest.
+    db = open_db(tmp_path / "db2", WordHashEmbeddings(), vector_backend="mmap", chunk_size=80, chunk_overlap=0, min_text_length=10)
+    consumed.clear()
+    stored.clear()
+    writes.clear()
+    add_embedded = db._vectorstore.add_embedded
+    db._vectorstore.add_embedded = recording_add
+    fail_on_third[0] = True
+    with pytest.raises(RuntimeError):
+        db.ingest_notes(counting_notes(), batch_size=4)
+    assert stored == chunk_ids["n0.md"] + chunk_ids["n1.md"] + chunk_ids["n2.md"][:2]
+    assert set(db.manifest.entries) == {"n0.md", "n1.md"}
+
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_sync_only_embeds_added_and_changed_notes_and_drops_removed_chunks(tmp_path, backend):
+    embeddings = RecordingEmbeddings()
+    db = open_db(tmp_path / "db", embeddings, vector_backend=backend, chunk_size=80, chunk_overlap=0, min_text_length=10)
+    paragraph = "paragraph {} of {} with a few filler words to pad it out"
+
+    def note(name, version=""):
+        return {"relative_path": f"{name}.md", "name": name, "clean_body": "\n\n".join(paragraph.format(p, name) + version for p in range(2))}
+
+    first = [note("keep"), note("edit"), note("gone")]
+    assert db.sync_notes(first)["added"] == 3
+    old_ids = {n["relative_path"]: db.chunker.chunk_note(n)[1] for n in first}
+    assert db.count() == 6
+
+    embeddings.texts.clear()
+    second = [note("keep"), note("edit", " v2"), note("new")]
+    report = db.sync_notes(second)
+
+    assert (report["added"], report["changed"], report["deleted"], report["unchanged"]) == (1, 1, 1, 1)
+    expected = [doc.page_content for n in second[1:] for doc in db.chunker.chunk_note(n)[0]]
+    assert sorted(embeddings.texts) == sorted(expected)
+    assert db.count() == 6
+
+    stored = {chunk_id for ids, _ in db._vectorstore.iter_texts() for chunk_id in ids}
+    live = {chunk_id for n in second for chunk_id in db.chunker.chunk_note(n)[1]}
+    assert stored == live
+    assert len(db.lexical_index) == 6 and all(chunk_id in db.lexical_index for chunk_id in live)
+    assert not any(chunk_id in stored or chunk_id in db.lexical_index for chunk_id in old_ids["gone.md"])
+    assert db._vectorstore.ids_for_source("gone.md") == [] and sorted(db._vectorstore.ids_for_source("keep.md")) == sorted(old_ids["keep.md"])
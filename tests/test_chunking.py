@@ -0,0 +1,38 @@
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from noteagent.core.chunking import NoteChunker
+
+
+def test_chunk_note_matches_langchain_start_index():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 40 for i in range(12))
+    note = {"relative_path": "Notes/Long.md", "name": "Long", "clean_body": text, "n_backlinks": 2, "n_tags": 1}
+    chunker = NoteChunker(chunk_size=300, chunk_overlap=50)
+
+    documents, ids = chunker.chunk_note(note)
+
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=300, chunk_overlap=50, separators=["\n\n", "\n", " ", ""], add_start_index=True
+    ).create_documents([text])
+    assert [d.page_content for d in documents] == [d.page_content for d in reference]
+    assert [d.metadata["start_index"] for d in documents] == [d.metadata["start_index"] for d in reference]
+    assert ids == [f"Notes/Long.md#{d.metadata['start_index']}" for d in reference]
+    assert len(set(ids)) == len(ids)
+    assert documents[0].metadata["source"] == "Notes/Long.md"
+    assert documents[0].metadata["n_backlinks"] == 2
+
+
+def test_chunk_note_skips_short_notes():
+    assert NoteChunker().chunk_note({"relative_path": "a.md", "clean_body": "tiny"}) == ([], [])
+
+
+def test_split_runs_splitter_once():
+    class CountingSplitter(RecursiveCharacterTextSplitter):
+        calls = 0
+
+        def split_text(self, text):
+            CountingSplitter.calls += 1
+            return super().split_text(text)
+
+    chunker = NoteChunker(splitter=CountingSplitter(chunk_size=100, chunk_overlap=0))
+    chunker.chunk_note({"relative_path": "a.md", "clean_body": "some words " * 50})
+    assert CountingSplitter.calls == 1
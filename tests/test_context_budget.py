@@ -0,0 +1,44 @@
+from langchain_core.documents import Document
+
+from noteagent.core.chunking import NoteChunker
+from noteagent.core.context_budget import ContextBudgeter, estimate_tokens
+
+
+def paragraphs(topic, n):
+    return "\n\n".join(f"Paragraph {i} about {topic}: " + " ".join(f"{topic}{i}w{j}" for j in range(40)) for i in range(n))
+
+
+def test_overlapping_chunks_of_a_note_merge_back_into_the_original_text():
+    chunker = NoteChunker(chunk_size=300, chunk_overlap=80)
+    body = paragraphs("atlas", 4)
+    docs, _ = chunker.chunk_note({"relative_path": "Atlas.md", "clean_body": body})
+    assert len(docs) > 2
+
+    assembled = ContextBudgeter(max_tokens=10_000).assemble(list(reversed(docs)))
+
+    assert assembled["context"] == "### Atlas.md\n\n" + body
+    report = assembled["report"]
+    assert report["passages"] == 1
+    assert report["merged_chunks"] == len(docs) - 1
+    assert report["tokens_saved"] > 0
+
+
+def test_near_duplicates_are_dropped_and_budget_is_respected():
+    original = paragraphs("kafka", 1)
+    docs = [
+        Document(page_content=original, metadata={"source": "Notes/Kafka.md", "start_index": 0}),
+        Document(page_content="Clipped: " + original, metadata={"source": "Clippings/Kafka copy.md", "start_index": 0}),
+        Document(page_content=paragraphs("vacuum", 3), metadata={"source": "Notes/Vacuum.md", "start_index": 0}),
+        Document(page_content=paragraphs("lisbon", 3), metadata={"source": "Trips/Lisbon.md", "start_index": 0}),
+    ]
+    budget = 400
+    budgeter = ContextBudgeter(max_tokens=budget)
+    assembled = budgeter.assemble(docs)
+    report = assembled["report"]
+
+    assert "Clippings/Kafka copy.md" not in assembled["context"]
+    assert report["duplicates_dropped"] == 1
+    assert assembled["context"].startswith("### Notes/Kafka.md")
+    assert report["truncated"] + report["over_budget_dropped"] >= 1
+    assert estimate_tokens(assembled["context"]) <= budget + 5
+    assert budgeter.stats()["context_tokens_saved"] == report["tokens_saved"]
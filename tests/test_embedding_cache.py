@@ -0,0 +1,59 @@
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_cached_embeddings_only_embed_misses(tmp_path):
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, EmbeddingCache(tmp_path / "cache.sqlite"), "bge-m3")
+
+    assert embeddings.embed_documents(["aa", "bbb", "aa"]) == [[2.0, 0.5], [3.0, 0.5], [2.0, 0.5]]
+    assert embeddings.embed_documents(["bbb", "cccc"]) == [[3.0, 0.5], [4.0, 0.5]]
+    assert inner.calls == [["aa", "bbb"], ["cccc"]]
+
+    stats = embeddings.stats()
+    assert stats["embedding_cache_hits"] == 2
+    assert stats["embedding_cache_misses"] == 3
+
+    # Persistent across instances, but keyed by model.
+    reopened = CachedEmbeddings(CountingEmbeddings(), EmbeddingCache(tmp_path / "cache.sqlite"), "bge-m3")
+    reopened.embed_documents(["aa", "bbb", "cccc"])
+    assert reopened.inner.calls == []
+    other_model = CachedEmbeddings(CountingEmbeddings(), EmbeddingCache(tmp_path / "cache.sqlite"), "nomic-embed-text")
+    other_model.embed_documents(["aa"])
+    assert other_model.inner.calls == [["aa"]]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.put_many("m", {"a": [1.0]})
+    cache.put_many("m", {"b": [2.0]})
+    cache.get_many("m", ["a"])
+    cache.put_many("m", {"c": [3.0]})
+
+    assert len(cache) == 2
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {"a", "c"}
+
+
+def test_cap_holds_across_instances_sharing_the_file(tmp_path):
+    # The CLI, the server and the registry each open their own connection to the same file.
+    first = EmbeddingCache(tmp_path / "cache.sqlite", max_entries=3)
+    second = EmbeddingCache(tmp_path / "cache.sqlite", max_entries=3)
+    for i in range(4):
+        first.put_many("m", {f"a{i}": [float(i)]})
+        second.put_many("m", {f"b{i}": [float(i)]})
+
+    assert len(EmbeddingCache(tmp_path / "cache.sqlite")) == 3
+    assert set(first.get_many("m", ["a3", "b2", "b3"])) == {"a3", "b2", "b3"}
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from noteagent.core.embeddings import PooledOllamaEmbeddings
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/embed with [len(text), batch size] for each input."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+            fail = server.fail_next > 0
+            if fail:
+                server.fail_next -= 1
+        if fail:
+            payload, status = b"{}", 503
+        else:
+            texts = body["input"]
+            payload, status = json.dumps({"model": body["model"], "embeddings": [[float(len(t)), float(len(texts))] for t in texts]}).encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.fail_next = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_embed_documents_batches_in_order(fake_ollama):
+    url = f"http://127.0.0.1:{fake_ollama.server_address[1]}"
+    embeddings = PooledOllamaEmbeddings("bge-m3", base_url=url, batch_size=3, max_concurrency=4)
+    texts = ["x" * i for i in range(1, 11)]
+
+    vectors = embeddings.embed_documents(texts)
+
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+    assert sorted(len(r["input"]) for r in fake_ollama.requests) == [1, 3, 3, 3]
+    stats = embeddings.stats()
+    assert stats["embedded_chunks"] == 10
+    assert stats["embed_requests"] == 4
+    assert stats["chunks_per_sec"] > 0
+    embeddings.close()
+
+
+def test_embed_retries_transient_errors(fake_ollama):
+    url = f"http://127.0.0.1:{fake_ollama.server_address[1]}"
+    embeddings = PooledOllamaEmbeddings("bge-m3", base_url=url, backoff_sec=0.01)
+    fake_ollama.fail_next = 2
+
+    assert embeddings.embed_query("hello") == [5.0, 1.0]
+    assert embeddings.stats()["embed_retries"] == 2
+    embeddings.close()
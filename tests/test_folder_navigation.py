@@ -1,5 +1,10 @@
+import threading
+import warnings
 from pathlib import Path
-from noteagent.core.folder_navigation import walk, load_vault
+import obsidiantools.api as otools
+import pandas as pd
+import pytest
+from noteagent.core.folder_navigation import walk, load_vault, index_note_metadata
 
 
 def test_walk():
@@ -17,10 +22,69 @@ def test_walk():
     assert vault["depth"] == 3
 
 
+def make_vault(root: Path, n_md: int) -> Path:
+    (root / ".obsidian").mkdir(parents=True)
+    for i in range(n_md):
+        (root / f"note{i}.md").write_text("x")
+    return root
+
+
+def test_walk_depth_limit_and_skipped_dirs(tmp_path):
+    make_vault(tmp_path / "a", 2)
+    make_vault(tmp_path / "b" / "c" / "d", 1)
+    make_vault(tmp_path / "node_modules" / "pkg", 1)
+    deep = tmp_path / "a" / "x" / "y" / "z"
+    deep.mkdir(parents=True)
+    (deep / "deep.md").write_text("x")
+    (tmp_path / "a" / ".trash").mkdir()
+    (tmp_path / "a" / ".trash" / "gone.md").write_text("x")
+
+    shallow = walk(tmp_path, 2)
+    assert [v["name"] for v in shallow] == ["a"]
+    # Depth limits discovery, not the markdown count of a found vault.
+    assert shallow[0]["md_count"] == 3
+
+    found = {v["name"]: v for v in walk(tmp_path, 3, workers=4)}
+    assert set(found) == {"a", "d"}
+    assert found["d"]["depth"] == 3
+
+
 def test_load_vault_obsidiantools():
-    vault = walk(Path.cwd().parent, 8)
-    obsidian_vault = load_vault(vault["path"])
-    print(obsidian_vault)
+    vault = walk(Path.cwd().parent, 8)[0]
+    notes = load_vault(vault["path"])
+    assert len(notes) >= 103
+    assert all("wikilinks" in note and "relative_path" in note for note in notes)
+    assert any(note["wikilinks"] for note in notes)
+
+
+def test_load_vault_process_pool_matches_serial_from_a_threaded_process(monkeypatch):
+    vault_path = walk(Path.cwd().parent, 8)[0]["path"]
+    serial = load_vault(vault_path)
+    # The workers parse the files themselves; the parent must not gather the vault first.
+    monkeypatch.setattr(otools.Vault, "gather", lambda self, **kwargs: pytest.fail("gathered in the parent"))
+    # Loads run next to the watcher, background sync and server threads; the pool must not fork them.
+    stop = threading.Event()
+    other = threading.Thread(target=stop.wait)
+    other.start()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            assert load_vault(vault_path, workers=2) == serial
+    finally:
+        stop.set()
+        other.join()
+
 
+def test_index_note_metadata():
+    df = pd.DataFrame(
+        {
+            "abs_filepath": ["/v/a.md", "/v/b.md"],
+            "rel_filepath": ["a.md", "b.md"],
+            "n_backlinks": [2, 0],
+        }
+    )
+    index = index_note_metadata(df)
+    assert set(index) == {"/v/a.md", "/v/b.md"}
+    assert index["/v/a.md"]["n_backlinks"] == 2
+    assert index["/v/b.md"]["rel_filepath"] == "b.md"
 
-test_walk()
@@ -0,0 +1,96 @@
+import json
+from typing import Any, List, Optional
+
+import numpy as np
+import pytest
+from langchain_core.language_models import LLM
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.insights import generate_insights, kmeans, neighbor_join, note_vectors, write_report
+from test_vault_registry import WordHashEmbeddings
+
+FILLER = " Some extra words so the note is long enough to be indexed."
+
+
+class CountingLLM(LLM):
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        if "sourdough" in prompt:
+            raise RuntimeError("model crashed")
+        return "Kafka operations\nConnections: lag and alerts."
+
+
+def blobs(n_per_blob=100, n_blobs=6, dims=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_blobs, dims))
+    vectors = np.repeat(centers, n_per_blob, axis=0) + 0.3 * rng.standard_normal((n_blobs * n_per_blob, dims))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32), np.repeat(np.arange(n_blobs), n_per_blob)
+
+
+def test_kmeans_recovers_blobs_and_the_neighbor_join_matches_exact_search():
+    vectors, truth = blobs()
+    labels, centers = kmeans(vectors, 6)
+    # Every found cluster is one blob.
+    assert all(len(set(truth[labels == c])) == 1 for c in range(6))
+    assert np.allclose(np.linalg.norm(centers, axis=1), 1.0, atol=1e-5)
+
+    fine_labels, fine_centers = kmeans(vectors, 24)
+    neighbors, similarities = neighbor_join(vectors, fine_labels, fine_centers, n_neighbors=5, n_probe=6)
+    exact = vectors @ vectors.T
+    np.fill_diagonal(exact, -np.inf)
+    expected = np.argsort(-exact, axis=1)[:, :5]
+    recall = np.mean([len(set(got) & set(want)) / 5 for got, want in zip(neighbors, expected)])
+    assert recall > 0.9
+    assert (neighbors != np.arange(len(vectors))[:, None]).all()
+    assert (np.diff(similarities, axis=1) <= 1e-6).all()
+
+
+def note(path, body, links=()):
+    return {"relative_path": path, "name": path.removesuffix(".md"), "clean_body": body + FILLER, "wikilinks": list(links)}
+
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_generate_insights_reports_orphans_missing_links_and_one_llm_call_per_cluster(tmp_path, backend):
+    notes = [
+        note("Kafka Lag.md", "kafka consumer lag alerts partitions", links=["Kafka Runbook"]),
+        note("Kafka Runbook.md", "kafka runbook consumer lag partitions rebalance"),
+        note("Kafka Alerts.md", "kafka consumer lag alerts partitions paging"),  # orphan, but close to the two above
+        note("Sourdough.md", "sourdough starter feeding flour water", links=["Bread Baking"]),
+        note("Bread Baking.md", "bread baking sourdough starter oven flour"),
+    ]
+    db = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend=backend)
+    db.create_new_note_index(iter(notes))
+
+    paths, vectors, n_chunks = note_vectors(db, page_size=2)
+    assert sorted(paths) == sorted(n["relative_path"] for n in notes) and n_chunks == 5
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+    llm = CountingLLM(prompts=[])
+    report = generate_insights(db, llm=llm, n_clusters=2, min_link_similarity=0.5)
+
+    assert sorted(sorted(cluster["notes"]) for cluster in report["clusters"]) == [
+        ["Bread Baking.md", "Sourdough.md"],
+        ["Kafka Alerts.md", "Kafka Lag.md", "Kafka Runbook.md"],
+    ]
+    assert len(llm.prompts) == 2 and report["timings"]["llm_calls"] == 2
+    kafka, bread = sorted(report["clusters"], key=lambda cluster: -cluster["size"])
+    assert kafka["summary"].startswith("Kafka operations") and "model crashed" in bread["error"]
+
+    assert [orphan["note"] for orphan in report["orphans"]] == ["Kafka Alerts.md"]
+    assert report["orphans"][0]["suggestions"][0]["note"] in ("Kafka Lag.md", "Kafka Runbook.md")
+    missing = {(link["a"], link["b"]) for link in report["missing_links"]}
+    assert any("Kafka Alerts.md" in pair for pair in missing)
+    # Linked notes are never reported as missing links.
+    assert not any(set(pair) in ({"Kafka Lag.md", "Kafka Runbook.md"}, {"Sourdough.md", "Bread Baking.md"}) for pair in missing)
+
+    written = write_report(report, tmp_path / "out" / "insights.md")
+    text = written.read_text(encoding="utf-8")
+    assert "[[Kafka Alerts]]" in text and "Kafka operations" in text and "Summary failed" in text
+    assert json.loads((tmp_path / "out" / "insights.json").read_text())["notes"] == 5
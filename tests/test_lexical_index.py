@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from noteagent.core.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+FIXTURE = Path(__file__).parent / "fixtures" / "retrieval_queries.json"
+
+
+def test_tokenize_drops_stopwords_and_splits_codes():
+    assert tokenize("What is PRJ-4471 about? #oncall") == ["prj", "4471", "about", "oncall"]
+
+
+def test_add_remove_replace_and_persist(tmp_path):
+    index = BM25Index()
+    index.add(["a.md#0", "b.md#0", "c.md#0"], ["kafka consumer lag", "postgres vacuum", "kafka compaction"])
+
+    assert {chunk_id for chunk_id, _ in index.search("kafka", k=5)} == {"a.md#0", "c.md#0"}
+    assert index.remove(["a.md#0", "missing"]) == 1
+    assert [c for c, _ in index.search("kafka lag", k=5)] == ["c.md#0"]
+
+    # Re-adding an id replaces the old text, and freed slots are reused.
+    index.add(["b.md#0", "d.md#0"], ["sourdough starter", "kafka lag alerts"])
+    assert index.search("vacuum") == []
+    assert [c for c, _ in index.search("lag", k=5)] == ["d.md#0"]
+    assert len(index) == 3
+
+    path = tmp_path / "index.bm25.pkl"
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 3
+    assert loaded.search("kafka", k=5) == index.search("kafka", k=5)
+    loaded.add(["e.md#0"], ["kafka"])
+    assert len(loaded) == 4
+    assert BM25Index.load(tmp_path / "missing.pkl") is None
+
+
+def test_reciprocal_rank_fusion_prefers_ids_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "b"]], limit=3)
+    assert fused == ["c", "b", "a"]
+
+
+def test_bm25_recall_on_fixture_queries():
+    fixture = json.loads(FIXTURE.read_text())
+    index = BM25Index()
+    index.add([note["relative_path"] for note in fixture["notes"]], [note["clean_body"] for note in fixture["notes"]])
+
+    k = 3
+    recalls = []
+    for case in fixture["queries"]:
+        top = [chunk_id for chunk_id, _ in index.search(case["query"], k=k)]
+        recalls.append(len(set(top) & set(case["relevant"])) / len(case["relevant"]))
+
+    assert sum(recalls) / len(recalls) >= 0.9
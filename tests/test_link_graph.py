@@ -0,0 +1,94 @@
+import sys
+import threading
+
+from noteagent.core.link_graph import LinkGraph
+
+
+def make_note(path, links=(), tags=()):
+    name = path.rsplit("/", 1)[-1].removesuffix(".md")
+    return {"relative_path": path, "name": name, "wikilinks": list(links), "tags": list(tags)}
+
+
+def build_graph(path=None):
+    graph = LinkGraph(path)
+    for note in [
+        make_note("Projects/Atlas.md", links=["Marta", "Postgres Vacuum"]),
+        make_note("People/Marta.md", links=["Atlas"]),
+        make_note("Notes/Postgres Vacuum.md", tags=["oncall"]),
+        make_note("Notes/Kafka Lag.md", links=["People/Tomasz"], tags=["oncall"]),
+        make_note("People/Tomasz.md"),
+        make_note("Index.md", links=["Atlas", "Marta", "Postgres Vacuum", "Kafka Lag", "Tomasz", "Missing"]),
+    ]:
+        graph.update_note(note)
+    return graph
+
+
+def test_neighbors_resolve_names_and_paths():
+    graph = build_graph()
+    assert sorted(graph.neighbors("Projects/Atlas.md")) == ["Index.md", "Notes/Postgres Vacuum.md", "People/Marta.md"]
+    assert sorted(graph.neighbors("People/Tomasz.md")) == ["Index.md", "Notes/Kafka Lag.md"]
+    assert graph.stats() == {"graph_notes": 6, "graph_links": 8, "graph_tags": 1}
+
+
+def test_expand_prefers_connecting_notes_and_follows_tags():
+    graph = build_graph()
+
+    # Atlas is linked from both seeds, so it outranks notes linked from only one.
+    expanded = graph.expand({"People/Marta.md": 1.0, "Notes/Postgres Vacuum.md": 0.5}, hops=1, limit=2)
+    assert expanded[0][0] == "Projects/Atlas.md"
+    assert all(path not in ("People/Marta.md", "Notes/Postgres Vacuum.md") for path, _ in expanded)
+
+    # Kafka Lag shares only the #oncall tag with Postgres Vacuum.
+    tag_only = dict(graph.expand({"Notes/Postgres Vacuum.md": 1.0}, hops=1, limit=10))
+    assert "Notes/Kafka Lag.md" in tag_only
+    assert "People/Tomasz.md" not in tag_only
+    assert "People/Tomasz.md" in dict(graph.expand({"Notes/Postgres Vacuum.md": 1.0}, hops=2, limit=10))
+    assert graph.expand({"Unknown.md": 1.0}) == []
+
+
+def test_incremental_updates_and_persistence(tmp_path):
+    path = tmp_path / "notes.graph.json"
+    graph = build_graph(path)
+    graph.remove_note("Index.md")
+    graph.update_note(make_note("People/Marta.md", links=["Atlas", "Tomasz"]))
+    assert sorted(graph.neighbors("People/Tomasz.md")) == ["Notes/Kafka Lag.md", "People/Marta.md"]
+
+    graph.save()
+    loaded = LinkGraph(path).load()
+    assert len(loaded) == 5
+    assert sorted(loaded.neighbors("People/Marta.md")) == ["People/Tomasz.md", "Projects/Atlas.md"]
+
+
+def test_expansion_while_notes_change_concurrently(tmp_path):
+    graph = build_graph(tmp_path / "notes.graph.json")
+    for i in range(300):
+        graph.update_note(make_note(f"Daily/{i}.md", links=["Atlas"], tags=["daily"]))
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            graph.update_note(make_note(f"Daily/{i % 600}.md", links=["Atlas"], tags=["daily"]))
+            graph.remove_note(f"Daily/{(i + 300) % 600}.md")
+            if i % 100 == 0:
+                graph.save()
+            i += 1
+
+    # Switch threads often so updates land in the middle of a CSR build.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(200):
+            graph.expand({"Projects/Atlas.md": 1.0}, hops=2, limit=20)
+            graph.neighbors("People/Marta.md")
+    except Exception as e:  # dictionary changed size, KeyError
+        errors.append(e)
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert sorted(graph.neighbors("People/Marta.md")) == ["Index.md", "Projects/Atlas.md"]
@@ -0,0 +1,104 @@
+import datetime as dt
+
+import pytest
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.folder_navigation import iter_vault
+from noteagent.core.langchain_rag import note_retriever
+from noteagent.core.metadata_index import NoteMetadataIndex, parse_scope
+from test_vault_registry import WordHashEmbeddings
+
+FILLER = " Some extra words so the note is long enough to be indexed."
+NOW = dt.datetime(2026, 5, 20, tzinfo=dt.timezone.utc).timestamp()
+
+
+def make_note(path, body, tags=(), frontmatter=None, modified="2026-05-01T09:00:00"):
+    return {
+        "relative_path": path,
+        "name": path.rsplit("/", 1)[-1].removesuffix(".md"),
+        "clean_body": body + FILLER,
+        "tags": list(tags),
+        "frontmatter": frontmatter or {},
+        "last_modified": modified,
+    }
+
+
+NOTES = [
+    make_note("Projects/Atlas.md", "atlas kafka migration plan", tags=["project/atlas"], frontmatter={"status": "Active"}),
+    make_note("Projects/Old/Hermes.md", "hermes kafka cluster retired", tags=["project"], frontmatter={"status": "done"}, modified="2025-01-10T08:00:00"),
+    make_note("References/Kafka Book.md", "kafka partitions and consumer lag explained", frontmatter={"tags": ["reading"], "rating": 5}),
+    make_note("Daily/2026-05-18.md", "standup notes about kafka lag again", tags=["daily"], modified="2026-05-18T18:30:00"),
+]
+
+
+def test_parse_scope_strips_tokens_from_the_question():
+    question, scope = parse_scope('what is left on #Project/Atlas in:"Projects/" since:30d prop:status=active before:2026-06-01 C# issues?', now=NOW)
+    assert question == "what is left on C# issues?"
+    assert scope["tags"] == ["project/atlas"]
+    assert scope["folder"] == "Projects"
+    assert scope["frontmatter"] == {"status": "active"}
+    assert scope["modified_after"] == NOW - 30 * 86400
+    assert scope["modified_before"] == dt.datetime(2026, 6, 1, tzinfo=dt.timezone.utc).timestamp()
+    assert parse_scope("plain question after:someday") == ("plain question after:someday", {})
+
+
+def test_select_intersects_tags_folders_dates_and_frontmatter(tmp_path):
+    index = NoteMetadataIndex(tmp_path / "notes.meta.json")
+    for note in NOTES:
+        index.update_note(note)
+
+    assert index.select({}) is None
+    # Parent tags match nested ones; frontmatter tags count as tags.
+    assert index.select({"tags": ["#project"]}) == {"Projects/Atlas.md", "Projects/Old/Hermes.md"}
+    assert index.select({"tags": ["reading"]}) == {"References/Kafka Book.md"}
+    assert index.select({"folder": "Projects/"}) == {"Projects/Atlas.md", "Projects/Old/Hermes.md"}
+    assert index.select({"folder": "Proj"}) == set()
+    assert index.select({"tags": ["project"], "frontmatter": {"Status": "ACTIVE"}}) == {"Projects/Atlas.md"}
+    assert index.select({"frontmatter": {"rating": 5}}) == {"References/Kafka Book.md"}
+    may = dt.datetime(2026, 5, 1, tzinfo=dt.timezone.utc).timestamp()
+    assert index.select({"modified_after": may, "modified_before": NOW}) == {"Projects/Atlas.md", "References/Kafka Book.md", "Daily/2026-05-18.md"}
+    assert index.select({"modified_after": may + 86400}) == {"Daily/2026-05-18.md"}
+
+    index.remove_note("Projects/Atlas.md")
+    index.save()
+    reloaded = NoteMetadataIndex(tmp_path / "notes.meta.json").load()
+    assert reloaded.select({"tags": ["project"]}) == {"Projects/Old/Hermes.md"}
+    assert reloaded.stats() == {"metadata_notes": 3, "metadata_tags": 3, "metadata_folders": 3, "metadata_fields": 2}
+
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_scoped_retrieval_only_scores_notes_in_scope(tmp_path, backend):
+    db = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend=backend)
+    db.create_new_note_index(iter(NOTES))
+    query = "kafka consumer lag"
+    embedding = db._embeddings.embed_query(query)
+
+    assert db.dense_search(embedding, k=1)[0].metadata["source"] == "References/Kafka Book.md"
+    projects = db.hybrid_search(query, k=4, embedding=embedding, scope={"folder": "Projects"})
+    assert {doc.metadata["source"] for doc in projects} == {"Projects/Atlas.md", "Projects/Old/Hermes.md"}
+    assert [doc.metadata["source"] for doc in db.dense_search(embedding, k=4, scope={"tags": ["daily"]})] == ["Daily/2026-05-18.md"]
+    assert db.hybrid_search(query, k=4, embedding=embedding, scope={"tags": ["missing"]}) == []
+
+    # Chunks carry typed fields too, so a plain vector store filter can match them.
+    chunk = db.dense_search(embedding, k=1, scope={"tags": ["project/atlas"]})[0]
+    assert chunk.metadata["folder"] == "Projects" and chunk.metadata["tag:project/atlas"] is True
+    assert chunk.metadata["fm:status"] == "Active" and chunk.metadata["modified_ts"] == dt.datetime(2026, 5, 1, 9, tzinfo=dt.timezone.utc).timestamp()
+    assert {doc.metadata["source"] for doc in db.similarity_search(query, k=4, filter={"fm:status": "done"})} == {"Projects/Old/Hermes.md"}
+
+    retriever = note_retriever(db, k=4, hybrid=True)
+    assert {doc.metadata["source"] for doc in retriever.invoke("#project what about kafka?")} == {"Projects/Atlas.md", "Projects/Old/Hermes.md"}
+
+
+def test_vault_frontmatter_and_tags_reach_the_index(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / ".obsidian").mkdir(parents=True)
+    (vault / "Projects").mkdir()
+    (vault / "Projects" / "Atlas.md").write_text("---\nstatus: active\ntags: [roadmap]\n---\nAtlas kafka migration #project/atlas" + FILLER, encoding="utf-8")
+    (vault / "Bread.md").write_text("Sourdough starter feeding" + FILLER, encoding="utf-8")
+
+    db = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend="mmap")
+    db.sync_notes(iter_vault(vault))
+    assert db.scope_sources({"tags": ["project"], "frontmatter": {"status": "active"}}) == {"Projects/Atlas.md"}
+    assert db.scope_sources({"tags": ["roadmap"]}) == {"Projects/Atlas.md"}
+    assert db.scope_sources({"modified_after": NOW - 365 * 86400}) == {"Projects/Atlas.md", "Bread.md"}
+    assert db.get_status()["metadata_notes"] == 2
@@ -0,0 +1,65 @@
+import json
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models import LLM
+from langchain_core.runnables import RunnableLambda
+
+from noteagent.core.langchain_rag import build_rag_stages
+from noteagent.core.metrics import METRICS, Metrics
+
+
+class SleepyLLM(LLM):
+    model: str = "sleepy"
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        time.sleep(0.05)
+        return "done"
+
+
+def test_disabled_metrics_record_nothing_and_enabled_export_jsonl_and_prometheus(tmp_path):
+    metrics = Metrics()
+    with metrics.span("ingest.chunk"):
+        pass
+    metrics.count("chunks_generated", 3)
+    assert metrics.snapshot()["spans"] == {} and metrics.snapshot()["counters"] == {}
+
+    events = tmp_path / "events.jsonl"
+    metrics.enable(events)
+    for seconds in (0.002, 0.02, 0.2):
+        metrics.observe("embed.documents", seconds)
+    metrics.count("texts_embedded", 96)
+    assert list(metrics.timed_iter("load.unpack_note", range(3))) == [0, 1, 2]
+    metrics.close()
+
+    spans = metrics.snapshot()["spans"]
+    assert spans["embed.documents"]["count"] == 3 and spans["embed.documents"]["max_ms"] == 200.0
+    assert spans["load.unpack_note"]["count"] == 3
+    lines = [json.loads(line) for line in events.read_text().splitlines()]
+    assert [line["span"] for line in lines[:3]] == ["embed.documents"] * 3
+
+    prometheus = metrics.to_prometheus()
+    assert 'noteagent_span_seconds_bucket{span="embed.documents",le="0.01"} 1' in prometheus
+    assert 'noteagent_span_seconds_bucket{span="embed.documents",le="+Inf"} 3' in prometheus
+    assert "noteagent_texts_embedded_total 96" in prometheus
+
+    metrics.write_jsonl(tmp_path / "snapshot.jsonl")
+    assert json.loads((tmp_path / "snapshot.jsonl").read_text())["counters"] == {"texts_embedded": 96}
+
+
+def test_answer_stage_records_generation_time_and_tokens():
+    _, answer_stage = build_rag_stages(None, retriever=RunnableLambda(lambda question: []), llm=SleepyLLM())
+    METRICS.reset()
+    METRICS.enable()
+    try:
+        assert "".join(answer_stage.stream({"context": "", "question": "hi"})) == "done"
+        snapshot = METRICS.snapshot()
+    finally:
+        METRICS.disable()
+        METRICS.reset()
+    assert snapshot["spans"]["generate"]["total_sec"] >= 0.05
+    assert snapshot["counters"]["tokens_generated"] == 1
@@ -0,0 +1,105 @@
+from typing import Any, List, Optional
+
+from langchain_core.language_models import LLM
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.langchain_rag import build_rag_stages, cached_retriever
+from noteagent.core.query_cache import QueryCache
+from noteagent.core.vault_registry import VaultRegistry
+from test_vault_registry import WordHashEmbeddings, write_vault
+
+FILLER = " Some extra words so the note is long enough to be indexed."
+
+
+class Index:
+    version = 0
+
+
+def test_query_cache_hits_and_version_invalidation():
+    index = Index()
+    cache = QueryCache(lambda: index.version)
+    key = QueryCache.embedding_key([0.1, 0.2, 0.3], k=7)
+
+    assert cache.get_retrieval(key) is None
+    cache.put_retrieval(key, [("a.md#0", {"source": "a.md"}), ("b.md#0", {"source": "b.md", "graph_score": 0.5})], version=0)
+    assert cache.get_retrieval(key) == [("a.md#0", {"source": "a.md"}), ("b.md#0", {"source": "b.md", "graph_score": 0.5})]
+    assert QueryCache.embedding_key([0.1, 0.2, 0.3], k=3) != key
+
+    prompt_key = QueryCache.prompt_key("System: ctx\nHuman: q", "qwen3:14b")
+    cache.put_answer(prompt_key, "answer", version=0)
+    assert cache.get_answer(prompt_key) == "answer"
+
+    index.version = 1
+    assert cache.get_retrieval(key) is None
+    assert cache.get_answer(prompt_key) is None
+    # Results computed against the old index are not cached after a write.
+    cache.put_answer(prompt_key, "stale", version=0)
+    assert cache.get_answer(prompt_key) is None
+
+    stats = cache.stats()
+    assert stats["retrieval_hits"] == 1
+    assert stats["answer_hits"] == 1
+    assert stats["invalidations"] == 1
+
+
+def test_query_cache_evicts_lru():
+    cache = QueryCache(lambda: 0, max_entries=2)
+    for key in ("a", "b"):
+        cache.put_answer(key, key.upper(), version=0)
+    cache.get_answer("a")
+    cache.put_answer("c", "C", version=0)
+    assert cache.get_answer("b") is None
+    assert cache.get_answer("a") == "A"
+
+
+def test_cached_graph_retrieval_keeps_per_query_metadata(tmp_path):
+    notes = [
+        {"relative_path": "Kafka Lag.md", "name": "Kafka Lag", "clean_body": "kafka consumer lag alerts" + FILLER, "wikilinks": ["Runbook"]},
+        {"relative_path": "Runbook.md", "name": "Runbook", "clean_body": "sourdough starter feeding schedule" + FILLER},
+        {"relative_path": "Bread.md", "name": "Bread", "clean_body": "bread baking oven flour" + FILLER},
+    ]
+    db = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), embedding_cache_size=0, vector_backend="mmap")
+    db.create_new_note_index(iter(notes))
+    cache = QueryCache(lambda: db.index_version)
+    retriever = cached_retriever(db, cache, k=1, graph_hops=1)
+
+    fresh = retriever.invoke("kafka consumer lag")
+    cached = retriever.invoke("kafka consumer lag")
+    assert cache.stats()["retrieval_hits"] == 1
+    assert [doc.metadata["source"] for doc in fresh] == ["Kafka Lag.md", "Runbook.md"] and fresh[1].metadata["graph_score"] > 0
+    assert [(doc.id, doc.page_content, doc.metadata) for doc in cached] == [(doc.id, doc.page_content, doc.metadata) for doc in fresh]
+
+
+class CountingLLM(LLM):
+    model: str = "counting"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        self.calls += 1
+        return "kafka answer"
+
+
+def test_main_vault_cache_keeps_hitting_after_another_vault_is_synced(tmp_path):
+    main = write_vault(tmp_path / "main", {"Kafka": "kafka consumer lag alerts" + FILLER})
+    other = write_vault(tmp_path / "other", {"Bread": "sourdough starter feeding" + FILLER})
+    registry = VaultRegistry(tmp_path / "db", embeddings=WordHashEmbeddings(), vector_backend="mmap")
+    registry.register("main", main)
+    registry.register("other", other)
+    registry.sync("main")
+    # As in AgentLoop: one cache for every vault, versioned by the registry, and a single-vault chain over the main vault.
+    cache = QueryCache(lambda: registry.index_version)
+    llm = CountingLLM()
+    context_stage, answer_stage = build_rag_stages(registry.get("main"), llm=llm, k=1, cache=cache)
+    chain = context_stage | answer_stage
+
+    registry.sync("other")
+    assert registry.index_version != registry.get("main").index_version
+    assert chain.invoke("kafka lag") == chain.invoke("kafka lag") == "kafka answer"
+    stats = cache.stats()
+    assert stats["retrieval_hits"] == 1 and stats["answer_hits"] == 1 and stats["retrieval_entries"] == 1
+    assert llm.calls == 1
+    registry.close()
@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+
+import httpx
+from langchain_core.language_models import LLM
+from langchain_core.outputs import GenerationChunk
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.context_budget import ContextBudgeter
+from noteagent.core.folder_navigation import iter_vault
+from noteagent.core.langchain_rag import build_rag_stages
+from noteagent.core.query_server import QueryServer
+from test_vault_registry import WordHashEmbeddings, write_vault
+
+
+class SlowLLM(LLM):
+    model: str = "slow"
+    running: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        raise NotImplementedError
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return "kafka answer"
+
+
+def test_server_batches_embeddings_caps_generations_and_serves_all_endpoints(tmp_path):
+    filler = " Some extra words so the note is long enough to be indexed."
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts on call" + filler, "Bread": "sourdough starter feeding" + filler})
+    embeddings = WordHashEmbeddings()
+    db = ObsidianChromaDB(collection_name="server", db_location_path=tmp_path / "chroma", embeddings=embeddings)
+    db.create_new_note_index(iter_vault(vault))
+    llm = SlowLLM()
+    _, answer_stage = build_rag_stages(db, llm=llm)
+    server = QueryServer(db, answer_stage, vault_path=vault, budgeter=ContextBudgeter(), port=0, k=2, max_generations=2, embed_wait_ms=20)
+
+    async def scenario():
+        await server.start()
+        url = f"http://{server.host}:{server.port}"
+        try:
+            async with httpx.AsyncClient(base_url=url) as client:
+                calls_before = embeddings.calls
+                answers = await asyncio.gather(*(client.post("/query", json={"question": f"kafka lag {i}"}) for i in range(6)))
+                assert {r.status_code for r in answers} == {200}
+                body = answers[0].json()
+                assert body["answer"] == "kafka answer"
+                assert body["sources"][0]["source"] == "Kafka.md"
+                assert set(body["timings"]) >= {"embed_sec", "retrieve_sec", "queue_sec", "generate_sec", "total_sec"}
+                assert embeddings.calls - calls_before < 6
+                assert llm.peak == 2
+
+                search = (await client.post("/search", json={"query": "sourdough", "k": 1})).json()
+                assert search["results"][0]["source"] == "Bread.md"
+
+                (vault / "Tea.md").write_text("oolong brewing temperature notes" + filler, encoding="utf-8")
+                assert (await client.post("/sync")).json()["added"] == 1
+
+                status = (await client.get("/status")).json()
+                assert status["server_generations"] == 6
+                assert status["embed_batched_queries"] == 7
+
+                assert (await client.post("/query", json={})).status_code == 400
+                assert (await client.get("/query")).status_code == 405
+                assert (await client.get("/nope")).status_code == 404
+
+                async with client.stream("POST", "/query", json={"question": "kafka", "stream": True}) as streamed:
+                    assert "".join([chunk async for chunk in streamed.aiter_text()]) == "kafka answer"
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+class BrokenStreamLLM(LLM):
+    @property
+    def _llm_type(self) -> str:
+        return "broken"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        raise NotImplementedError
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        yield GenerationChunk(text="kafka ")
+        raise RuntimeError("model went away\nmid answer")
+
+
+def test_stream_errors_end_the_chunked_body_and_bad_lengths_are_400(tmp_path):
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts on call. Some extra words so the note is long enough to be indexed."})
+    db = ObsidianChromaDB(collection_name="server", db_location_path=tmp_path / "chroma", embeddings=WordHashEmbeddings(), vector_backend="mmap")
+    db.create_new_note_index(iter_vault(vault))
+    _, answer_stage = build_rag_stages(db, llm=BrokenStreamLLM())
+    server = QueryServer(db, answer_stage, port=0, k=1)
+
+    async def raw(request: bytes) -> bytes:
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=10)  # until the server closes the connection
+        writer.close()
+        return response
+
+    async def scenario():
+        await server.start()
+        try:
+            body = b'{"question": "kafka", "stream": true}'
+            response = await raw(b"POST /query HTTP/1.1\r\nHost: x\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            head, _, chunked = response.partition(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 200") and b"Trailer: X-Error" in head
+            # One data chunk, then the terminating chunk with the error as a trailer; no JSON 500 spliced in.
+            assert chunked == b"6\r\nkafka \r\n0\r\nX-Error: model went away mid answer\r\n\r\n"
+
+            for length in (b"abc", b"-5"):
+                response = await raw(b"POST /search HTTP/1.1\r\nHost: x\r\nContent-Length: " + length + b"\r\n\r\n")
+                assert response.startswith(b"HTTP/1.1 400") and b"Invalid Content-Length" in response
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
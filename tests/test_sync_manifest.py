@@ -0,0 +1,29 @@
+from noteagent.core.sync_manifest import NoteManifest
+
+
+def make_note(rel_path, body, **extra):
+    return {"relative_path": rel_path, "name": rel_path.split("/")[-1][:-3], "clean_body": body, **extra}
+
+
+def test_manifest_diff(tmp_path):
+    manifest = NoteManifest(tmp_path / "notes.manifest.json", "bge-m3", 1200, 200)
+    manifest.record(make_note("a.md", "alpha"), ["a.md::0"])
+    manifest.record(make_note("b.md", "beta"), ["b.md::0", "b.md::1"])
+    manifest.record(make_note("c.md", "gamma"), ["c.md::0"])
+    manifest.save()
+
+    reloaded = NoteManifest(tmp_path / "notes.manifest.json", "bge-m3", 1200, 200).load()
+    assert reloaded.compatible
+    diff = reloaded.diff([make_note("a.md", "alpha"), make_note("b.md", "beta v2"), make_note("d.md", "delta")])
+
+    assert [n["relative_path"] for n in diff["added"]] == ["d.md"]
+    assert [n["relative_path"] for n in diff["changed"]] == ["b.md"]
+    assert diff["deleted"] == ["c.md"]
+    assert diff["unchanged"] == ["a.md"]
+    assert reloaded.chunk_ids_for(["b.md", "c.md"]) == ["b.md::0", "b.md::1", "c.md::0"]
+
+
+def test_manifest_incompatible_settings(tmp_path):
+    NoteManifest(tmp_path / "notes.manifest.json", "bge-m3", 1200, 200).save()
+    assert not NoteManifest(tmp_path / "notes.manifest.json", "nomic-embed-text", 1200, 200).load().compatible
+    assert not NoteManifest(tmp_path / "notes.manifest.json", "bge-m3", 800, 200).load().compatible
@@ -0,0 +1,85 @@
+import hashlib
+import math
+import os
+import subprocess
+import sys
+
+from langchain_core.embeddings import Embeddings
+
+from noteagent.core.vault_registry import VaultRegistry, collection_name_for
+
+
+class WordHashEmbeddings(Embeddings):
+    """Bag-of-words hashed into 64 dims, so texts sharing words are close."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    @staticmethod
+    def _embed(text):
+        vector = [0.0] * 64
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.strip(".,").encode()).hexdigest(), 16) % 64] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+def write_vault(root, notes):
+    (root / ".obsidian").mkdir(parents=True)
+    for name, body in notes.items():
+        (root / f"{name}.md").write_text(body, encoding="utf-8")
+    return root
+
+
+def test_registry_shares_clients_loads_lazily_and_merges_across_vaults(tmp_path):
+    filler = " Some extra words so the note is long enough to be indexed."
+    team_a = write_vault(tmp_path / "a", {"Kafka": "kafka consumer lag alerts on call" + filler, "Bread": "sourdough starter feeding" + filler})
+    team_b = write_vault(tmp_path / "b", {"Lag": "kafka lag runbook for the on call rotation" + filler})
+
+    embeddings = WordHashEmbeddings()
+    registry = VaultRegistry(tmp_path / "chroma", embeddings=embeddings)
+    registry.register("Team A", team_a)
+    registry.register("team-b", team_b)
+
+    assert collection_name_for("Team A") == "vault_Team_A"
+    assert not registry.is_loaded("Team A")
+
+    assert registry.sync("Team A")["mode"] == "full_index"
+    assert registry.sync("team-b")["mode"] == "full_index"
+    assert registry.sync("team-b")["mode"] == "incremental"
+
+    db_a, db_b = registry.get("Team A"), registry.get("team-b")
+    assert db_a._embeddings is embeddings and db_b._embeddings is embeddings
+    assert db_a._client is registry.client and db_b._client is registry.client
+    assert registry.index_version == db_a.index_version + db_b.index_version
+
+    hits = registry.search("kafka lag on call", k=2)
+    assert {doc.metadata["vault"] for doc, _ in hits} == {"Team A", "team-b"}
+    assert [distance for _, distance in hits] == sorted(distance for _, distance in hits)
+
+    only_b = registry.search("kafka lag on call", vaults=["team-b"], k=5)
+    assert [doc.metadata["source"] for doc, _ in only_b] == ["Lag.md"]
+    assert registry.status()["vaults"]["Team A"]["document_count"] == 2
+    registry.close()
+
+
+def test_mmap_registry_starts_without_chromadb_or_a_vault_scan(tmp_path):
+    # Importing the entry point must not pull in the heavy optional modules; they load on first use.
+    code = "import sys, noteagent.core.main; print(sorted(m for m in ('chromadb', 'obsidiantools', 'pandas', 'langchain_ollama') if m in sys.modules))"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout.strip() == "[]"
+
+    filler = " Some extra words so the note is long enough to be indexed."
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts" + filler})
+    registry = VaultRegistry(tmp_path / "db", embeddings=WordHashEmbeddings(), vector_backend="mmap")
+    registry.register("main", vault)
+    assert registry.client is None
+    assert registry.sync("main")["mode"] == "full_index"
+    assert registry.get("main").count() == 1
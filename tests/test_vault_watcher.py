@@ -0,0 +1,28 @@
+import threading
+import time
+
+from noteagent.core.vault_watcher import VaultWatcher
+
+
+def test_polling_watcher_debounces_and_classifies(tmp_path):
+    (tmp_path / ".obsidian").mkdir()
+    (tmp_path / "old.md").write_text("old")
+    batches = []
+    done = threading.Event()
+
+    def on_changes(changed, deleted):
+        batches.append((changed, deleted))
+        done.set()
+
+    watcher = VaultWatcher(tmp_path, on_changes, debounce_sec=0.3, poll_interval_sec=0.05, use_native=False).start()
+    try:
+        for i in range(3):
+            (tmp_path / "new.md").write_text(f"edit {i}")
+            time.sleep(0.06)
+        (tmp_path / "old.md").unlink()
+        (tmp_path / ".obsidian" / "ignored.md").write_text("x")
+        assert done.wait(timeout=5)
+    finally:
+        watcher.stop()
+
+    assert batches == [({"new.md"}, {"old.md"})]
@@ -0,0 +1,182 @@
+import json
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from noteagent.core.chroma_db import ObsidianChromaDB
+from noteagent.core.folder_navigation import iter_vault
+from noteagent.core.chroma_store import ChromaNoteStore
+from noteagent.core.vector_store import MmapVectorStore, compile_filter, quantize
+from test_vault_registry import WordHashEmbeddings, write_vault
+
+TEXTS = {
+    "a#0": ("kafka consumer lag alerts", {"source": "Kafka.md", "n_tags": 2}),
+    "b#0": ("sourdough starter feeding schedule", {"source": "Bread.md", "n_tags": 0}),
+    "c#0": ("kafka lag runbook for on call", {"source": "Runbook.md", "n_tags": 1}),
+    "d#0": ("lisbon trip tram and pastries", {"source": "Lisbon.md", "n_tags": 3}),
+}
+
+
+def add_all(store):
+    ids = list(TEXTS)
+    store.add_texts([TEXTS[i][0] for i in ids], metadatas=[TEXTS[i][1] for i in ids], ids=ids)
+
+
+def test_mmap_store_matches_chroma_ranking_and_distances(tmp_path):
+    embeddings = WordHashEmbeddings()
+    mmap_store = MmapVectorStore(tmp_path / "vectors", embeddings)
+    chroma_store = ChromaNoteStore(collection_name="parity", embedding_function=embeddings, persist_directory=str(tmp_path / "chroma"))
+    add_all(mmap_store)
+    add_all(chroma_store)
+
+    query = embeddings.embed_query("kafka lag on call")
+    mmap_hits = mmap_store.similarity_search_by_vector_with_relevance_scores(query, k=3)
+    chroma_hits = chroma_store.similarity_search_by_vector_with_relevance_scores(query, k=3)
+    assert [doc.id for doc, _ in mmap_hits] == [doc.id for doc, _ in chroma_hits]
+    assert np.allclose([d for _, d in mmap_hits], [d for _, d in chroma_hits], atol=1e-4)
+    assert mmap_hits[0][0].page_content == "kafka lag runbook for on call"
+
+    filtered = mmap_store.similarity_search_by_vector(query, k=5, filter={"source": {"$in": ["Bread.md", "Lisbon.md"]}})
+    assert {doc.id for doc in filtered} == {"b#0", "d#0"}
+    assert [doc.id for doc in mmap_store.similarity_search_by_vector(query, k=5, filter={"n_tags": {"$gte": 2}})] == ["a#0", "d#0"]
+    assert mmap_store.count() == chroma_store.count() == 4
+
+
+def test_mmap_store_tombstones_compacts_and_reopens_from_the_header(tmp_path):
+    embeddings = WordHashEmbeddings()
+    store = MmapVectorStore(tmp_path / "vectors", embeddings, compact_ratio=0.5)
+    add_all(store)
+    store.add_texts(["kafka lag runbook, updated"], metadatas=[{"source": "Runbook.md"}], ids=["c#0"])
+    store.delete(["b#0"])
+    assert store.count() == 3
+    assert store.ids_for_source("Runbook.md") == ["c#0"]
+    assert store.get_by_ids(["c#0"])[0].page_content == "kafka lag runbook, updated"
+    assert store.stats()["vector_tombstones"] == 2
+
+    store.delete(["d#0"])  # 3 of 6 rows dead -> compaction into a new generation
+    assert store.stats() == {**store.stats(), "vector_rows": 2, "vector_tombstones": 0}
+    assert len([p for p in (tmp_path / "vectors").iterdir() if p.is_dir()]) == 1
+
+    # A batch that was written but never committed in the header is ignored and cut off on reopen.
+    gen_dir = tmp_path / "vectors" / (tmp_path / "vectors" / "CURRENT").read_text()
+    with open(gen_dir / "rows.jsonl", "a") as f:
+        f.write(json.dumps({"ids": ["ghost"], "spans": [[0, 1]], "metadatas": [{}]}) + "\n")
+
+    reopened = MmapVectorStore(tmp_path / "vectors", embeddings)
+    assert reopened.count() == 2 and reopened._state is None
+    hits = reopened.similarity_search("kafka lag", k=5)
+    assert sorted(doc.id for doc in hits) == ["a#0", "c#0"]
+    assert dict(zip(*next(reopened.iter_texts())))["a#0"] == "kafka consumer lag alerts"
+    reopened.reset()
+    assert reopened.count() == 0 and reopened.similarity_search("kafka", k=3) == []
+
+
+def test_compile_filter_and_or():
+    predicate = compile_filter({"$or": [{"source": "A.md"}, {"$and": [{"n_tags": {"$gt": 1}}, {"source": {"$nin": ["B.md"]}}]}]})
+    assert predicate({"source": "A.md", "n_tags": 0})
+    assert predicate({"source": "C.md", "n_tags": 2})
+    assert not predicate({"source": "B.md", "n_tags": 5})
+
+
+def test_obsidian_db_runs_on_the_mmap_backend(tmp_path):
+    filler = " Some extra words so the note is long enough to be indexed."
+    vault = write_vault(tmp_path / "vault", {"Kafka": "kafka consumer lag alerts [[Runbook]]" + filler, "Runbook": "on call steps" + filler})
+    db = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), vector_backend="mmap")
+    db.create_new_note_index(iter_vault(vault))
+    assert db.get_status()["vector_backend"] == "mmap" and db.count() == 2
+
+    (vault / "Kafka.md").write_text("kafka partitions and consumer groups [[Runbook]]" + filler, encoding="utf-8")
+    assert db.sync_notes(iter_vault(vault))["changed"] == 1
+    assert db.hybrid_search("kafka partitions", k=1)[0].metadata["source"] == "Kafka.md"
+
+    reopened = ObsidianChromaDB(collection_name="notes", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), vector_backend="mmap")
+    assert reopened.count() == 2 and len(reopened.lexical_index) == 2
+    reopened.delete_by_source("Runbook.md")
+    assert reopened.count() == 1
+
+
+def test_quantized_search_reranks_to_the_exact_top_k(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, 64))
+    vectors = (centers[rng.integers(0, 20, 2000)] + 0.6 * rng.standard_normal((2000, 64))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"n{i}.md#0" for i in range(2000)]
+    metadatas = [{"source": f"n{i}.md"} for i in range(2000)]
+
+    # Written without quantization; the codes are derived when a quantized store opens it.
+    MmapVectorStore(tmp_path / "vectors", WordHashEmbeddings()).add_vectors(vectors, ["x"] * 2000, metadatas, ids)
+    exact = MmapVectorStore(tmp_path / "vectors", WordHashEmbeddings())
+    queries = vectors[:50] + 0.1 * rng.standard_normal((50, 64)).astype(np.float32)
+
+    # One sign bit per dimension is coarse at 64 dims, so binary needs the longer shortlist.
+    for quantization, rerank_factor, min_recall in (("int8", 4, 0.99), ("binary", 10, 0.9)):
+        store = MmapVectorStore(tmp_path / "vectors", WordHashEmbeddings(), quantization=quantization, rerank_factor=rerank_factor)
+        hits = 0
+        for query in queries:
+            expected = exact.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=10)
+            got = store.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=10)
+            hits += len({doc.id for doc, _ in got} & {doc.id for doc, _ in expected})
+            # Shortlisted rows are rescored in full precision, so their distances are exact.
+            exact_distance = {doc.id: distance for doc, distance in expected}
+            assert all(abs(distance - exact_distance[doc.id]) < 1e-5 for doc, distance in got if doc.id in exact_distance)
+        assert hits / 500 >= min_recall, quantization
+        assert store.stats()["vector_scan_bytes"] < exact.stats()["vector_scan_bytes"] / 3
+
+    store = MmapVectorStore(tmp_path / "vectors", WordHashEmbeddings(), quantization="int8")
+    store.add_vectors(vectors[:1], ["new"], [{"source": "new.md"}], ["new.md#0"])
+    store.delete(["n0.md#0"])
+    assert store.similarity_search_by_vector(vectors[0].tolist(), k=1)[0].id == "new.md#0"
+    assert [d.id for d in store.similarity_search_by_vector(vectors[0].tolist(), k=3, filter={"source": "n5.md"})] == ["n5.md#0"]
+    codes, scales = quantize(vectors[:3], "int8")
+    assert np.allclose(codes * scales[:, None], vectors[:3], atol=0.01)
+
+    with pytest.raises(ValueError):
+        ObsidianChromaDB(collection_name="q", db_location_path=tmp_path / "db", embeddings=WordHashEmbeddings(), vector_quantization="int8")
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_searches_stay_consistent_while_deletes_compact(tmp_path, quantization):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((400, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"n{i}.md#0" for i in range(400)]
+    texts = {chunk_id: f"text of {chunk_id}" for chunk_id in ids}
+    store = MmapVectorStore(tmp_path / "vectors", WordHashEmbeddings(), compact_ratio=0.1, quantization=quantization)
+    store.add_vectors(vectors, list(texts.values()), [{"source": chunk_id[:-2]} for chunk_id in ids], ids)
+
+    done, errors = threading.Event(), []
+
+    def churn():
+        try:
+            for round_ in range(30):
+                picked = sorted(rng.choice(400, 60, replace=False))
+                store.delete([ids[i] for i in picked])  # past compact_ratio every time
+                store.add_vectors(vectors[picked], [texts[ids[i]] for i in picked], [{"source": ids[i][:-2]} for i in picked], [ids[i] for i in picked])
+        finally:
+            done.set()
+
+    def search(seed):
+        local = np.random.default_rng(seed)
+        try:
+            while not done.is_set():
+                query = vectors[local.integers(400)].tolist()
+                sources = [f"n{i}.md" for i in local.integers(0, 400, 20)]
+                for doc in store.similarity_search_by_vector(query, k=5) + store.similarity_search_by_vector(query, k=5, filter={"source": {"$in": sources}}):
+                    assert doc.page_content == texts[doc.id] and doc.metadata["source"] == doc.id[:-2]
+        except Exception as e:  # surfaced below; a failing thread would otherwise pass silently
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=churn)] + [threading.Thread(target=search, args=(seed,)) for seed in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert store.count() == 400 and len([p for p in (tmp_path / "vectors").iterdir() if p.is_dir()]) == 1